@@ -0,0 +1,242 @@
+"""Benchmarks for ProFlow's analysis and layout phases on synthetic code.
+
+Headless (never imports tkinter). Usage:
+  python bench.py run [--sizes 1000,10000,...] [--out results.json]
+  python bench.py compare old.json new.json [--threshold 1.10]
+"""
+
+import argparse
+import ast
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+from graph import CallGraph
+from layout import compute_layout
+from main import FlowAnalyzer, __version__, analyze_flow
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+_BUILTIN_CALLEES = ["len", "print", "range", "isinstance", "sorted", "str"]
+_BLOCKS = ["if a:", "for _item in b:", "while a:", "with a:"]
+
+
+def generate_source(
+    call_sites: int,
+    depth: int = 3,
+    fanout: int = 4,
+    density: int = 8,
+    builtin_ratio: float = 0.2,
+    seed: int = 0,
+) -> str:
+    """Return Python source with exactly ``call_sites`` calls.
+
+    Each function holds ``density`` call sites spread over ``fanout`` distinct
+    callees, nested ``depth`` blocks deep; ``builtin_ratio`` of the calls go to
+    built-ins. A few module-level calls give "Main Script" some fan-out.
+    """
+
+    rng = random.Random(seed)
+    main_calls = min(call_sites, max(1, call_sites // 100))
+    functions = max(1, -(-(call_sites - main_calls) // density))
+    remaining = call_sites - main_calls
+    out: List[str] = []
+
+    for i in range(functions):
+        targets = [f"f{rng.randrange(functions)}" for _ in range(fanout)]
+        out.append(f"def f{i}(a, b):")
+        indent = "    "
+        for level in range(depth):
+            out.append(f"{indent}{_BLOCKS[level % len(_BLOCKS)]}")
+            indent += "    "
+        n = min(density, remaining)
+        remaining -= n
+        for k in range(n):
+            if rng.random() < builtin_ratio:
+                callee = rng.choice(_BUILTIN_CALLEES)
+            else:
+                callee = targets[k % fanout]
+            if k % 3 == 0:
+                out.append(f"{indent}v{k} = {callee}(a, {k})")
+            else:
+                out.append(f"{indent}{callee}(b, a + {k})")
+        if not n:
+            out.append(f"{indent}pass")
+        out.append("")
+
+    for k in range(main_calls):
+        out.append(f"f{rng.randrange(functions)}({k}, None)")
+    out.append("")
+    return "\n".join(out)
+
+
+def _measure(fn: Callable[[], object], repeat: int, memory: bool) -> Tuple[float, Optional[int], object]:
+    best = float("inf")
+    result: object = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+
+    peak: Optional[int] = None
+    if memory:
+        # Separate pass: tracemalloc slows allocation-heavy code down a lot.
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, peak, result
+
+
+def _node_meta(graph: CallGraph, hovered: int = 100) -> int:
+    # What the GUI does on hover: per-callee edge index (built once) + distinct arg texts.
+    arg_texts = graph.arg_texts
+    arg_ids = graph.arg_ids
+    total = 0
+    for node_id in range(min(hovered, graph.node_count)):
+        total += len(set(arg_texts[arg_ids[e]] for e in graph.edges_into(node_id)))
+    return total
+
+
+def run_benchmarks(sizes: List[int], repeat: int = 1, memory: bool = True, **generator_args) -> List[Dict[str, object]]:
+    results: List[Dict[str, object]] = []
+    for size in sizes:
+        source = generate_source(size, **generator_args)
+        fd, path = tempfile.mkstemp(suffix=".py", prefix="proflow_bench_")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(source)
+
+        try:
+            tree = ast.parse(source)
+
+            def visit() -> CallGraph:
+                analyzer = FlowAnalyzer()
+                analyzer.visit(tree)
+                return analyzer.graph
+
+            def walk() -> CallGraph:
+                analyzer = FlowAnalyzer()
+                analyzer.walk(tree)
+                return analyzer.graph
+
+            def fresh_graph() -> CallGraph:
+                # Adjacency/index caches live on the graph; time each phase from a cold copy.
+                return CallGraph.from_dict(graph.to_dict())
+
+            phases: List[Tuple[str, Callable[[], object]]] = [
+                ("analyze_flow", lambda: analyze_flow(path, use_cache=False)),
+                ("visit", visit),
+                ("walk", walk),
+            ]
+            graph = walk()
+            phases += [
+                ("filter_graph", lambda: fresh_graph().without_builtins()),
+                ("compute_layout", lambda: compute_layout(fresh_graph(), cache=None)),
+                ("node_meta", lambda: _node_meta(fresh_graph())),
+            ]
+
+            for phase, fn in phases:
+                seconds, peak, _ = _measure(fn, repeat, memory)
+                row = {
+                    "size": size,
+                    "phase": phase,
+                    "seconds": round(seconds, 6),
+                    "peak_bytes": peak,
+                    "nodes": graph.node_count,
+                    "edges": len(graph),
+                }
+                results.append(row)
+                mem = f"{peak / 2**20:9.1f} MiB" if peak is not None else ""
+                print(f"{size:>9} {phase:<15} {seconds:9.3f}s {mem}", file=sys.stderr)
+        finally:
+            os.remove(path)
+    return results
+
+
+def compare(old: Dict[str, object], new: Dict[str, object], threshold: float) -> int:
+    """Print per-phase time ratios new/old; return the number of regressions past threshold."""
+
+    def index(report: Dict[str, object]) -> Dict[Tuple[int, str], Dict[str, object]]:
+        return {(r["size"], r["phase"]): r for r in report["results"]}  # type: ignore[index, union-attr]
+
+    old_rows = index(old)
+    regressions = 0
+    print(f"{'size':>9} {'phase':<15} {'old':>9} {'new':>9} {'ratio':>7}")
+    for key, row in sorted(index(new).items()):
+        before = old_rows.get(key)
+        if before is None:
+            continue
+        ratio = row["seconds"] / max(before["seconds"], 1e-9)  # type: ignore[operator]
+        flag = ""
+        if ratio > threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{key[0]:>9} {key[1]:<15} {before['seconds']:9.3f} {row['seconds']:9.3f} {ratio:7.2f}{flag}")
+    return regressions
+
+
+def _run_cli() -> int:
+    parser = argparse.ArgumentParser(prog="bench.py", description="ProFlow benchmark suite.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run the scaling ladder and write JSON results")
+    run.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="comma-separated call-site counts")
+    run.add_argument("--depth", type=int, default=3, help="block nesting depth inside each function")
+    run.add_argument("--fanout", type=int, default=4, help="distinct callees per function")
+    run.add_argument("--density", type=int, default=8, help="call sites per function")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--repeat", type=int, default=1, help="timing runs per phase (best is kept)")
+    run.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory pass")
+    run.add_argument("--out", default=None, help="write results JSON here (default: stdout)")
+
+    cmp_ = sub.add_parser("compare", help="compare two result files")
+    cmp_.add_argument("old")
+    cmp_.add_argument("new")
+    cmp_.add_argument("--threshold", type=float, default=1.10, help="new/old time ratio counted as a regression")
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.old, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.new, "r", encoding="utf-8") as f:
+            new = json.load(f)
+        return 1 if compare(old, new, args.threshold) else 0
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = run_benchmarks(
+        sizes,
+        repeat=args.repeat,
+        memory=not args.no_memory,
+        depth=args.depth,
+        fanout=args.fanout,
+        density=args.density,
+        seed=args.seed,
+    )
+    report = {
+        "proflow_version": __version__,
+        "python": sys.version,
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "parameters": {"depth": args.depth, "fanout": args.fanout, "density": args.density, "seed": args.seed},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_run_cli())
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from typing import Dict, Optional
+
+# Bump when the stored payload layout (or what the analysis extracts) changes so stale entries are ignored.
+CACHE_FORMAT = 5
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Only re-check the total cache size every N writes (a full scan per write would be quadratic).
+_EVICT_EVERY = 64
+
+
+def default_cache_dir() -> str:
+    override = os.environ.get("PROFLOW_CACHE_DIR")
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "ProFlow", "cache")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "proflow")
+
+
+class AnalysisCache:
+    """On-disk cache of per-file analysis results.
+
+    Entries are JSON files named after a hash of the file path, the file's
+    content hash, the Python version and the ProFlow version, so any edit or
+    upgrade simply misses. Hits refresh the entry's mtime, which is what the
+    LRU eviction orders by once the directory grows past ``max_bytes``.
+    """
+
+    def __init__(self, directory: Optional[str] = None, version: str = "", max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.version = version
+        self.max_bytes = max_bytes
+        self._writes = 0
+
+    def key(self, path: str, source: bytes) -> str:
+        h = hashlib.sha256()
+        for part in (
+            str(CACHE_FORMAT),
+            self.version,
+            sys.version,
+            os.path.normcase(os.path.abspath(path)),
+            hashlib.sha256(source).hexdigest(),
+        ):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, path: str, source: bytes) -> Optional[Dict[str, object]]:
+        entry = self._entry_path(self.key(path, source))
+        try:
+            with open(entry, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            os.utime(entry)  # mark as recently used
+        except OSError:
+            pass
+        return payload
+
+    def put(self, path: str, source: bytes, payload: Dict[str, object]) -> None:
+        entry = self._entry_path(self.key(path, source))
+        try:
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            # Write-then-rename so concurrent workers never see a half-written entry.
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(entry), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(payload, f, separators=(",", ":"))
+            os.replace(tmp, entry)
+        except OSError:
+            return
+
+        self._writes += 1
+        if self._writes % _EVICT_EVERY == 1:
+            self.evict()
+
+    def evict(self) -> None:
+        # Drop least-recently-used entries until the cache fits in max_bytes.
+        entries = []
+        total = 0
+        for dirpath, _dirnames, filenames in os.walk(self.directory):
+            for name in filenames:
+                full = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, full))
+                total += st.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _mtime, size, full in entries:
+            try:
+                os.remove(full)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self) -> None:
+        for dirpath, _dirnames, filenames in os.walk(self.directory):
+            for name in filenames:
+                try:
+                    os.remove(os.path.join(dirpath, name))
+                except OSError:
+                    pass
@@ -0,0 +1,244 @@
+"""Low-memory analysis of very large single files.
+
+``analyze_flow`` parses the whole module into one AST. Here the source is
+read line by line through ``tokenize`` and cut at top-level statement
+boundaries; each statement is parsed, walked and dropped before the next one
+is read, so peak memory is bounded by the largest top-level definition (plus
+the result). Top-level statements are independent for FlowAnalyzer (each
+starts in "Main Script"), so the edges, assignments and defined functions
+are the same as a whole-file analysis.
+
+``changed_window`` finds the lines two versions of a file do not share, cut
+at statement boundaries, so diff.py and watch.py only re-split that range.
+"""
+
+import ast
+import io
+import re
+import sys
+import tokenize
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from graph import FlowEdge
+from main import EdgeSink, FlowAnalyzer, _build_result, _gc_paused, module_owners
+from profiling import phase
+
+# Cut points tried before the window falls back to the start or end of the file.
+MAX_CUT_TRIES = 32
+
+# Strings and comments, so brackets and line starts inside them can be told apart.
+_STRINGS_AND_COMMENTS = re.compile(
+    r"""#[^\r\n]*|\"\"\"(?:\\.|[^\\])*?\"\"\"|'''(?:\\.|[^\\])*?'''|"(?:\\.|[^"\\\r\n])*"|'(?:\\.|[^'\\\r\n])*'""",
+    re.S,
+)
+_CONTINUATION = re.compile(r"(?:else|elif|except|finally)\b")
+
+# Keywords that continue the previous top-level compound statement.
+_CONTINUATIONS = {"else", "elif", "except", "finally"}
+_SKIPPED = {tokenize.NL, tokenize.COMMENT}
+
+
+def top_level_sources(path: str) -> Iterator[Tuple[int, str]]:
+    """Yield (first line, source text) for each top-level statement of a file, in order.
+
+    Decorators stay with the definition they decorate, and else/elif/except/
+    finally clauses with their statement. Comments and blank lines between
+    statements go with the preceding one. Raises tokenize.TokenError or
+    SyntaxError on malformed source.
+    """
+
+    with open(path, "rb") as raw:
+        encoding, _ = tokenize.detect_encoding(raw.readline)
+        raw.seek(0)
+        # newline="" keeps line endings as they are in the file.
+        with io.TextIOWrapper(raw, encoding, newline="") as source:
+            yield from top_level_statements(source)
+
+
+def top_level_statements(lines: Iterable[str], first_line: int = 1) -> Iterator[Tuple[int, str]]:
+    """``top_level_sources`` over decoded source lines; ``first_line`` is the number of the first one.
+
+    The lines must start at a top-level statement (not inside brackets or a string).
+    """
+
+    source = iter(lines)
+    buffer: List[str] = []  # physical lines read since ``start``
+
+    def readline() -> str:
+        line = next(source, "")
+        if line:
+            buffer.append(line)
+        return line
+
+    start = 1
+    depth = 0
+    line_start = True  # the next significant token begins a logical line
+    decorated = False
+    seen = False  # whether the buffer holds a statement yet
+
+    for tok in tokenize.generate_tokens(readline):
+        kind = tok.type
+        if kind == tokenize.INDENT:
+            if not seen:
+                # Indented code before any statement; ast.parse would reject it too.
+                raise IndentationError("unexpected indent", ("<unknown>", tok.start[0] + first_line - 1, tok.start[1] + 1, tok.line))
+            depth += 1
+        elif kind == tokenize.DEDENT:
+            depth -= 1
+        elif kind == tokenize.NEWLINE:
+            line_start = True
+        elif kind == tokenize.ENDMARKER:
+            break
+        elif kind not in _SKIPPED:
+            if line_start and depth == 0:
+                joins = decorated or (kind == tokenize.NAME and tok.string in _CONTINUATIONS)
+                row = tok.start[0]
+                if not joins and seen and row > start:
+                    # Everything before this line belongs to the previous statement.
+                    done = row - start
+                    yield start + first_line - 1, "".join(buffer[:done])
+                    del buffer[:done]
+                    start = row
+                seen = True
+                decorated = kind == tokenize.OP and tok.string == "@"
+            line_start = False
+
+    if buffer and seen:
+        yield start + first_line - 1, "".join(buffer)
+
+
+class SourceLines:
+    """A file's lines, plus a lazily built copy of its text with strings and comments blanked out."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as raw:
+            encoding, _ = tokenize.detect_encoding(raw.readline)
+            raw.seek(0)
+            with io.TextIOWrapper(raw, encoding, newline="") as source:
+                self.lines = source.readlines()
+        self._code: Optional[str] = None
+        self._offsets: List[int] = []
+
+    def __getstate__(self) -> Dict[str, object]:
+        # The blanked copy is rebuilt on demand; not worth pickling (watch state sent to a worker).
+        return {"lines": self.lines, "_code": None, "_offsets": []}
+
+    def _scan(self) -> str:
+        if self._code is None:
+            # Same length as the text, so line offsets stay valid.
+            self._code = _STRINGS_AND_COMMENTS.sub(lambda m: " " * (m.end() - m.start()), "".join(self.lines))
+            self._offsets = [0, *accumulate(len(line) for line in self.lines)]
+        return self._code
+
+    def starts_statement(self, i: int) -> bool:
+        # Whether line i (0-based) certainly starts a top-level statement; the file's ends always do.
+        lines = self.lines
+        if i <= 0 or i >= len(lines):
+            return True
+        line = lines[i]
+        if line[0] in " \t\f\r\n#" or _CONTINUATION.match(line):
+            return False
+        code = self._scan()
+        offset = self._offsets[i]
+        if code[offset] != line[0]:
+            return False  # inside a string
+        if any(code.count(o, 0, offset) != code.count(c, 0, offset) for o, c in ("()", "[]", "{}")):
+            return False
+        if code[self._offsets[i - 1]:offset].rstrip("\r\n").endswith("\\"):
+            return False
+        # Below a decorator the line belongs to the decorated definition's statement.
+        for j in range(i - 1, -1, -1):
+            previous = code[self._offsets[j]:self._offsets[j + 1]]
+            if previous.strip() and previous[0] not in " \t\f":
+                return not previous.startswith("@")
+        return True
+
+
+def changed_window(old: SourceLines, new: SourceLines) -> Tuple[int, int, int]:
+    """(start, old stop, new stop): the lines outside this range are the same in both files.
+
+    Both ends fall on top-level statement boundaries, so the range can be
+    split into statements on its own.
+    """
+
+    a, b = old.lines, new.lines
+    limit = min(len(a), len(b))
+    prefix = 0
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+
+    # The lines before ``start`` are the same in both files but the line at ``start`` need not be,
+    # so it must begin a statement in each (e.g. a deleted ``def`` line joins its body to the code above).
+    start = prefix
+    tries = 0
+    while not (old.starts_statement(start) and new.starts_statement(start)):
+        tries += 1
+        start = start - 1 if tries < MAX_CUT_TRIES else 0
+    old_stop = len(a) - suffix
+    shift = len(b) - len(a)
+    tries = 0
+    while not (old.starts_statement(old_stop) and new.starts_statement(old_stop + shift)):
+        tries += 1
+        old_stop = old_stop + 1 if tries < MAX_CUT_TRIES else len(a)
+    return start, old_stop, old_stop + shift
+
+
+def _walk_chunks(target_file: str, analyzer: FlowAnalyzer) -> bool:
+    graph = analyzer.graph
+    chunks = 0
+    largest = 0
+    with phase("chunked") as p, _gc_paused():
+        try:
+            for first_line, text in top_level_sources(target_file):
+                try:
+                    tree = ast.parse(text)
+                except SyntaxError as e:
+                    e.lineno = (e.lineno or 1) + first_line - 1
+                    raise
+                before = len(graph.lines)
+                analyzer.walk(tree)
+                del tree
+                # Chunks are parsed on their own, so line numbers start at 1 in each.
+                lines = graph.lines
+                for i in range(before, len(lines)):
+                    lines[i] += first_line - 1
+                chunks += 1
+                largest = max(largest, len(text))
+        except (OSError, SyntaxError, UnicodeDecodeError, tokenize.TokenError) as e:
+            print(f"Error: Failed to parse Python file {target_file}: {e}", file=sys.stderr)
+            return False
+        p.set(chunks=chunks, largest_chars=largest, edges=len(graph))
+    return True
+
+
+def analyze_flow_chunked(target_file: str) -> Optional[Dict[str, object]]:
+    """Same result as ``analyze_flow(target_file, use_cache=False)``, one top-level statement at a time.
+
+    The cache is not used: it keys on the hash of the whole file's contents.
+    """
+
+    analyzer = FlowAnalyzer()
+    if not _walk_chunks(target_file, analyzer):
+        return None
+    return _build_result(
+        analyzer.graph,
+        analyzer.defined_functions,
+        analyzer.assigned_to_by_callee,
+        module_owners(target_file, analyzer.defined_functions, analyzer.class_of),
+    )
+
+
+def stream_flow_chunked(target_file: str, edge_sink: EdgeSink) -> bool:
+    # stream_flow without holding the whole AST: memory stays bounded by one statement.
+    return _walk_chunks(target_file, FlowAnalyzer(edge_sink=edge_sink))
+
+
+def _collect_edges_chunked(target_file: str) -> List[FlowEdge]:
+    # Pool worker for --stream --low-memory.
+    edges: List[FlowEdge] = []
+    stream_flow_chunked(target_file, edges.append)
+    return edges
@@ -0,0 +1,169 @@
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from graph import CallGraph
+from profiling import phase
+from query import CallIndex
+
+ClusterKey = Tuple[str, ...]  # path from the outermost cluster down, e.g. ("main", "FlowAnalyzer")
+
+GROUPINGS = ("none", "scc", "owner", "depth")
+
+DEPTH_BAND = 2  # call depths per band in "depth" grouping
+EXTERNAL = "(external)"  # owner-grouping cluster for called but undefined names
+
+
+class ClusterView(NamedTuple):
+    graph: CallGraph  # visible units: plain nodes plus one node per collapsed cluster
+    clusters: Dict[str, ClusterKey]  # view node name -> key of the collapsed cluster it stands for
+    members: Dict[str, List[str]]  # view node name -> original nodes inside it
+    parents: Dict[str, ClusterKey]  # plain node -> innermost expanded cluster holding it
+    edge_counts: List[int]  # per view edge: number of call sites it stands for
+    internal: Dict[str, int]  # view node name -> call sites between its own members
+
+
+def cluster_paths(
+    graph: CallGraph,
+    grouping: str,
+    owners: Optional[Dict[str, ClusterKey]] = None,
+    band: int = DEPTH_BAND,
+) -> List[ClusterKey]:
+    """Cluster key path for every node of ``graph`` (by node id); () means never clustered.
+
+    - scc: nodes on a call cycle are grouped with the rest of their cycle.
+    - owner: by module, then class, from the analysis "owners"; names that
+      are called but not defined go to one "(external)" cluster. The module
+      level is skipped when everything comes from one module.
+    - depth: bands of ``band`` call depths from "Main Script"; nodes it never
+      reaches share an "unreached" cluster.
+    """
+
+    n = graph.node_count
+    names = graph.names
+    paths: List[ClusterKey] = [()] * n
+    if grouping == "scc":
+        index = CallIndex(graph)
+        for comp in index.members:
+            if len(comp) > 1:
+                label = f"cycle: {names[min(comp, key=names.__getitem__)]}"
+                for v in comp:
+                    paths[v] = (label,)
+    elif grouping == "owner":
+        owners = owners or {}
+        single_module = len({o[0] for o in owners.values()}) <= 1
+        for v, name in enumerate(names):
+            owner = owners.get(name)
+            if owner is None:
+                paths[v] = (EXTERNAL,)
+            else:
+                paths[v] = owner[1:] if single_module else owner
+    elif grouping == "depth":
+        depth = [-1] * n
+        start = graph.node_id("Main Script")
+        if start is not None:
+            depth[start] = 0
+            queue = deque([start])
+            while queue:
+                u = queue.popleft()
+                for v in graph.successor_ids(u):
+                    if depth[v] < 0:
+                        depth[v] = depth[u] + 1
+                        queue.append(v)
+        for v in range(n):
+            d = depth[v]
+            if d < 0:
+                paths[v] = ("unreached",)
+            elif d > 0:
+                lo = (d - 1) // band * band + 1
+                paths[v] = (f"depth {lo}-{lo + band - 1}",)
+    elif grouping != "none":
+        raise ValueError(f"unknown grouping: {grouping}")
+
+    start = graph.node_id("Main Script")
+    if start is not None:
+        paths[start] = ()  # the entry point is always shown on its own
+    return paths
+
+
+def collapse(graph: CallGraph, paths: List[ClusterKey], expanded: Set[ClusterKey]) -> ClusterView:
+    """Build the graph of visible units for the given set of expanded clusters.
+
+    Each node is shown as its outermost collapsed cluster, or as itself when
+    every cluster on its path is expanded. Edges between two plain nodes are
+    copied call site by call site (so argument texts survive); edges touching
+    a cluster are merged into one edge per pair, with the call-site count in
+    ``edge_counts``. Cost is O(V + E) of the full graph, but only the view
+    needs to be laid out and drawn.
+    """
+
+    names = graph.names
+    view = CallGraph()
+    clusters: Dict[str, ClusterKey] = {}
+    members: Dict[str, List[str]] = {}
+    parents: Dict[str, ClusterKey] = {}
+    labels: Dict[ClusterKey, str] = {}
+    unit = [0] * graph.node_count
+
+    sizes: Dict[ClusterKey, int] = {}
+    for path in paths:
+        for depth in range(1, len(path) + 1):
+            sizes[path[:depth]] = sizes.get(path[:depth], 0) + 1
+
+    for v, path in enumerate(paths):
+        collapsed: Optional[ClusterKey] = None
+        for depth in range(1, len(path) + 1):
+            if path[:depth] not in expanded:
+                collapsed = path[:depth]
+                break
+        if collapsed is None:
+            unit[v] = view.add_node(names[v])
+            if path:
+                parents[names[v]] = path
+            continue
+
+        label = labels.get(collapsed)
+        if label is None:
+            label = f"▸ {collapsed[-1]} ({sizes[collapsed]})"
+            while label in graph or label in clusters:
+                label += "'"
+            labels[collapsed] = label
+            clusters[label] = collapsed
+            members[label] = []
+        unit[v] = view.add_node(label)
+        members[label].append(names[v])
+
+    pair_counts: Dict[Tuple[int, int], int] = {}
+    edge_counts: List[int] = []
+    internal: Dict[str, int] = {}
+    view_names = view.names
+    for caller, callee, arg, line in zip(graph.callers, graph.callees, graph.arg_ids, graph.lines):
+        u = unit[caller]
+        w = unit[callee]
+        if u == w and view_names[u] in clusters:
+            internal[view_names[u]] = internal.get(view_names[u], 0) + 1
+        elif view_names[u] in clusters or view_names[w] in clusters:
+            pair_counts[(u, w)] = pair_counts.get((u, w), 0) + 1
+        else:
+            view.add_edge(view_names[u], view_names[w], graph.arg_texts[arg], line)
+            edge_counts.append(1)
+
+    for (u, w), count in pair_counts.items():
+        view.add_edge(view_names[u], view_names[w])
+        edge_counts.append(count)
+
+    return ClusterView(view, clusters, members, parents, edge_counts, internal)
+
+
+def cluster_view(
+    graph: CallGraph,
+    grouping: str,
+    owners: Optional[Dict[str, ClusterKey]] = None,
+    expanded: Optional[Set[ClusterKey]] = None,
+) -> Optional[ClusterView]:
+    # What the GUI draws for a grouping; None when nothing is grouped.
+    if grouping == "none":
+        return None
+    with phase("cluster", nodes=graph.node_count) as p:
+        view = collapse(graph, cluster_paths(graph, grouping, owners), expanded or set())
+        p.set(visible=view.graph.node_count)
+    return view
@@ -0,0 +1,365 @@
+"""Long-lived ProFlow analysis daemon plus a thin client, over a Unix domain socket.
+
+  python daemon.py serve [--socket PATH] [--max-mb 64]
+  python daemon.py analyze file.py [more.py ...]
+  python daemon.py query file.py --callers-of NAME [--depth N]
+  python daemon.py stats | invalidate [file.py ...] | stop
+
+The protocol is one JSON object per line in each direction. Requests have an
+"op" ("ping", "analyze", "query", "stats", "invalidate", "shutdown") and
+replies always have "ok" (plus "error" when it is false). The client half of
+this module only imports the standard library pieces it needs, so a request
+costs little more than interpreter startup plus one round trip.
+"""
+
+import argparse
+import json
+import os
+import socket
+import stat
+import sys
+import tempfile
+from typing import Dict, List, Optional
+
+DEFAULT_MAX_MB = 64
+
+
+def default_socket_path() -> str:
+    path = os.environ.get("PROFLOW_SOCKET")
+    if path:
+        return path
+    user = os.environ.get("USER") or os.environ.get("USERNAME") or "user"
+    return os.path.join(tempfile.gettempdir(), f"proflow-{user}.sock")
+
+
+# --- server ---
+
+
+class _Entry:
+    __slots__ = ("analysis", "mtime_ns", "size", "digest", "data", "index")
+
+    def __init__(self, analysis):
+        self.analysis = analysis  # watch.IncrementalAnalysis: per-definition results
+        self.mtime_ns = 0
+        self.size = 0
+        self.digest = b""
+        self.data: Optional[Dict[str, object]] = None
+        self.index = None  # query.CallIndex, built on the first query
+
+
+class AnalysisDaemon:
+    """In-memory working set of analyzed files, bounded by total source size (LRU).
+
+    An entry is reused while the file's mtime and size are unchanged; if they
+    changed but the content hash did not, it is kept as well. Otherwise only
+    the top-level definitions whose fingerprint changed are re-analyzed (see
+    watch.IncrementalAnalysis).
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        from collections import OrderedDict
+
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+        self.running = True
+
+    def _entry(self, path: str) -> _Entry:
+        import hashlib
+
+        from watch import IncrementalAnalysis
+
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        entry = self._entries.get(path)
+        if entry is not None and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return entry
+
+        with open(path, "rb") as f:
+            digest = hashlib.blake2b(f.read(), digest_size=16).digest()
+        if entry is not None and entry.digest == digest:
+            entry.mtime_ns = st.st_mtime_ns
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return entry
+
+        fresh = entry is None
+        if fresh:
+            entry = _Entry(IncrementalAnalysis(path))
+        if entry.analysis.update() is None:  # type: ignore[union-attr]
+            if not fresh:
+                self._drop(path)
+            raise ValueError(f"Failed to parse Python file: {path}")
+
+        if fresh:
+            self.misses += 1
+        else:
+            self.updates += 1
+            self._bytes -= entry.size  # type: ignore[union-attr]
+        entry.mtime_ns = st.st_mtime_ns  # type: ignore[union-attr]
+        entry.size = st.st_size  # type: ignore[union-attr]
+        entry.digest = digest  # type: ignore[union-attr]
+        entry.data = entry.analysis.data()  # type: ignore[union-attr]
+        entry.index = None  # type: ignore[union-attr]
+        self._entries[path] = entry  # type: ignore[assignment]
+        self._entries.move_to_end(path)
+        self._bytes += st.st_size
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            self._drop(next(iter(self._entries)))
+        return entry  # type: ignore[return-value]
+
+    def _drop(self, path: str) -> None:
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _data(self, paths: List[str]) -> Dict[str, object]:
+        from main import _merge_results, iter_python_files
+
+        files = iter_python_files(paths)
+        if not files:
+            raise ValueError("No Python files found.")
+        if len(files) == 1:
+            return self._entry(files[0]).data  # type: ignore[return-value]
+        return _merge_results([self._entry(f).data for f in files])
+
+    def _index(self, paths: List[str]):
+        from query import CallIndex
+
+        files = paths
+        if len(files) == 1 and not os.path.isdir(files[0]):
+            entry = self._entry(files[0])
+            if entry.index is None:
+                entry.index = CallIndex(entry.data["graph"])  # type: ignore[index]
+            return entry.index
+        return CallIndex(self._data(paths)["graph"])  # type: ignore[arg-type]
+
+    def handle(self, request: object) -> Dict[str, object]:
+        # Any malformed request gets an {"ok": false} reply; the connection stays usable.
+        try:
+            if not isinstance(request, dict):
+                raise ValueError("Bad request: expected a JSON object")
+            op = request.get("op")
+            paths = request.get("paths") or []
+            if not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+                raise ValueError("Bad request: 'paths' must be a list of strings")
+            if op == "ping":
+                return {"ok": True, "pid": os.getpid()}
+            if op == "analyze":
+                data = self._data(paths)
+                return {
+                    "ok": True,
+                    "edges": list(data["edges"]),  # type: ignore[call-overload]
+                    "defined_functions": sorted(data["defined_functions"]),  # type: ignore[call-overload]
+                }
+            if op == "query":
+                return self._query(paths, request)
+            if op == "stats":
+                return {
+                    "ok": True,
+                    "entries": len(self._entries),
+                    "bytes": self._bytes,
+                    "max_bytes": self.max_bytes,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "updates": self.updates,
+                }
+            if op == "invalidate":
+                targets = [os.path.abspath(p) for p in paths] if paths else list(self._entries)
+                for path in targets:
+                    self._drop(path)
+                return {"ok": True, "dropped": len(targets)}
+            if op == "shutdown":
+                self.running = False
+                return {"ok": True}
+            return {"ok": False, "error": f"Unknown op: {op!r}"}
+        except (OSError, ValueError) as e:
+            return {"ok": False, "error": str(e)}
+        except (TypeError, AttributeError) as e:
+            # A field of the wrong type, e.g. a list where a name is expected.
+            return {"ok": False, "error": f"Bad request: {e}"}
+
+    def _query(self, paths: List[str], request: Dict[str, object]) -> Dict[str, object]:
+        depth = request.get("depth")
+        if depth is not None and (not isinstance(depth, int) or isinstance(depth, bool) or depth < 1):
+            raise ValueError("Bad request: 'depth' must be a positive integer")
+        index = self._index(paths)
+        reply: Dict[str, object] = {"ok": True}
+        try:
+            if request.get("callers_of"):
+                reply["callers_of"] = index.callers_of(request["callers_of"], depth)
+            if request.get("callees_of"):
+                reply["callees_of"] = index.callees_of(request["callees_of"], depth)
+            if request.get("path"):
+                source, target = request["path"]  # type: ignore[misc]
+                reply["path"] = index.shortest_path(source, target)
+        except KeyError as e:
+            return {"ok": False, "error": f"No function named {e} in the analyzed code."}
+        return reply
+
+
+def serve(socket_path: str, max_bytes: int) -> int:
+    import socketserver
+    import threading
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("Error: Unix domain sockets are not available on this platform.", file=sys.stderr)
+        return 1
+    if os.path.lexists(socket_path):
+        if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+            # Never remove something that is not a socket, e.g. a mistyped --socket path.
+            print(f"Error: {socket_path} exists and is not a socket.", file=sys.stderr)
+            return 1
+        try:
+            request(socket_path, {"op": "ping"})
+        except OSError:
+            os.remove(socket_path)  # stale socket from a daemon that died
+        else:
+            print(f"Error: A daemon is already listening on {socket_path}", file=sys.stderr)
+            return 1
+
+    daemon = AnalysisDaemon(max_bytes)
+    lock = threading.Lock()  # the working set is not shared between threads
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            # Several requests may share one connection, one JSON object per line.
+            for line in self.rfile:
+                try:
+                    message = json.loads(line)
+                    with lock:
+                        reply = daemon.handle(message)
+                except ValueError as e:
+                    reply = {"ok": False, "error": f"Bad request: {e}"}
+                self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+                self.wfile.flush()
+                if not daemon.running:
+                    break
+
+    # A thread per connection, so a client holding its connection open does not block the others;
+    # requests still run one at a time under ``lock``.
+    server = socketserver.ThreadingUnixStreamServer(socket_path, Handler)
+    server.daemon_threads = True
+    server.timeout = 0.5  # wake up to notice a shutdown handled on another connection's thread
+    os.chmod(socket_path, 0o600)
+    print(f"ProFlow daemon listening on {socket_path} (pid {os.getpid()})", file=sys.stderr)
+    try:
+        while daemon.running:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+    return 0
+
+
+# --- client ---
+
+
+def request(socket_path: str, message: Dict[str, object], timeout: Optional[float] = None) -> Dict[str, object]:
+    """Send one request to a running daemon and return its reply (raises OSError if none)."""
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        chunks = []
+        while True:
+            chunk = sock.recv(1 << 16)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            if chunk.endswith(b"\n"):
+                break
+    return json.loads(b"".join(chunks))
+
+
+def _print_reply(command: str, args: argparse.Namespace, reply: Dict[str, object]) -> None:
+    out = sys.stdout
+    if command == "analyze":
+        out.write("Edges:\n")
+        for caller, callee, args_text in reply["edges"]:  # type: ignore[attr-defined]
+            suffix = f" ({args_text})" if args_text else ""
+            out.write(f"  {caller} -> {callee}{suffix}\n")
+    elif command == "query":
+        for key, title in (("callers_of", "Callers of"), ("callees_of", "Callees of")):
+            if key not in reply:
+                continue
+            within = f" (within {args.depth} calls)" if args.depth else ""
+            out.write(f"{title} {getattr(args, key)}{within}:\n")
+            matches: Dict[str, int] = reply[key]  # type: ignore[assignment]
+            for name, depth in sorted(matches.items(), key=lambda item: (item[1], item[0])):
+                out.write(f"  {name} (depth {depth})\n" if args.depth else f"  {name}\n")
+            if not matches:
+                out.write("  (none)\n")
+        if args.path:
+            path = reply.get("path")
+            if path is None:
+                out.write(f"No call path from {args.path[0]} to {args.path[1]}.\n")
+            else:
+                out.write(f"Path ({len(path) - 1} calls):\n  {' -> '.join(path)}\n")  # type: ignore[arg-type]
+    elif command != "stop":
+        out.write(json.dumps({k: v for k, v in reply.items() if k != "ok"}) + "\n")
+
+
+def _run_cli() -> int:
+    parser = argparse.ArgumentParser(prog="daemon.py", description="ProFlow analysis daemon and client.")
+    parser.add_argument("--socket", default=None, help="socket path (default: $PROFLOW_SOCKET or a per-user path in the temp dir)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_cmd = sub.add_parser("serve", help="run the daemon in the foreground")
+    serve_cmd.add_argument("--max-mb", type=float, default=DEFAULT_MAX_MB, help="working set bound in MB of source")
+
+    analyze_cmd = sub.add_parser("analyze", help="print the edges of file(s)")
+    analyze_cmd.add_argument("paths", nargs="+")
+
+    query_cmd = sub.add_parser("query", help="reachability queries (see main.py --help)")
+    query_cmd.add_argument("paths", nargs="+")
+    query_cmd.add_argument("--callers-of", metavar="NAME", default=None)
+    query_cmd.add_argument("--callees-of", metavar="NAME", default=None)
+    query_cmd.add_argument("--path", nargs=2, metavar=("FROM", "TO"), default=None)
+    query_cmd.add_argument("--depth", type=int, default=None)
+
+    sub.add_parser("stats", help="print working set statistics")
+    invalidate_cmd = sub.add_parser("invalidate", help="drop file(s), or everything, from the working set")
+    invalidate_cmd.add_argument("paths", nargs="*")
+    sub.add_parser("stop", help="shut the daemon down")
+
+    args = parser.parse_args()
+    socket_path = args.socket or default_socket_path()
+
+    if args.command == "serve":
+        return serve(socket_path, int(args.max_mb * 1024 * 1024))
+
+    message: Dict[str, object] = {"op": "shutdown" if args.command == "stop" else args.command}
+    if hasattr(args, "paths"):
+        # The daemon may run in another directory.
+        message["paths"] = [os.path.abspath(p) for p in args.paths]
+    if args.command == "query":
+        if not (args.callers_of or args.callees_of or args.path):
+            parser.error("query needs --callers-of, --callees-of or --path")
+        message.update(callers_of=args.callers_of, callees_of=args.callees_of, path=args.path, depth=args.depth)
+
+    try:
+        reply = request(socket_path, message)
+    except OSError as e:
+        print(f"Error: No ProFlow daemon at {socket_path} ({e}). Start one with: python daemon.py serve", file=sys.stderr)
+        return 1
+    if not reply.get("ok"):
+        print(f"Error: {reply.get('error')}", file=sys.stderr)
+        return 1
+    _print_reply(args.command, args, reply)
+    if args.command == "query" and args.path and reply.get("path") is None:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_run_cli())
@@ -0,0 +1,311 @@
+"""Call-graph diff between two revisions of a file or directory tree.
+
+Lines both revisions share at the start and end of a file are skipped
+outright; the rest is cut into top-level statements (chunked), each
+fingerprinted by its text, and statements found on both sides are dropped
+without being parsed. Changed classes are split again into their methods
+and the remaining class body, compared by AST fingerprint. Only the
+definitions left over are walked, so the cost grows with the size of the
+change, not of the code. The call-site delta comes from hashed multisets of
+(caller, callee, args) edges.
+"""
+
+import ast
+import copy
+import hashlib
+import os
+import sys
+import tokenize
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple, TypeVar
+
+from chunked import SourceLines, changed_window, top_level_statements
+from graph import CallGraph, FlowEdge
+from main import FlowAnalyzer, iter_python_files
+from profiling import phase
+
+ADDED = "added"
+REMOVED = "removed"
+ARITY = "arity"  # same caller and callee, different number of arguments
+CHANGED = "changed"  # pair status only: call sites both added and removed, same arity
+REMOVED_LINE = -2  # line of the removed calls merge_diff puts back into the new graph
+
+T = TypeVar("T")
+
+
+class EdgeChange(NamedTuple):
+    kind: str  # ADDED, REMOVED or ARITY
+    caller: str
+    callee: str
+    args: str  # argument text of the call (the new one for ARITY)
+    old_args: str  # ARITY only: argument text before the change
+    line: int  # in the new revision (the old one for REMOVED)
+    path: str  # file, relative to the compared roots for trees
+
+
+class GraphDiff:
+    def __init__(self) -> None:
+        self.changes: List[EdgeChange] = []
+        # Defined on only one side, among the re-analyzed definitions.
+        self.added_functions: Set[str] = set()
+        self.removed_functions: Set[str] = set()
+        self.files = 0
+        self.files_changed = 0  # files with at least one changed call
+        self.analyzed = 0  # definitions walked because their fingerprint changed
+
+    def __bool__(self) -> bool:
+        return bool(self.changes)
+
+    def counts(self) -> Dict[str, int]:
+        counts = Counter(change.kind for change in self.changes)
+        return {kind: counts.get(kind, 0) for kind in (ADDED, REMOVED, ARITY)}
+
+    def pair_status(self) -> Dict[Tuple[str, str], str]:
+        # One status per (caller, callee): what happened to its call sites.
+        kinds: Dict[Tuple[str, str], Set[str]] = {}
+        for change in self.changes:
+            kinds.setdefault((change.caller, change.callee), set()).add(change.kind)
+        status: Dict[Tuple[str, str], str] = {}
+        for pair, seen in kinds.items():
+            if ARITY in seen:
+                status[pair] = ARITY
+            elif len(seen) == 1:
+                status[pair] = next(iter(seen))
+            else:
+                status[pair] = CHANGED
+        return status
+
+
+class _Unit(NamedTuple):
+    fingerprint: str
+    first_line: int
+    text: str
+
+
+def _fingerprint(node: ast.AST) -> str:
+    # ast.dump leaves out line/column info, so moving a definition does not change it.
+    return hashlib.blake2b(ast.dump(node).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _units(lines: List[str], start: int, stop: int) -> List[_Unit]:
+    units: List[_Unit] = []
+    for first_line, text in top_level_statements(lines[start:stop], start + 1):
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+        units.append(_Unit(digest, first_line, text))
+    return units
+
+
+def _unmatched(old: Sequence[T], new: Sequence[T], key: Callable[[T], str]) -> Tuple[List[T], List[T]]:
+    # Items whose fingerprint does not appear (as often) on the other side, in order.
+    remaining = Counter(key(item) for item in new)
+    remaining.subtract(key(item) for item in old)
+    old_left = []
+    for item in old:
+        if remaining[key(item)] < 0:
+            remaining[key(item)] += 1
+            old_left.append(item)
+    new_left = []
+    for item in reversed(new):
+        if remaining[key(item)] > 0:
+            remaining[key(item)] -= 1
+            new_left.append(item)
+    new_left.reverse()
+    return old_left, new_left
+
+
+def _changed_units(old: Optional[str], new: Optional[str]) -> Optional[Tuple[List[_Unit], List[_Unit]]]:
+    """Top-level statements of either side that the other side does not have.
+
+    A missing side counts as empty. Returns None (after printing an error)
+    if a file cannot be read or tokenized.
+    """
+
+    sources: List[Optional[SourceLines]] = []
+    for path in (old, new):
+        try:
+            sources.append(SourceLines(path) if path is not None else None)
+        except (OSError, SyntaxError, UnicodeDecodeError) as e:
+            print(f"Error: Failed to read Python file {path}: {e}", file=sys.stderr)
+            return None
+    old_source, new_source = sources
+    if old_source is not None and new_source is not None and old_source.lines == new_source.lines:
+        return [], []
+
+    old_lines = old_source.lines if old_source is not None else []
+    new_lines = new_source.lines if new_source is not None else []
+    cuts = [(0, len(old_lines), len(new_lines))]
+    if old_source is not None and new_source is not None:
+        # If a cut was misjudged the window does not tokenize, and the whole files are split instead.
+        cuts.insert(0, changed_window(old_source, new_source))
+    for start, old_stop, new_stop in cuts:
+        failed = old
+        try:
+            old_units = _units(old_lines, start, old_stop)
+            failed = new
+            new_units = _units(new_lines, start, new_stop)
+        except (SyntaxError, tokenize.TokenError) as e:
+            error = e
+            continue
+        return _unmatched(old_units, new_units, lambda u: u.fingerprint)
+    print(f"Error: Failed to parse Python file {failed}: {error}", file=sys.stderr)
+    return None
+
+
+def _definitions(units: List[_Unit], path: str) -> Optional[List[Tuple[str, ast.AST, int]]]:
+    """Parse changed units into (fingerprint, node, line offset) definitions.
+
+    Top-level classes are split into their methods plus the class without
+    them, so an edited method does not re-walk the whole class.
+    """
+
+    definitions: List[Tuple[str, ast.AST, int]] = []
+    for unit in units:
+        try:
+            tree = ast.parse(unit.text)
+        except SyntaxError as e:
+            e.lineno = (e.lineno or 1) + unit.first_line - 1
+            print(f"Error: Failed to parse Python file {path}: {e}", file=sys.stderr)
+            return None
+        offset = unit.first_line - 1
+        for stmt in tree.body:
+            if not isinstance(stmt, ast.ClassDef):
+                definitions.append((_fingerprint(stmt), stmt, offset))
+                continue
+            methods = [s for s in stmt.body if isinstance(s, (ast.FunctionDef, ast.AsyncFunctionDef))]
+            shell = copy.copy(stmt)
+            shell.body = [s for s in stmt.body if s not in methods] or [ast.Pass()]
+            definitions.append((_fingerprint(shell), shell, offset))
+            definitions.extend((_fingerprint(m), m, offset) for m in methods)
+    return definitions
+
+
+def _walk(definitions: Iterable[Tuple[str, ast.AST, int]]) -> Tuple[List[Tuple[FlowEdge, int]], Set[str]]:
+    edges: List[Tuple[FlowEdge, int]] = []
+    defined: Set[str] = set()
+    for _fp, node, offset in definitions:
+        analyzer = FlowAnalyzer()
+        analyzer.walk(node)
+        edges.extend(zip(analyzer.flow_data, (line + offset for line in analyzer.graph.lines)))
+        defined.update(analyzer.defined_functions)
+    return edges, defined
+
+
+def _arity(args: str) -> int:
+    return len(args.split(", ")) if args else 0
+
+
+def _edge_changes(
+    old_edges: List[Tuple[FlowEdge, int]],
+    new_edges: List[Tuple[FlowEdge, int]],
+    path: str,
+) -> List[EdgeChange]:
+    old_counts = Counter(edge for edge, _line in old_edges)
+    new_counts = Counter(edge for edge, _line in new_edges)
+    removed_counts = old_counts - new_counts
+    added_counts = new_counts - old_counts
+
+    # Call sites per (caller, callee), in source order, with their lines.
+    removed: Dict[Tuple[str, str], List[Tuple[str, int]]] = {}
+    for (caller, callee, args), line in old_edges:
+        if removed_counts[(caller, callee, args)] > 0:
+            removed_counts[(caller, callee, args)] -= 1
+            removed.setdefault((caller, callee), []).append((args, line))
+    added: Dict[Tuple[str, str], List[Tuple[str, int]]] = {}
+    for (caller, callee, args), line in new_edges:
+        if added_counts[(caller, callee, args)] > 0:
+            added_counts[(caller, callee, args)] -= 1
+            added.setdefault((caller, callee), []).append((args, line))
+
+    changes: List[EdgeChange] = []
+    for pair in sorted(set(removed) | set(added)):
+        caller, callee = pair
+        gone = removed.get(pair, [])
+        came = added.get(pair, [])
+        # A removed and an added site of the same call with a different argument count: arity change.
+        for (old_args, old_line), (args, line) in zip(gone, came):
+            if _arity(old_args) != _arity(args):
+                changes.append(EdgeChange(ARITY, caller, callee, args, old_args, line, path))
+            else:
+                changes.append(EdgeChange(REMOVED, caller, callee, old_args, "", old_line, path))
+                changes.append(EdgeChange(ADDED, caller, callee, args, "", line, path))
+        paired = min(len(gone), len(came))
+        changes.extend(EdgeChange(REMOVED, caller, callee, args, "", line, path) for args, line in gone[paired:])
+        changes.extend(EdgeChange(ADDED, caller, callee, args, "", line, path) for args, line in came[paired:])
+    return changes
+
+
+def _diff_file(old: Optional[str], new: Optional[str], label: str, result: GraphDiff) -> bool:
+    changed = _changed_units(old, new)
+    if changed is None:
+        return False
+    old_units, new_units = changed
+    if not old_units and not new_units:
+        return True
+
+    old_defs = _definitions(old_units, old or label)
+    new_defs = _definitions(new_units, new or label)
+    if old_defs is None or new_defs is None:
+        return False
+    # Methods of an edited class that did not change themselves cancel out here.
+    old_defs, new_defs = _unmatched(old_defs, new_defs, lambda d: d[0])
+
+    result.analyzed += len(old_defs) + len(new_defs)
+    old_edges, old_defined = _walk(old_defs)
+    new_edges, new_defined = _walk(new_defs)
+    changes = _edge_changes(old_edges, new_edges, label)
+    result.changes.extend(changes)
+    result.added_functions.update(new_defined - old_defined)
+    result.removed_functions.update(old_defined - new_defined)
+    if changes:
+        result.files_changed += 1
+    return True
+
+
+def _same_contents(a: str, b: str) -> bool:
+    try:
+        if os.path.getsize(a) != os.path.getsize(b):
+            return False
+        with open(a, "rb") as fa, open(b, "rb") as fb:
+            return fa.read() == fb.read()
+    except OSError:
+        return False
+
+
+def diff_paths(old: str, new: str) -> Optional[GraphDiff]:
+    """Diff two files, or two directory trees (files matched by relative path).
+
+    Returns None (after printing an error) if a file cannot be read or parsed.
+    """
+
+    result = GraphDiff()
+    with phase("diff") as p:
+        if not os.path.isdir(old) and not os.path.isdir(new):
+            result.files = 1
+            ok = _diff_file(old, new, os.path.basename(new), result)
+        else:
+            old_files = {os.path.relpath(f, old): f for f in iter_python_files([old])} if os.path.isdir(old) else {}
+            new_files = {os.path.relpath(f, new): f for f in iter_python_files([new])} if os.path.isdir(new) else {}
+            ok = True
+            for rel in sorted(set(old_files) | set(new_files)):
+                result.files += 1
+                a = old_files.get(rel)
+                b = new_files.get(rel)
+                if a is not None and b is not None and _same_contents(a, b):
+                    continue
+                ok = _diff_file(a, b, rel, result) and ok
+        p.set(files=result.files, analyzed=result.analyzed, changes=len(result.changes))
+    return result if ok else None
+
+
+def merge_diff(graph: CallGraph, diff: GraphDiff) -> CallGraph:
+    """Copy of the new revision's ``graph`` plus the calls the change removed, so they can be drawn."""
+
+    names = graph.names
+    pair_callers, pair_callees, _pair_of = graph.edge_pairs()
+    present = {(names[c], names[e]) for c, e in zip(pair_callers, pair_callees)}
+    merged = CallGraph()
+    merged.extend(graph)
+    for change in diff.changes:
+        if change.kind == REMOVED and (change.caller, change.callee) not in present:
+            merged.add_edge(change.caller, change.callee, change.args, REMOVED_LINE)
+    return merged
@@ -0,0 +1,353 @@
+import builtins
+import hashlib
+from array import array
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple, Union, overload
+
+FlowEdge = Tuple[str, str, str]  # (caller, callee, args_as_text)
+
+BUILTINS: Set[str] = set(dir(builtins))
+
+
+class EdgeView(Sequence[FlowEdge]):
+    """Read-only ``(caller, callee, args)`` tuple view over a CallGraph's edge columns.
+
+    Tuples are built on access, so code written against the old
+    ``List[FlowEdge]`` keeps working without the graph storing them.
+    """
+
+    def __init__(self, graph: "CallGraph"):
+        self._graph = graph
+
+    def __len__(self) -> int:
+        return len(self._graph.callers)
+
+    @overload
+    def __getitem__(self, index: int) -> FlowEdge: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[FlowEdge]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[FlowEdge, List[FlowEdge]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        g = self._graph
+        return (g.names[g.callers[index]], g.names[g.callees[index]], g.arg_texts[g.arg_ids[index]])
+
+    def __iter__(self) -> Iterator[FlowEdge]:
+        g = self._graph
+        names = g.names
+        arg_texts = g.arg_texts
+        for caller, callee, arg in zip(g.callers, g.callees, g.arg_ids):
+            yield (names[caller], names[callee], arg_texts[arg])
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(a == tuple(b) for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f"EdgeView({len(self)} edges)"
+
+
+class MultiEdge(NamedTuple):
+    caller: str
+    callee: str
+    count: int  # call sites
+    args: Tuple[str, ...]  # distinct argument texts, in first-seen order
+    lines: Tuple[int, ...]  # source lines of the call sites, sorted (0 = unknown)
+
+
+class MultiEdgeView(Sequence[MultiEdge]):
+    """One MultiEdge per distinct (caller, callee) pair, in first-seen order.
+
+    Built from the graph's call-site columns on first access.
+    """
+
+    def __init__(self, graph: "CallGraph"):
+        self._graph = graph
+        self._items: Optional[List[MultiEdge]] = None
+
+    def _build(self) -> List[MultiEdge]:
+        g = self._graph
+        pair_callers, pair_callees, pair_of = g.edge_pairs()
+        counts = [0] * len(pair_callers)
+        args: List[Dict[int, None]] = [{} for _ in range(len(pair_callers))]
+        lines: List[List[int]] = [[] for _ in range(len(pair_callers))]
+        for pair, arg, line in zip(pair_of, g.arg_ids, g.lines):
+            counts[pair] += 1
+            args[pair][arg] = None
+            lines[pair].append(line)
+        names = g.names
+        arg_texts = g.arg_texts
+        return [
+            MultiEdge(names[c], names[e], counts[i], tuple(arg_texts[a] for a in args[i]), tuple(sorted(lines[i])))
+            for i, (c, e) in enumerate(zip(pair_callers, pair_callees))
+        ]
+
+    def _list(self) -> List[MultiEdge]:
+        if self._items is None:
+            self._items = self._build()
+        return self._items
+
+    def __len__(self) -> int:
+        return len(self._graph.edge_pairs()[0])
+
+    @overload
+    def __getitem__(self, index: int) -> MultiEdge: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[MultiEdge]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[MultiEdge, List[MultiEdge]]:
+        return self._list()[index]
+
+    def __iter__(self) -> Iterator[MultiEdge]:
+        return iter(self._list())
+
+    def __repr__(self) -> str:
+        return f"MultiEdgeView({len(self)} caller/callee pairs)"
+
+
+class CallGraph:
+    """Compact call graph: interned names plus int32 edge columns.
+
+    Node names and argument texts are interned to integer IDs; each call site
+    is one row in the ``callers``/``callees``/``arg_ids``/``lines`` arrays.
+    Deduplicated successor/predecessor adjacency is built lazily in CSR form
+    (offsets + targets), so neighbor lookups are a slice instead of a
+    dict-of-sets rebuild.
+    """
+
+    def __init__(self) -> None:
+        self.names: List[str] = []
+        self._name_ids: Dict[str, int] = {}
+        self.arg_texts: List[str] = []
+        self._arg_ids: Dict[str, int] = {}
+
+        self.callers = array("i")
+        self.callees = array("i")
+        self.arg_ids = array("i")
+        self.lines = array("i")  # source line of each call site, 0 if unknown
+
+        self._succ: Optional[Tuple[array, array]] = None
+        self._pred: Optional[Tuple[array, array]] = None
+        self._in_edges: Optional[Tuple[array, array]] = None
+        self._pairs: Optional[Tuple[array, array, array]] = None
+
+    # --- construction ---
+
+    def add_node(self, name: str) -> int:
+        node_id = self._name_ids.get(name)
+        if node_id is None:
+            node_id = len(self.names)
+            self._name_ids[name] = node_id
+            self.names.append(name)
+            self._succ = self._pred = self._in_edges = self._pairs = None
+        return node_id
+
+    def _intern_args(self, text: str) -> int:
+        arg_id = self._arg_ids.get(text)
+        if arg_id is None:
+            arg_id = len(self.arg_texts)
+            self._arg_ids[text] = arg_id
+            self.arg_texts.append(text)
+        return arg_id
+
+    def add_edge(self, caller: str, callee: str, args: str = "", line: int = 0) -> None:
+        self.callers.append(self.add_node(caller))
+        self.callees.append(self.add_node(callee))
+        self.arg_ids.append(self._intern_args(args))
+        self.lines.append(line)
+        self._succ = self._pred = self._in_edges = self._pairs = None
+
+    def extend(self, other: "CallGraph") -> None:
+        # Remap the other graph's IDs into ours instead of going through tuples.
+        node_map = [self.add_node(n) for n in other.names]
+        arg_map = [self._intern_args(a) for a in other.arg_texts]
+        self.callers.extend(node_map[i] for i in other.callers)
+        self.callees.extend(node_map[i] for i in other.callees)
+        self.arg_ids.extend(arg_map[i] for i in other.arg_ids)
+        self.lines.extend(other.lines)
+        self._succ = self._pred = self._in_edges = self._pairs = None
+
+    @classmethod
+    def from_edges(cls, edges: Iterable[FlowEdge], nodes: Iterable[str] = ()) -> "CallGraph":
+        graph = cls()
+        for n in nodes:
+            graph.add_node(n)
+        for caller, callee, args in edges:
+            graph.add_edge(caller, callee, args)
+        return graph
+
+    # --- lookups ---
+
+    @property
+    def edges(self) -> EdgeView:
+        return EdgeView(self)
+
+    @property
+    def multi_edges(self) -> MultiEdgeView:
+        return MultiEdgeView(self)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.names)
+
+    def __len__(self) -> int:
+        return len(self.callers)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._name_ids
+
+    def node_id(self, name: str) -> Optional[int]:
+        return self._name_ids.get(name)
+
+    @staticmethod
+    def _build_csr(sources: array, targets: array, n: int) -> Tuple[array, array]:
+        # Unique (source, target) pairs, sorted, packed into one int per pair.
+        keys = sorted(set(s * n + t for s, t in zip(sources, targets) if s != t))
+        offsets = array("i", [0]) * (n + 1)
+        flat = array("i", [0]) * len(keys)
+        for i, key in enumerate(keys):
+            s, t = divmod(key, n)
+            offsets[s + 1] += 1
+            flat[i] = t
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+        return offsets, flat
+
+    def successor_ids(self, node_id: int) -> array:
+        if self._succ is None:
+            self._succ = self._build_csr(self.callers, self.callees, len(self.names))
+        offsets, flat = self._succ
+        return flat[offsets[node_id]:offsets[node_id + 1]]
+
+    def predecessor_ids(self, node_id: int) -> array:
+        if self._pred is None:
+            self._pred = self._build_csr(self.callees, self.callers, len(self.names))
+        offsets, flat = self._pred
+        return flat[offsets[node_id]:offsets[node_id + 1]]
+
+    def edges_into(self, node_id: int) -> array:
+        """Indices of the call sites whose callee is ``node_id`` (built on first use)."""
+
+        if self._in_edges is None:
+            # Counting sort of edge indices by callee.
+            n = len(self.names)
+            offsets = array("i", [0]) * (n + 1)
+            for callee in self.callees:
+                offsets[callee + 1] += 1
+            for i in range(n):
+                offsets[i + 1] += offsets[i]
+            cursor = offsets[:-1]
+            flat = array("i", [0]) * len(self.callees)
+            for index, callee in enumerate(self.callees):
+                flat[cursor[callee]] = index
+                cursor[callee] += 1
+            self._in_edges = (offsets, flat)
+        offsets, flat = self._in_edges
+        return flat[offsets[node_id]:offsets[node_id + 1]]
+
+    def edge_pairs(self) -> Tuple[array, array, array]:
+        """Distinct (caller, callee) pairs in first-seen order (built on first use).
+
+        Returns (pair callers, pair callees, pair index of each call site).
+        """
+
+        if self._pairs is None:
+            n = len(self.names)
+            index: Dict[int, int] = {}
+            pair_callers = array("i")
+            pair_callees = array("i")
+            pair_of = array("i", [0]) * len(self.callers)
+            for i, (caller, callee) in enumerate(zip(self.callers, self.callees)):
+                key = caller * n + callee
+                pair = index.get(key)
+                if pair is None:
+                    pair = index[key] = len(pair_callers)
+                    pair_callers.append(caller)
+                    pair_callees.append(callee)
+                pair_of[i] = pair
+            self._pairs = (pair_callers, pair_callees, pair_of)
+        return self._pairs
+
+    def successors(self, name: str) -> List[str]:
+        node_id = self._name_ids.get(name)
+        if node_id is None:
+            return []
+        return [self.names[i] for i in self.successor_ids(node_id)]
+
+    def predecessors(self, name: str) -> List[str]:
+        node_id = self._name_ids.get(name)
+        if node_id is None:
+            return []
+        return [self.names[i] for i in self.predecessor_ids(node_id)]
+
+    def fingerprint(self) -> str:
+        """Hash of the node names and deduplicated adjacency (what a layout depends on)."""
+
+        if self._succ is None:
+            self._succ = self._build_csr(self.callers, self.callees, len(self.names))
+        offsets, flat = self._succ
+        h = hashlib.blake2b(digest_size=16)
+        h.update("\0".join(self.names).encode("utf-8"))
+        h.update(offsets.tobytes())
+        h.update(flat.tobytes())
+        return h.hexdigest()
+
+    # --- derived graphs ---
+
+    def filtered(self, keep: Callable[[str], bool]) -> "CallGraph":
+        """Return the subgraph of nodes passing ``keep`` and the edges between them."""
+
+        sub = CallGraph()
+        node_map = [sub.add_node(n) if keep(n) else -1 for n in self.names]
+        arg_map: Dict[int, int] = {}
+        for caller, callee, arg, line in zip(self.callers, self.callees, self.arg_ids, self.lines):
+            c = node_map[caller]
+            e = node_map[callee]
+            if c < 0 or e < 0:
+                continue
+            a = arg_map.get(arg)
+            if a is None:
+                a = arg_map[arg] = sub._intern_args(self.arg_texts[arg])
+            sub.callers.append(c)
+            sub.callees.append(e)
+            sub.arg_ids.append(a)
+            sub.lines.append(line)
+        return sub
+
+    def without_builtins(self) -> "CallGraph":
+        # What the "Hide Built-Ins" toggle shows.
+        return self.filtered(lambda n: n == "Main Script" or n not in BUILTINS)
+
+    # --- serialization ---
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "names": self.names,
+            "arg_texts": self.arg_texts,
+            "callers": self.callers.tolist(),
+            "callees": self.callees.tolist(),
+            "arg_ids": self.arg_ids.tolist(),
+            "lines": self.lines.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, object]) -> "CallGraph":
+        graph = cls()
+        graph.names = list(payload["names"])  # type: ignore[call-overload]
+        graph._name_ids = {n: i for i, n in enumerate(graph.names)}
+        graph.arg_texts = list(payload["arg_texts"])  # type: ignore[call-overload]
+        graph._arg_ids = {a: i for i, a in enumerate(graph.arg_texts)}
+        graph.callers = array("i", payload["callers"])  # type: ignore[arg-type]
+        graph.callees = array("i", payload["callees"])  # type: ignore[arg-type]
+        graph.arg_ids = array("i", payload["arg_ids"])  # type: ignore[arg-type]
+        graph.lines = array("i", payload["lines"])  # type: ignore[arg-type]
+        return graph
+
+    def __getstate__(self) -> Dict[str, object]:
+        # Adjacency caches are cheap to rebuild; don't ship them between processes.
+        state = self.__dict__.copy()
+        state["_succ"] = state["_pred"] = state["_in_edges"] = state["_pairs"] = None
+        return state
@@ -1,39 +1,88 @@
-import builtins
+import math
 import os
 import tkinter as tk
+from collections import OrderedDict
 from tkinter import filedialog, messagebox
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 from PIL import Image, ImageTk
 
-from main import FlowEdge, analyze_flow
+from diff import ADDED, ARITY, CHANGED, REMOVED, REMOVED_LINE, GraphDiff, merge_diff
+from graph import CallGraph
+from heat import RUNTIME_ONLY, Heat, hottest_paths, is_heat_file, load_heat, merge_heat, runtime_only_pairs
+from cluster import GROUPINGS, ClusterKey, ClusterView, cluster_view
+from jobs import AnalysisJob
+from layout import available_engines, cached_layout, compute_layout, layout_cache, layout_key, node_size
+from profiling import PhaseStats, phase, subscribe
+from query import CallIndex
+from search import NameIndex
+from snapshot import is_snapshot, load_snapshot
+from viewport import SpatialGrid
+from watch import FileWatcher
 
 # Theme
 BG = "#4a4a4a"  # grey
 PANEL_BG = "#3f3f3f"
 NODE_BG = "#2f2f2f"
 ORANGE = "#ff8c00"  # bright orange
-
-BUILTINS: Set[str] = set(dir(builtins))
+DIM = "#7a5b3a"  # nodes/edges outside the highlighted neighborhood
+FOCUS_BG = "#5a3a12"
+CLUSTER_BG = "#3a3326"  # collapsed cluster nodes
+# Measured cost from a runtime trace, cold to hot; COLD marks what was not measured
+# (never ran, or outside the traced code such as built-ins).
+HEAT_COLORS = ("#a07a4a", "#d08a30", "#ff8c00", "#ff5a1f", "#ff2020")
+COLD = "#8c8c8c"
+RUNTIME_ONLY_DASH = (6, 4)  # calls seen at runtime that are not in the source
+HOT_PATHS = 20  # rows in the "Hot Paths" panel
+# Diff against an older revision: call pairs and functions by what the change did to them.
+DIFF_COLORS = {ADDED: "#5cd65c", REMOVED: "#ff4040", ARITY: "#ffd700", CHANGED: "#5ab4ff"}
+UNCHANGED = "#8c8c8c"
+REMOVED_DASH = (4, 4)
+
+WATCH_INTERVAL_MS = 500
+JOB_POLL_MS = 16  # ~60 fps while a background analysis is running
+
+# Above this many nodes only items near the visible part of the canvas are created.
+VIRTUALIZE_THRESHOLD = 1500
+VIEWPORT_MARGIN = 400
+
+TOOLTIP_CACHE_SIZE = 256
+
+SEARCH_RESULTS = 50  # rows in the search result list
+
+# Clicking a node highlights its callers and callees up to this many calls away.
+NEIGHBORHOOD_DEPTH = 2
+CLICK_SLOP = 4  # pixels the mouse may move between press and release and still count as a click
+
+ZOOM_STEP = 1.2
+ZOOM_MIN = 0.05
+ZOOM_MAX = 4.0
+# Below this zoom nodes are drawn as plain rectangles without labels (cheaper, and unreadable anyway).
+LABEL_ZOOM = 0.5
 
 def _is_python_file(path: str) -> bool:
     return isinstance(path, str) and path.lower().endswith(".py") and os.path.isfile(path)
 
+def _is_snapshot_file(path: str) -> bool:
+    return isinstance(path, str) and is_snapshot(path) and os.path.isfile(path)
+
+def _is_trace_file(path: str) -> bool:
+    return isinstance(path, str) and is_heat_file(path) and os.path.isfile(path)
+
+def _heat_level(seconds: Optional[float], top: float) -> int:
+    # Index into HEAT_COLORS, one step per 4x less time than the hottest; -1 if not measured.
+    if seconds is None:
+        return -1
+    if seconds <= 0 or top <= 0:
+        return 0
+    return max(0, len(HEAT_COLORS) - 1 + math.floor(math.log(seconds / top, 4)))
+
 def _clean_dnd_path(path: str) -> str:
     # On Windows tkinterdnd2 may wrap paths in braces if they contain spaces.
     return path.strip().strip("{}")
 
-def _create_rounded_rect(
-    canvas: tk.Canvas,
-    x0: int,
-    y0: int,
-    x1: int,
-    y1: int,
-    radius: int,
-    **kwargs,
-):
-    # Approximate a rounded rectangle using a smoothed polygon.
+def _rounded_rect_points(x0: int, y0: int, x1: int, y1: int, radius: int) -> List[int]:
     r = max(0, min(radius, abs(x1 - x0) // 2, abs(y1 - y0) // 2))
-    points = [
+    return [
         x0 + r,
         y0,
         x1 - r,
@@ -59,54 +108,19 @@ def _create_rounded_rect(
         x0,
         y0,
     ]
-    return canvas.create_polygon(points, smooth=True, splinesteps=16, **kwargs)
 
-def _compute_layout(nodes: Set[str], edges: List[FlowEdge]) -> Dict[str, Tuple[int, int]]:
-    # Simple left-to-right layered layout (good enough for v1).
-    start = "Main Script"
-
-    adj: Dict[str, Set[str]] = {n: set() for n in nodes}
-    for caller, callee, _ in edges:
-        adj.setdefault(caller, set()).add(callee)
-        adj.setdefault(callee, set())
-
-    # Level assignment via BFS from start.
-    levels: Dict[str, int] = {start: 0}
-    queue: List[str] = [start]
-    while queue:
-        u = queue.pop(0)
-        for v in adj.get(u, set()):
-            candidate = levels[u] + 1
-            if v not in levels or candidate < levels[v]:
-                levels[v] = candidate
-                queue.append(v)
-
-    # Any disconnected nodes go after the connected component.
-    max_level = max(levels.values()) if levels else 0
-    for n in sorted(nodes):
-        if n not in levels:
-            max_level += 1
-            levels[n] = max_level
-
-    buckets: Dict[int, List[str]] = {}
-    for n, lvl in levels.items():
-        buckets.setdefault(lvl, []).append(n)
-    for lvl in buckets:
-        buckets[lvl].sort()
-
-    dx = 260
-    dy = 120
-    margin_x = 120
-    margin_y = 120
-
-    pos: Dict[str, Tuple[int, int]] = {}
-    for lvl in sorted(buckets.keys()):
-        for i, n in enumerate(buckets[lvl]):
-            x = margin_x + lvl * dx
-            y = margin_y + i * dy
-            pos[n] = (x, y)
-
-    return pos
+def _create_rounded_rect(
+    canvas: tk.Canvas,
+    x0: int,
+    y0: int,
+    x1: int,
+    y1: int,
+    radius: int,
+    **kwargs,
+):
+    # Approximate a rounded rectangle using a smoothed polygon.
+    points = _rounded_rect_points(x0, y0, x1, y1, radius)
+    return canvas.create_polygon(points, smooth=True, splinesteps=16, **kwargs)
 
 class ProFlowGUI:
     def __init__(self, root: tk.Tk, dnd_available: bool):
@@ -115,11 +129,83 @@ class ProFlowGUI:
         self.selected_file: Optional[str] = None
 
         self.hide_builtins_var = tk.BooleanVar(value=False)
-        self._last_nodes: Set[str] = set()
-        self._last_edges: List[FlowEdge] = []
+        self.watch_var = tk.BooleanVar(value=False)
+        self.layout_engine_var = tk.StringVar(value="layered")
+        self.grouping_var = tk.StringVar(value="none")
+        # Pickled watch.IncrementalAnalysis of the open file; only the job worker unpickles it.
+        self._watch_state: Optional[bytes] = None
+        self._watch_missed = False  # a watch update job was superseded before it finished
+        self._watcher: Optional[FileWatcher] = None
+        self._watch_after_id: Optional[str] = None
+        self._last_graph: Optional[CallGraph] = None
         self._last_assigned_to_by_callee: Dict[str, Set[str]] = {}
-        self._tooltip_items: List[int] = []
-        self._node_meta: Dict[str, Dict[str, List[str]]] = {}
+        self._last_owners: Dict[str, ClusterKey] = {}
+        self._last_layout: Optional[Dict[str, object]] = None  # {"engine", "pos"} stored in an opened snapshot
+        # Runtime trace or cProfile dump laid over the diagram; _last_graph stays the static graph.
+        self._heat: Optional[Heat] = None
+        self._hot_paths: List[Tuple[float, List[str]]] = []
+        # Older revision the open file is compared with, and the call changes since then.
+        self._diff: Optional[GraphDiff] = None
+        self._diff_base: Optional[str] = None
+        # Clusters the user expanded (double-click) under the current grouping.
+        self._expanded: Set[ClusterKey] = set()
+        self._view: Optional[ClusterView] = None
+        # One persistent tooltip (rounded box + text), moved and re-filled in place while hovering.
+        self._tooltip_items: Optional[Tuple[int, int]] = None
+        self._tooltip_node: Optional[str] = None  # node the tooltip should show (None = hidden)
+        self._tooltip_shown: Optional[str] = None  # node whose text is currently in the tooltip
+        self._tooltip_size = (0, 0)
+        self._tooltip_xy = (0, 0)  # last pointer position, window coordinates
+        self._tooltip_pending = False
+        # Tooltip text is built on hover from the drawn graph and kept in a small LRU.
+        self._tooltip_cache: "OrderedDict[str, str]" = OrderedDict()
+        self._drawn_assigned: Dict[str, Set[str]] = {}
+
+        # Drawn graph + canvas item bookkeeping (items are recycled when virtualized).
+        self._drawn_graph: Optional[CallGraph] = None
+        self._pos: Dict[str, Tuple[int, int]] = {}
+        self._virtual = False
+        self._node_grid = SpatialGrid()
+        self._edge_grid = SpatialGrid()
+        self._node_items: Dict[int, Tuple[int, int]] = {}  # node id -> (shape, text)
+        self._edge_items: Dict[int, int] = {}  # (caller, callee) pair index -> line
+        self._pair_counts: List[int] = []  # per pair: call sites it stands for
+        # With a trace laid over: per pair / per node HEAT_COLORS index (-1 = not measured).
+        self._pair_heat: List[int] = []
+        self._node_heat: List[int] = []
+        self._pair_runtime_only: List[bool] = []
+        # With a diff laid over: per pair / per node status (ADDED, REMOVED, ARITY, CHANGED or "").
+        self._pair_diff: List[str] = []
+        self._node_diff: List[str] = []
+        self._item_nodes: Dict[int, str] = {}  # shape/text item -> node name
+        self._free_node_items: List[Tuple[int, int]] = []
+        self._free_edge_items: List[int] = []
+        self._viewport_pending = False
+
+        # Find box: name index over the analyzed graph, built once per analysis (on first use).
+        self._name_index: Optional[NameIndex] = None
+        self._name_index_graph: Optional[CallGraph] = None
+        self._search_results: List[str] = []
+
+        # Click-to-highlight: reachability index over the drawn graph, built on first click.
+        self._index: Optional[CallIndex] = None
+        self._focus: Optional[str] = None
+        self._highlight: Optional[Set[int]] = None  # drawn node ids; None = nothing highlighted
+        self._press_xy = (0, 0)
+
+        # Canvas coordinates are layout coordinates times the zoom factor.
+        self._zoom = 1.0
+        self._bounds = (0, 0, 0, 0)  # scrollregion at zoom 1
+
+        self._job: Optional[AnalysisJob] = None
+        self._job_after_id: Optional[str] = None
+        self._job_label = ""
+        self._job_keep_view = False
+
+        # Phase timings of the last analysis/redraw: worker records are merged into the local ones.
+        self._stats = PhaseStats()
+        subscribe(self._stats)
+        self._stats_visible = False
 
         self.root.title("ProFlow")
         self.root.geometry("980x620")
@@ -142,6 +228,25 @@ class ProFlowGUI:
         )
         self.logo_label.pack(side="left", padx=14, pady=10)
 
+        # Find a function by name: results update while typing, choosing one jumps to it.
+        self.search_var = tk.StringVar(value="")
+        self.search_entry = tk.Entry(
+            self.controls,
+            textvariable=self.search_var,
+            bg=BG,
+            fg=ORANGE,
+            insertbackground=ORANGE,
+            font=("Helvetica", 12),
+            relief="sunken",
+            width=18,
+        )
+        self.search_entry.pack(side="left", padx=(0, 10), pady=10)
+        self.search_var.trace_add("write", lambda *_args: self._on_search_changed())
+        self.search_entry.bind("<FocusIn>", lambda _e: self._search_index())
+        self.search_entry.bind("<Return>", lambda _e: self._choose_search_result(0))
+        self.search_entry.bind("<Down>", lambda _e: self._focus_search_results())
+        self.search_entry.bind("<Escape>", lambda _e: self.search_var.set(""))
+
         self.open_btn = tk.Button(
             self.controls,
             text="Open Python File",
@@ -170,6 +275,35 @@ class ProFlowGUI:
         )
         self.clear_btn.pack(side="right", padx=(0, 5), pady=10)
 
+        self.cancel_btn = tk.Button(
+            self.controls,
+            text="Cancel",
+            command=self.cancel_analysis,
+            bg=BG,
+            fg=ORANGE,
+            font=("Helvetica", 12, "bold"),
+            activebackground=BG,
+            activeforeground=ORANGE,
+            relief="raised",
+            width=8,
+            state="disabled",
+        )
+        self.cancel_btn.pack(side="right", padx=(0, 5), pady=10)
+
+        self.diff_btn = tk.Button(
+            self.controls,
+            text="Diff Against...",
+            command=self.open_diff_dialog,
+            bg=BG,
+            fg=ORANGE,
+            font=("Helvetica", 12, "bold"),
+            activebackground=BG,
+            activeforeground=ORANGE,
+            relief="raised",
+            width=13,
+        )
+        self.diff_btn.pack(side="right", padx=(0, 5), pady=10)
+
         self.hide_builtins_btn = tk.Checkbutton(
             self.controls,
             text="Hide Built-Ins",
@@ -185,6 +319,57 @@ class ProFlowGUI:
         )
         self.hide_builtins_btn.pack(side="right", padx=(0, 10), pady=10)
 
+        self.watch_btn = tk.Checkbutton(
+            self.controls,
+            text="Watch File",
+            variable=self.watch_var,
+            command=self._toggle_watch,
+            bg=BG,
+            fg=ORANGE,
+            font=("Helvetica", 12, "bold"),
+            activebackground=PANEL_BG,
+            activeforeground=ORANGE,
+            selectcolor=BG,
+            relief="raised",
+        )
+        self.watch_btn.pack(side="right", padx=(0, 10), pady=10)
+
+        self.layout_menu = tk.OptionMenu(
+            self.controls,
+            self.layout_engine_var,
+            *available_engines(),
+            command=lambda _engine: self._redraw_last(),
+        )
+        self.layout_menu.configure(
+            bg=BG,
+            fg=ORANGE,
+            font=("Helvetica", 12, "bold"),
+            activebackground=PANEL_BG,
+            activeforeground=ORANGE,
+            highlightthickness=0,
+            relief="raised",
+        )
+        self.layout_menu["menu"].configure(bg=BG, fg=ORANGE, activebackground=PANEL_BG, activeforeground=ORANGE)
+        self.layout_menu.pack(side="right", padx=(0, 10), pady=10)
+
+        self.grouping_menu = tk.OptionMenu(
+            self.controls,
+            self.grouping_var,
+            *GROUPINGS,
+            command=lambda _grouping: self._change_grouping(),
+        )
+        self.grouping_menu.configure(
+            bg=BG,
+            fg=ORANGE,
+            font=("Helvetica", 12, "bold"),
+            activebackground=PANEL_BG,
+            activeforeground=ORANGE,
+            highlightthickness=0,
+            relief="raised",
+        )
+        self.grouping_menu["menu"].configure(bg=BG, fg=ORANGE, activebackground=PANEL_BG, activeforeground=ORANGE)
+        self.grouping_menu.pack(side="right", padx=(0, 10), pady=10)
+
         self.status_var = tk.StringVar(value="Drop a .py file into the window, or click 'Open Python File...'.")
         self.status_label = tk.Label(
             self.root,
@@ -201,6 +386,76 @@ class ProFlowGUI:
         self.hint_label = tk.Label(self.root, text=hint_text, bg=BG, fg=ORANGE, font=("Helvetica", 9))
         self.hint_label.pack(side="top", fill="x", padx=10, pady=(2, 8))
 
+        # Collapsible per-phase timing readout and hot path list
+        self.panel_bar = tk.Frame(self.root, bg=BG)
+        self.panel_bar.pack(side="top", fill="x", padx=10)
+        self.stats_btn = tk.Button(
+            self.panel_bar,
+            text="Stats \u25b8",
+            command=self._toggle_stats,
+            bg=BG,
+            fg=ORANGE,
+            font=("Helvetica", 9),
+            activebackground=BG,
+            activeforeground=ORANGE,
+            relief="flat",
+            bd=0,
+        )
+        self.stats_btn.pack(side="left")
+        self.stats_label = tk.Label(
+            self.root,
+            text="",
+            bg=PANEL_BG,
+            fg=ORANGE,
+            font=("Courier", 9),
+            justify="left",
+            anchor="w",
+        )
+
+        self.paths_btn = tk.Button(
+            self.panel_bar,
+            text="Hot Paths \u25b8",
+            command=self._toggle_hot_paths,
+            bg=BG,
+            fg=ORANGE,
+            font=("Helvetica", 9),
+            activebackground=BG,
+            activeforeground=ORANGE,
+            relief="flat",
+            bd=0,
+        )
+        self.paths_btn.pack(side="left", padx=(12, 0))
+        self.paths_list = tk.Listbox(
+            self.root,
+            bg=PANEL_BG,
+            fg=ORANGE,
+            font=("Courier", 9),
+            height=8,
+            selectbackground=FOCUS_BG,
+            selectforeground=ORANGE,
+            highlightthickness=0,
+            relief="flat",
+            activestyle="none",
+        )
+        self.paths_list.bind("<<ListboxSelect>>", self._on_hot_path_select)
+        self._paths_visible = False
+
+        self.search_list = tk.Listbox(
+            self.root,
+            bg=PANEL_BG,
+            fg=ORANGE,
+            font=("Courier", 9),
+            height=8,
+            selectbackground=FOCUS_BG,
+            selectforeground=ORANGE,
+            highlightthickness=0,
+            relief="flat",
+            activestyle="none",
+        )
+        self.search_list.bind("<<ListboxSelect>>", self._on_search_select)
+        self.search_list.bind("<Return>", self._on_search_select)
+        self._search_visible = False
+
         # Diagram canvas + scrollbars
         self.diagram_frame = tk.Frame(self.root, bg=BG)
         self.diagram_frame.pack(side="top", fill="both", expand=True)
@@ -212,8 +467,8 @@ class ProFlowGUI:
             self.diagram_frame,
             bg=BG,
             highlightthickness=0,
-            xscrollcommand=self.x_scroll.set,
-            yscrollcommand=self.y_scroll.set,
+            xscrollcommand=self._on_xscroll,
+            yscrollcommand=self._on_yscroll,
         )
 
         self.x_scroll.config(command=self.canvas.xview)
@@ -238,10 +493,28 @@ class ProFlowGUI:
         self._center_watermark()
 
         # Built-in canvas panning (click + drag)
-        self.canvas.bind("<ButtonPress-1>", lambda e: self.canvas.scan_mark(e.x, e.y))
+        self.canvas.bind("<ButtonPress-1>", self._on_press)
         self.canvas.bind("<B1-Motion>", lambda e: self.canvas.scan_dragto(e.x, e.y, gain=1))
+        self.canvas.bind("<ButtonRelease-1>", self._on_click)
         self.root.bind("<Configure>", lambda _e: self._center_watermark())
 
+        # Hover tooltips are bound once on the shared "node" tag; items map back to nodes.
+        self.canvas.tag_bind("node", "<Enter>", self._on_node_hover)
+        self.canvas.tag_bind("node", "<Motion>", self._on_node_hover)
+        self.canvas.tag_bind("node", "<Leave>", self._on_node_leave)
+        # Double-click expands a collapsed cluster, or collapses the cluster a node belongs to.
+        self.canvas.tag_bind("node", "<Double-Button-1>", self._on_node_double_click)
+
+        # Zoom: mouse wheel around the pointer, keys around the view center.
+        self.canvas.bind("<MouseWheel>", lambda e: self._zoom_by(ZOOM_STEP if e.delta > 0 else 1 / ZOOM_STEP, e.x, e.y))
+        self.canvas.bind("<Button-4>", lambda e: self._zoom_by(ZOOM_STEP, e.x, e.y))
+        self.canvas.bind("<Button-5>", lambda e: self._zoom_by(1 / ZOOM_STEP, e.x, e.y))
+        for key in ("<Control-plus>", "<Control-equal>", "<Control-KP_Add>"):
+            self.root.bind(key, lambda _e: self._zoom_by(ZOOM_STEP))
+        for key in ("<Control-minus>", "<Control-KP_Subtract>"):
+            self.root.bind(key, lambda _e: self._zoom_by(1 / ZOOM_STEP))
+        self.root.bind("<Control-0>", lambda _e: self._zoom_by(1 / self._zoom))
+
     def _center_watermark(self):
         w = self.canvas.winfo_width()
         h = self.canvas.winfo_height()
@@ -249,6 +522,8 @@ class ProFlowGUI:
             self.canvas.coords(self.watermark_id, w // 2, h // 2)
 
     def clear_diagram(self):
+        self._stop_job()
+        self._stop_watch()
         self.canvas.delete("flow")
         self._hide_tooltip()
 
@@ -257,60 +532,66 @@ class ProFlowGUI:
         self.canvas.configure(scrollregion=(0, 0, 0, 0))
         self.status_var.set("Drop a .py file into the window, or click 'Open Python File...'.")
 
-        self._last_nodes = set()
-        self._last_edges = []
+        self._last_graph = None
         self._last_assigned_to_by_callee = {}
-        self._node_meta = {}
+        self._last_owners = {}
+        self._last_layout = None
+        self._set_heat(None)
+        self._set_diff(None)
+        self._expanded = set()
+        self._reset_items()
+        self.search_var.set("")
 
     def open_file_dialog(self):
         path = filedialog.askopenfilename(
-            title="Select a Python file",
-            filetypes=[("Python files", "*.py"), ("All files", "*.*")],
+            title="Select a Python file or snapshot",
+            filetypes=[
+                ("Python files", "*.py"),
+                ("ProFlow snapshots", "*.pfsnap"),
+                ("Traces and cProfile dumps", "*.pftrace *.prof *.pstats"),
+                ("All files", "*.*"),
+            ],
         )
         if not path:
             return
         self._handle_file(path)
 
-    def _build_node_meta(self, nodes: Set[str], edges: List[FlowEdge], assigned_to_by_callee: Dict[str, Set[str]]):
-        called_with: Dict[str, Set[str]] = {}
-        for _caller, callee, args in edges:
-            if args:
-                called_with.setdefault(callee, set()).add(args)
-
-        meta: Dict[str, Dict[str, List[str]]] = {}
-        for n in nodes:
-            meta[n] = {
-                "called_with": sorted(called_with.get(n, set())),
-                "assigned_to": sorted(assigned_to_by_callee.get(n, set())),
-            }
-        self._node_meta = meta
-
-    def _filter_graph(self, nodes: Set[str], edges: List[FlowEdge]) -> Tuple[Set[str], List[FlowEdge]]:
-        if not self.hide_builtins_var.get():
-            return nodes, edges
-
-        filtered_nodes = set(n for n in nodes if (n == "Main Script" or n not in BUILTINS))
-        filtered_edges = [
-            (caller, callee, args)
-            for (caller, callee, args) in edges
-            if caller in filtered_nodes and callee in filtered_nodes
-        ]
-        return filtered_nodes, filtered_edges
-
-    def _hide_tooltip(self):
-        for item in self._tooltip_items:
-            try:
-                self.canvas.delete(item)
-            except Exception:
-                pass
-        self._tooltip_items = []
-
-    def _show_tooltip(self, node: str, event):
-        self._hide_tooltip()
-
-        info = self._node_meta.get(node, {})
-        called_with = info.get("called_with", [])
-        assigned_to = info.get("assigned_to", [])
+    def open_diff_dialog(self):
+        if self._last_graph is None or not self.selected_file:
+            messagebox.showerror("ProFlow", "Open the Python file first, then the older revision to compare it with.")
+            return
+        path = filedialog.askopenfilename(
+            title="Select the older revision to compare with",
+            filetypes=[("Python files", "*.py"), ("All files", "*.*")],
+        )
+        if not path:
+            return
+        self._open_diff(_clean_dnd_path(path))
+
+    def _tooltip_text(self, node: str) -> str:
+        text = self._tooltip_cache.get(node)
+        if text is not None:
+            self._tooltip_cache.move_to_end(node)
+            return text
+
+        view = self._view
+        if view is not None and node in view.clusters:
+            text = self._cluster_tooltip_text(node, view)
+            self._tooltip_cache[node] = text
+            return text
+
+        called_with: List[str] = []
+        call_sites: Dict[str, List[int]] = {}  # caller -> call lines
+        graph = self._drawn_graph
+        node_id = graph.node_id(node) if graph is not None else None
+        if graph is not None and node_id is not None:
+            arg_texts = graph.arg_texts
+            arg_ids = graph.arg_ids
+            incoming = graph.edges_into(node_id)
+            called_with = sorted(set(arg_texts[arg_ids[e]] for e in incoming) - {""})
+            for e in incoming:
+                call_sites.setdefault(graph.names[graph.callers[e]], []).append(graph.lines[e])
+        assigned_to = sorted(self._drawn_assigned.get(node, set()))
 
         lines: List[str] = []
         label = "Start" if node == "Main Script" else node
@@ -324,6 +605,37 @@ class ProFlowGUI:
             if len(called_with) > 10:
                 lines.append(f"  +{len(called_with) - 10} more")
 
+        if call_sites:
+            lines.append("")
+            lines.append("Called from:")
+            for caller, call_lines in sorted(call_sites.items(), key=lambda item: (-len(item[1]), item[0]))[:8]:
+                name = "Start" if caller == "Main Script" else caller
+                known = sorted(n for n in call_lines if n > 0)
+                count = f" x{len(call_lines)}" if len(call_lines) > 1 else ""
+                where = ""
+                if known:
+                    where = ", ".join(str(n) for n in known[:6]) + (", ..." if len(known) > 6 else "")
+                    where = f" (line{'s' if len(known) > 1 else ''} {where})"
+                elif all(n == RUNTIME_ONLY for n in call_lines):
+                    where = " (runtime only, not in source)"
+                elif all(n == REMOVED_LINE for n in call_lines):
+                    where = " (removed by the change)"
+                lines.append(f"  {name}{count}{where}")
+            if len(call_sites) > 8:
+                lines.append(f"  +{len(call_sites) - 8} more")
+
+        if self._heat is not None:
+            cost = self._heat.nodes.get(node)
+            lines.append("")
+            lines.append("Measured:")
+            if cost is None:
+                lines.append("  not measured (never ran, or outside the traced code)")
+            else:
+                lines.append(f"  {cost.calls} call{'s' if cost.calls != 1 else ''}, {cost.cumulative:.4f}s total, {cost.own:.4f}s own")
+
+        if self._diff is not None:
+            lines.extend(self._diff_tooltip_lines(node))
+
         if assigned_to:
             lines.append("")
             lines.append("Variable Assignment:")
@@ -337,160 +649,1044 @@ class ProFlowGUI:
             lines.append("No metadata")
 
         text = "\n".join(lines)
-
-        cx = int(self.canvas.canvasx(event.x))
-        cy = int(self.canvas.canvasy(event.y))
-
-        pad = 10
-        text_id = self.canvas.create_text(
-            cx + 20,
-            cy + 20,
-            text=text,
-            fill=ORANGE,
-            font=("Helvetica", 9),
-            anchor="nw",
-            tags=("flow", "tooltip"),
-        )
-        bbox = self.canvas.bbox(text_id)
-        if not bbox:
-            return
-        x0, y0, x1, y1 = bbox
-        rect_id = _create_rounded_rect(
-            self.canvas,
-            x0 - pad,
-            y0 - pad,
-            x1 + pad,
-            y1 + pad,
-            radius=10,
-            fill=PANEL_BG,
-            outline=ORANGE,
-            width=2,
-            tags=("flow", "tooltip"),
+        self._tooltip_cache[node] = text
+        if len(self._tooltip_cache) > TOOLTIP_CACHE_SIZE:
+            self._tooltip_cache.popitem(last=False)
+        return text
+
+    def _diff_tooltip_lines(self, node: str) -> List[str]:
+        diff = self._diff
+        assert diff is not None
+        if node in diff.added_functions:
+            state = "added by the change"
+        elif node in diff.removed_functions:
+            state = "removed by the change"
+        else:
+            state = ""
+        markers = {ADDED: "+", REMOVED: "-", ARITY: "~"}
+        changes = []
+        for change in diff.changes:
+            if node not in (change.caller, change.callee):
+                continue
+            other = change.callee if change.caller == node else change.caller
+            other = "Start" if other == "Main Script" else other
+            direction = "calls" if change.caller == node else "called by"
+            args = f"({change.old_args}) -> ({change.args})" if change.kind == ARITY else f"({change.args})"
+            changes.append(f"  {markers[change.kind]} {direction} {other} {args}")
+        lines = ["", f"Diff ({self._diff_label()}):"]
+        if state:
+            lines.append(f"  {state}")
+        lines.extend(changes[:10])
+        if len(changes) > 10:
+            lines.append(f"  +{len(changes) - 10} more")
+        if not state and not changes:
+            lines.append("  no call changes")
+        return lines
+
+    def _cluster_tooltip_text(self, node: str, view: ClusterView) -> str:
+        members = sorted(view.members[node])
+        lines = [" / ".join(view.clusters[node]), "", f"Members ({len(members)}):"]
+        for name in members[:12]:
+            lines.append(f"  {name}")
+        if len(members) > 12:
+            lines.append(f"  +{len(members) - 12} more")
+        lines.append("")
+        lines.append(f"Calls inside: {view.internal.get(node, 0)}")
+        lines.append("Double-click to expand")
+        return "\n".join(lines)
+
+    def _filter_graph(self, graph: CallGraph) -> CallGraph:
+        if not self.hide_builtins_var.get():
+            return graph
+
+        with phase("filter", nodes=graph.node_count):
+            return graph.without_builtins()
+
+    def _toggle_hot_paths(self):
+        self._paths_visible = not self._paths_visible
+        if self._paths_visible:
+            self.paths_btn.configure(text="Hot Paths \u25be")
+            self.paths_list.pack(side="top", fill="x", padx=10, pady=(0, 6), before=self.diagram_frame)
+            self._update_hot_paths()
+        else:
+            self.paths_btn.configure(text="Hot Paths \u25b8")
+            self.paths_list.pack_forget()
+
+    def _update_hot_paths(self):
+        if not self._paths_visible:
+            return
+        self.paths_list.delete(0, "end")
+        if self._heat is None:
+            self.paths_list.insert("end", "Open a .pftrace trace or a cProfile .prof dump to rank call paths by measured time.")
+            return
+        for seconds, names in self._hot_paths:
+            labels = ("Start" if n == "Main Script" else n for n in names)
+            self.paths_list.insert("end", f"{seconds:9.4f}s  {' -> '.join(labels)}")
+        if not self._hot_paths:
+            self.paths_list.insert("end", "No measured call paths.")
+
+    def _on_hot_path_select(self, _event):
+        selection = self.paths_list.curselection()
+        graph = self._drawn_graph
+        if not selection or graph is None or selection[0] >= len(self._hot_paths):
+            return
+        seconds, names = self._hot_paths[selection[0]]
+        # Functions hidden (built-ins) or collapsed into a cluster are not on the canvas.
+        drawn = [graph.node_id(n) for n in names if n in graph]
+        if not drawn:
+            self.status_var.set("That path is not drawn (hidden or inside a collapsed cluster).")
+            return
+        self._focus = names[-1]
+        self._highlight = set(drawn)  # type: ignore[arg-type]
+        self._apply_highlight()
+        labels = " -> ".join("Start" if n == "Main Script" else n for n in names)
+        self.status_var.set(f"Hot path ({seconds:.4f}s through its lightest call): {labels}. (Click empty space to clear)")
+
+    def _set_heat(self, heat: Optional[Heat]):
+        self._heat = heat
+        with phase("hot_paths"):
+            self._hot_paths = hottest_paths(heat, HOT_PATHS) if heat is not None else []
+        self._update_hot_paths()
+
+    def _set_diff(self, diff: Optional[GraphDiff], base: Optional[str] = None):
+        self._diff = diff
+        self._diff_base = base if diff is not None else None
+
+    def _diff_label(self) -> str:
+        return f"vs {os.path.basename(self._diff_base)}" if self._diff_base else "vs older revision"
+
+    def _diff_summary(self) -> str:
+        diff = self._diff
+        assert diff is not None
+        counts = diff.counts()
+        return (
+            f"Compared with {os.path.basename(self._diff_base or '')}: +{counts[ADDED]} / -{counts[REMOVED]} / "
+            f"~{counts[ARITY]} calls (re-analyzed {diff.analyzed} changed definitions). "
+            "Green = added, red dashed = removed, yellow = changed arity, blue = call sites changed."
         )
-        self.canvas.tag_raise(text_id, rect_id)
-        self._tooltip_items = [rect_id, text_id]
 
-    def _draw_flow(self, nodes: Set[str], edges: List[FlowEdge], assigned_to_by_callee: Dict[str, Set[str]]):
-        self.canvas.delete("flow")
-        self._hide_tooltip()
-        self.canvas.itemconfigure(self.watermark_id, state="hidden")
-
-        nodes, edges = self._filter_graph(nodes, edges)
-        self._build_node_meta(nodes, edges, assigned_to_by_callee)
+    def _search_index(self) -> Optional[NameIndex]:
+        graph = self._last_graph
+        if graph is None:
+            return None
+        if self._name_index is None or self._name_index_graph is not graph:
+            with phase("search_index", nodes=graph.node_count):
+                self._name_index = NameIndex(["Start" if n == "Main Script" else n for n in graph.names])
+            self._name_index_graph = graph
+        return self._name_index
+
+    def _show_search_results(self, visible: bool):
+        if visible and not self._search_visible:
+            self.search_list.pack(side="top", fill="x", padx=10, pady=(0, 6), before=self.diagram_frame)
+        elif not visible and self._search_visible:
+            self.search_list.pack_forget()
+        self._search_visible = visible
+
+    def _on_search_changed(self):
+        query = self.search_var.get()
+        index = self._search_index() if query.strip() else None
+        if index is None:
+            self._search_results = []
+            self._show_search_results(False)
+            return
+        labels, total = index.search(query, SEARCH_RESULTS)
+        self._search_results = ["Main Script" if label == "Start" else label for label in labels]
+        self.search_list.delete(0, "end")
+        for label in labels:
+            self.search_list.insert("end", label)
+        if total > len(labels):
+            self.search_list.insert("end", f"+{total - len(labels)} more, keep typing to narrow down")
+        elif not labels:
+            self.search_list.insert("end", "No function matches.")
+        self._show_search_results(True)
+
+    def _focus_search_results(self):
+        if self._search_results:
+            self.search_list.focus_set()
+            self.search_list.selection_clear(0, "end")
+            self.search_list.selection_set(0)
+            self.search_list.activate(0)
+
+    def _on_search_select(self, _event):
+        selection = self.search_list.curselection()
+        if selection:
+            self._choose_search_result(selection[0])
+
+    def _choose_search_result(self, row: int):
+        if row < len(self._search_results):
+            self._go_to_node(self._search_results[row])
+
+    def _go_to_node(self, name: str):
+        """Scroll the canvas to ``name`` and highlight it with its direct callers and callees."""
+
+        graph = self._drawn_graph
+        if graph is None:
+            return
+        node = name
+        view = self._view
+        if name not in graph and view is not None:
+            # Inside a collapsed cluster: go to the cluster.
+            node = next((n for n, members in view.members.items() if name in members), name)
+        node_id = graph.node_id(node)
+        label = "Start" if name == "Main Script" else name
+        if node_id is None:
+            self.status_var.set(f"{label} is not drawn (hidden built-in).")
+            return
 
-        pos = _compute_layout(nodes, edges)
+        callers = graph.predecessor_ids(node_id)
+        callees = graph.successor_ids(node_id)
+        self._focus = node
+        self._highlight = {node_id, *callers, *callees}
+        self._apply_highlight()
+
+        # Center the node in the window.
+        z = self._zoom
+        x, y = self._pos.get(node, (0, 0))
+        rx0, ry0, rx1, ry1 = (v * z for v in self._bounds)
+        if rx1 > rx0 and ry1 > ry0:
+            self.canvas.xview_moveto((x * z - self.canvas.winfo_width() / 2 - rx0) / (rx1 - rx0))
+            self.canvas.yview_moveto((y * z - self.canvas.winfo_height() / 2 - ry0) / (ry1 - ry0))
+        self._refresh_viewport()
+        where = f" (in {' / '.join(view.clusters[node])})" if view is not None and node in view.clusters else ""
+        self.status_var.set(
+            f"{label}{where}: {len(callers)} direct callers, {len(callees)} direct callees. (Click empty space to clear)"
+        )
 
-        # Node size heuristic
-        def node_size(label: str) -> Tuple[int, int]:
-            w = max(140, min(360, 11 * len(label)))
-            h = 64
-            return w, h
+    def _toggle_stats(self):
+        self._stats_visible = not self._stats_visible
+        if self._stats_visible:
+            self.stats_btn.configure(text="Stats \u25be")
+            self.stats_label.pack(side="top", fill="x", padx=10, pady=(0, 6), before=self.diagram_frame)
+            self._update_stats()
+        else:
+            self.stats_btn.configure(text="Stats \u25b8")
+            self.stats_label.pack_forget()
+
+    def _update_stats(self):
+        if self._stats_visible:
+            self.stats_label.configure(text=self._stats.format_table() if self._stats.records else "No timings yet.")
+
+    def _timing_summary(self) -> str:
+        rows = self._stats.summary()
+        total = sum(row["seconds"] for row in rows)  # type: ignore[misc]
+        parts = ", ".join(f"{row['phase']} {row['seconds']:.2f}s" for row in rows)
+        return f"{total:.2f}s ({parts})" if rows else ""
 
-        bounds_min_x = 10**9
-        bounds_min_y = 10**9
-        bounds_max_x = -10**9
-        bounds_max_y = -10**9
+    def _hide_tooltip(self):
+        self._tooltip_node = None
+        self._tooltip_shown = None
+        if self._tooltip_items is not None:
+            for item in self._tooltip_items:
+                self.canvas.itemconfigure(item, state="hidden")
+
+    def _schedule_tooltip(self):
+        # Enter/Motion/Leave bursts (including shape <-> label crossings within one node)
+        # collapse into a single update per idle cycle.
+        if not self._tooltip_pending:
+            self._tooltip_pending = True
+            self.root.after_idle(self._update_tooltip)
+
+    def _update_tooltip(self):
+        self._tooltip_pending = False
+        node = self._tooltip_node
+        if node is None or self._drawn_graph is None or node not in self._drawn_graph:
+            self._hide_tooltip()
+            return
 
-        # Draw edges first so nodes appear on top.
-        for caller, callee, _args in edges:
-            if caller not in pos or callee not in pos:
-                continue
-            x0, y0 = pos[caller]
-            x1, y1 = pos[callee]
-            self.canvas.create_line(
-                x0,
-                y0,
-                x1,
-                y1,
+        pad = 10
+        if self._tooltip_items is None:
+            text_id = self.canvas.create_text(
+                0,
+                0,
+                text="",
                 fill=ORANGE,
-                width=2,
-                arrow=tk.LAST,
-                arrowshape=(12, 14, 6),
-                tags=("flow",),
+                font=("Helvetica", 9),
+                anchor="nw",
+                state="hidden",
+                tags=("tooltip",),
             )
-
-        # Draw nodes
-        for node in nodes:
-            x, y = pos.get(node, (0, 0))
-            label = "Start" if node == "Main Script" else node
-            w, h = node_size(label)
-            x0 = x - w // 2
-            y0 = y - h // 2
-            x1 = x + w // 2
-            y1 = y + h // 2
-
-            tag = f"node:{node}"
-            _create_rounded_rect(
+            rect_id = _create_rounded_rect(
                 self.canvas,
-                x0,
-                y0,
-                x1,
-                y1,
-                radius=16,
-                fill=NODE_BG,
+                0,
+                0,
+                1,
+                1,
+                radius=10,
+                fill=PANEL_BG,
                 outline=ORANGE,
                 width=2,
-                tags=("flow", "node", tag),
+                state="hidden",
+                tags=("tooltip",),
+            )
+            self.canvas.tag_raise(text_id, rect_id)
+            self._tooltip_items = (rect_id, text_id)
+        rect_id, text_id = self._tooltip_items
+
+        if node != self._tooltip_shown:
+            self.canvas.itemconfigure(text_id, text=self._tooltip_text(node))
+            self.canvas.coords(text_id, 0, 0)
+            bbox = self.canvas.bbox(text_id)
+            self._tooltip_size = (bbox[2] - bbox[0], bbox[3] - bbox[1]) if bbox else (0, 0)
+            self._tooltip_shown = node
+            # Newly shown: make sure it is above items materialized since it was last raised.
+            self.canvas.tag_raise("tooltip")
+            self.canvas.tag_raise(text_id, rect_id)
+
+        x = int(self.canvas.canvasx(self._tooltip_xy[0])) + 20
+        y = int(self.canvas.canvasy(self._tooltip_xy[1])) + 20
+        w, h = self._tooltip_size
+        self.canvas.coords(text_id, x, y)
+        self.canvas.coords(rect_id, *_rounded_rect_points(x - pad, y - pad, x + w + pad, y + h + pad, 10))
+        self.canvas.itemconfigure(rect_id, state="normal")
+        self.canvas.itemconfigure(text_id, state="normal")
+
+    def _reset_items(self):
+        # Call after canvas.delete("flow"): every tracked item id is gone.
+        self._drawn_graph = None
+        self._view = None
+        self._pos = {}
+        self._node_items = {}
+        self._edge_items = {}
+        self._pair_counts = []
+        self._pair_heat = []
+        self._node_heat = []
+        self._pair_runtime_only = []
+        self._pair_diff = []
+        self._node_diff = []
+        self._item_nodes = {}
+        self._free_node_items = []
+        self._free_edge_items = []
+        self._index = None
+        self._focus = None
+        self._highlight = None
+
+    def _on_press(self, event):
+        self._press_xy = (event.x, event.y)
+        self.canvas.scan_mark(event.x, event.y)
+
+    def _on_click(self, event):
+        # A release far from the press was a pan, not a click.
+        px, py = self._press_xy
+        if abs(event.x - px) > CLICK_SLOP or abs(event.y - py) > CLICK_SLOP:
+            return
+        if self._drawn_graph is None:
+            return
+        current = self.canvas.find_withtag("current")
+        node = self._item_nodes.get(current[0]) if current else None
+        if node is None:
+            self._clear_focus()
+        else:
+            self._focus_node(node)
+
+    def _focus_node(self, node: str):
+        graph = self._drawn_graph
+        assert graph is not None
+        if self._index is None or self._index.graph is not graph:
+            self._index = CallIndex(graph)
+        callers = self._index.callers_of(node, NEIGHBORHOOD_DEPTH)
+        callees = self._index.callees_of(node, NEIGHBORHOOD_DEPTH)
+
+        self._focus = node
+        self._highlight = {graph.node_id(n) for n in (*callers, *callees, node)}  # type: ignore[misc]
+        self._apply_highlight()
+        label = "Start" if node == "Main Script" else node
+        self.status_var.set(
+            f"{label}: {len(callers)} callers, {len(callees)} callees within {NEIGHBORHOOD_DEPTH} calls. "
+            "(Click empty space to clear)"
+        )
+
+    def _clear_focus(self):
+        if self._highlight is None:
+            return
+        self._focus = None
+        self._highlight = None
+        self._apply_highlight()
+        self.status_var.set("Diagram rendered. (Tip: click a node to highlight its callers and callees)")
+
+    def _node_colors(self, node_id: int) -> Tuple[str, str, str]:
+        # (fill, outline, text)
+        graph = self._drawn_graph
+        assert graph is not None
+        node = graph.names[node_id]
+        fill = CLUSTER_BG if self._view is not None and node in self._view.clusters else NODE_BG
+        color = ORANGE
+        if self._node_heat:
+            level = self._node_heat[node_id]
+            color = HEAT_COLORS[level] if level >= 0 else COLD
+        elif self._node_diff:
+            color = DIFF_COLORS.get(self._node_diff[node_id], ORANGE)
+        highlight = self._highlight
+        if highlight is None:
+            return fill, color, color
+        if node_id not in highlight:
+            return fill, DIM, DIM
+        if node == self._focus:
+            return FOCUS_BG, color, color
+        return fill, color, color
+
+    def _edge_width(self, index: int) -> int:
+        # One line per (caller, callee) pair, thicker the more call sites it stands for.
+        return 2 + min(6, self._pair_counts[index].bit_length() - 1)
+
+    def _on_node_double_click(self, event):
+        view = self._view
+        current = self.canvas.find_withtag("current")
+        node = self._item_nodes.get(current[0]) if current else None
+        if view is None or node is None:
+            return
+        key = view.clusters.get(node)
+        if key is not None:
+            self._expanded.add(key)
+        elif node in view.parents:
+            # Collapse the innermost cluster around the node, and everything expanded inside it.
+            key = view.parents[node]
+            self._expanded = {k for k in self._expanded if k[: len(key)] != key}
+        else:
+            return
+        self._redraw_last(keep_view=True)
+
+    def _change_grouping(self):
+        self._expanded = set()
+        self._redraw_last()
+
+    def _edge_color(self, index: int) -> str:
+        highlight = self._highlight
+        if highlight is not None:
+            graph = self._drawn_graph
+            assert graph is not None
+            pair_callers, pair_callees, _pair_of = graph.edge_pairs()
+            if pair_callers[index] not in highlight or pair_callees[index] not in highlight:
+                return DIM
+        if self._pair_diff:
+            return DIFF_COLORS.get(self._pair_diff[index], UNCHANGED)
+        if not self._pair_heat:
+            return ORANGE
+        level = self._pair_heat[index]
+        return HEAT_COLORS[level] if level >= 0 else COLD
+
+    def _edge_dash(self, index: int):
+        # Calls only seen at runtime, and calls the diffed change removed, are dashed.
+        if self._pair_runtime_only and self._pair_runtime_only[index]:
+            return RUNTIME_ONLY_DASH
+        if self._pair_diff and self._pair_diff[index] == REMOVED:
+            return REMOVED_DASH
+        return ""
+
+    def _apply_highlight(self):
+        # Only materialized items need restyling; the rest pick up colors when created.
+        for node_id, (shape, text) in self._node_items.items():
+            fill, outline, text_fill = self._node_colors(node_id)
+            self.canvas.itemconfigure(shape, fill=fill, outline=outline)
+            self.canvas.itemconfigure(text, fill=text_fill)
+        for index, line in self._edge_items.items():
+            self.canvas.itemconfigure(line, fill=self._edge_color(index))
+
+    def _on_xscroll(self, first, last):
+        self.x_scroll.set(first, last)
+        self._schedule_viewport_refresh()
+
+    def _on_yscroll(self, first, last):
+        self.y_scroll.set(first, last)
+        self._schedule_viewport_refresh()
+
+    def _schedule_viewport_refresh(self):
+        # Scrollbars, scan_dragto and resizes all report through the scroll commands;
+        # coalesce bursts of them into one refresh.
+        if self._virtual and not self._viewport_pending:
+            self._viewport_pending = True
+            self.root.after_idle(self._refresh_viewport)
+
+    def _label_font(self) -> Tuple[str, int, str]:
+        return ("Helvetica", max(1, round(12 * self._zoom)), "bold")
+
+    def _apply_scrollregion(self):
+        z = self._zoom
+        self.canvas.configure(scrollregion=tuple(v * z for v in self._bounds))
+
+    def _zoom_by(self, factor: float, x: Optional[int] = None, y: Optional[int] = None):
+        """Zoom by ``factor`` keeping the canvas point under window pixel (x, y) in place.
+
+        Existing items are transformed with canvas.scale instead of being redrawn;
+        crossing LABEL_ZOOM swaps labels and smoothed shapes for plain rectangles
+        (one tag-wide itemconfigure each).
+        """
+
+        if self._drawn_graph is None:
+            return
+        old = self._zoom
+        new = min(ZOOM_MAX, max(ZOOM_MIN, old * factor))
+        if new == old:
+            return
+        if x is None or y is None:
+            x = self.canvas.winfo_width() // 2
+            y = self.canvas.winfo_height() // 2
+        # Canvas point under the pointer, in layout coordinates.
+        lx = self.canvas.canvasx(x) / old
+        ly = self.canvas.canvasy(y) / old
+
+        with phase("zoom", nodes=len(self._node_items), edges=len(self._edge_items)):
+            self._hide_tooltip()
+            self._zoom = new
+            self.canvas.scale("flow", 0, 0, new / old, new / old)
+            detailed = new >= LABEL_ZOOM
+            if detailed:
+                self.canvas.itemconfigure("label", font=self._label_font())
+            if detailed != (old >= LABEL_ZOOM):
+                self.canvas.itemconfigure("shape", smooth=detailed)
+                self.canvas.itemconfigure("label", state="normal" if detailed else "hidden")
+                if detailed:
+                    # Recycled items parked in the pool stay hidden.
+                    for _shape, text in self._free_node_items:
+                        self.canvas.itemconfigure(text, state="hidden")
+
+            self._apply_scrollregion()
+            rx0, ry0, rx1, ry1 = (v * new for v in self._bounds)
+            if rx1 > rx0 and ry1 > ry0:
+                self.canvas.xview_moveto((lx * new - x - rx0) / (rx1 - rx0))
+                self.canvas.yview_moveto((ly * new - y - ry0) / (ry1 - ry0))
+        self.status_var.set(f"Zoom {new:.0%}")
+        self._update_stats()
+
+    def _on_node_hover(self, event):
+        current = self.canvas.find_withtag("current")
+        node = self._item_nodes.get(current[0]) if current else None
+        if node is not None:
+            self._tooltip_node = node
+            self._tooltip_xy = (event.x, event.y)
+            self._schedule_tooltip()
+
+    def _on_node_leave(self, _event):
+        # Deferred like hover, so moving between a node's shape and label doesn't flicker.
+        self._tooltip_node = None
+        self._schedule_tooltip()
+
+    def _materialize_node(self, node_id: int):
+        graph = self._drawn_graph
+        assert graph is not None
+        node = graph.names[node_id]
+        x, y = self._pos.get(node, (0, 0))
+        label = "Start" if node == "Main Script" else node
+        w, h = node_size(label)
+        x0 = x - w // 2
+        y0 = y - h // 2
+        x1 = x + w // 2
+        y1 = y + h // 2
+        fill, outline, text_fill = self._node_colors(node_id)
+        z = self._zoom
+        points = [p * z for p in _rounded_rect_points(x0, y0, x1, y1, 16)]
+        detailed = z >= LABEL_ZOOM
+        text_state = "normal" if detailed else "hidden"
+
+        if self._free_node_items:
+            shape, text = self._free_node_items.pop()
+            self.canvas.coords(shape, *points)
+            self.canvas.coords(text, x * z, y * z)
+            self.canvas.itemconfigure(shape, fill=fill, outline=outline, smooth=detailed, state="normal")
+            self.canvas.itemconfigure(text, text=label, fill=text_fill, font=self._label_font(), state=text_state)
+        else:
+            shape = self.canvas.create_polygon(
+                points,
+                smooth=detailed,
+                splinesteps=16,
+                fill=fill,
+                outline=outline,
+                width=2,
+                tags=("flow", "node", "shape"),
             )
-            self.canvas.create_text(
-                x,
-                y,
+            text = self.canvas.create_text(
+                x * z,
+                y * z,
                 text=label,
-                fill=ORANGE,
-                font=("Helvetica", 12, "bold"),
-                tags=("flow", "node", tag),
+                fill=text_fill,
+                font=self._label_font(),
+                state=text_state,
+                tags=("flow", "node", "label"),
             )
 
-            # Hover tooltips (unbind first to avoid accumulating bindings across redraws)
-            self.canvas.tag_unbind(tag, "<Enter>")
-            self.canvas.tag_unbind(tag, "<Leave>")
-            self.canvas.tag_bind(tag, "<Enter>", lambda e, n=node: self._show_tooltip(n, e))
-            self.canvas.tag_bind(tag, "<Leave>", lambda _e: self._hide_tooltip())
-
-            bounds_min_x = min(bounds_min_x, x0)
-            bounds_min_y = min(bounds_min_y, y0)
-            bounds_max_x = max(bounds_max_x, x1)
-            bounds_max_y = max(bounds_max_y, y1)
-
-        if bounds_max_x < bounds_min_x:
-            self.canvas.configure(scrollregion=(0, 0, 0, 0))
+        self._node_items[node_id] = (shape, text)
+        self._item_nodes[shape] = node
+        self._item_nodes[text] = node
+
+    def _release_node(self, node_id: int):
+        shape, text = self._node_items.pop(node_id)
+        self._item_nodes.pop(shape, None)
+        self._item_nodes.pop(text, None)
+        self.canvas.itemconfigure(shape, state="hidden")
+        self.canvas.itemconfigure(text, state="hidden")
+        self._free_node_items.append((shape, text))
+
+    def _materialize_edge(self, index: int):
+        graph = self._drawn_graph
+        assert graph is not None
+        z = self._zoom
+        pair_callers, pair_callees, _pair_of = graph.edge_pairs()
+        x0, y0 = self._pos[graph.names[pair_callers[index]]]
+        x1, y1 = self._pos[graph.names[pair_callees[index]]]
+        x0, y0, x1, y1 = x0 * z, y0 * z, x1 * z, y1 * z
+
+        color = self._edge_color(index)
+
+        if self._free_edge_items:
+            line = self._free_edge_items.pop()
+            self.canvas.coords(line, x0, y0, x1, y1)
+            self.canvas.itemconfigure(line, fill=color, width=self._edge_width(index), dash=self._edge_dash(index), state="normal")
+        else:
+            line = self.canvas.create_line(
+                x0,
+                y0,
+                x1,
+                y1,
+                fill=color,
+                width=self._edge_width(index),
+                dash=self._edge_dash(index),
+                arrow=tk.LAST,
+                arrowshape=(12, 14, 6),
+                tags=("flow", "edge"),
+            )
+        self._edge_items[index] = line
+
+    def _release_edge(self, index: int):
+        line = self._edge_items.pop(index)
+        self.canvas.itemconfigure(line, state="hidden")
+        self._free_edge_items.append(line)
+
+    def _sync_items(self, node_ids: Iterable[int], edge_indices: Iterable[int]):
+        wanted_nodes = set(node_ids)
+        wanted_edges = set(edge_indices)
+
+        for node_id in [n for n in self._node_items if n not in wanted_nodes]:
+            self._release_node(node_id)
+        for index in [e for e in self._edge_items if e not in wanted_edges]:
+            self._release_edge(index)
+
+        for index in wanted_edges:
+            if index not in self._edge_items:
+                self._materialize_edge(index)
+        for node_id in wanted_nodes:
+            if node_id not in self._node_items:
+                self._materialize_node(node_id)
+
+        # Recycled/new items may have been stacked out of order; edges stay under nodes.
+        self.canvas.tag_raise("node")
+        self.canvas.tag_raise("tooltip")
+
+    def _refresh_viewport(self):
+        self._viewport_pending = False
+        if not self._virtual or self._drawn_graph is None:
             return
 
-        pad = 140
-        self.canvas.configure(scrollregion=(bounds_min_x - pad, bounds_min_y - pad, bounds_max_x + pad, bounds_max_y + pad))
-        self.canvas.xview_moveto(0)
-        self.canvas.yview_moveto(0)
+        # The grids are in layout coordinates.
+        z = self._zoom
+        m = VIEWPORT_MARGIN
+        x0 = (self.canvas.canvasx(0) - m) / z
+        y0 = (self.canvas.canvasy(0) - m) / z
+        x1 = (self.canvas.canvasx(self.canvas.winfo_width()) + m) / z
+        y1 = (self.canvas.canvasy(self.canvas.winfo_height()) + m) / z
+        self._sync_items(self._node_grid.query(x0, y0, x1, y1), self._edge_grid.query(x0, y0, x1, y1))
+
+    def _visible_graph(self, graph: CallGraph) -> Tuple[CallGraph, Optional[ClusterView]]:
+        # The graph that gets laid out: overlays merged, built-ins filtered, clusters collapsed.
+        if self._heat is not None:
+            graph = merge_heat(graph, self._heat)
+        if self._diff is not None:
+            graph = merge_diff(graph, self._diff)
+        graph = self._filter_graph(graph)
+        # Only the visible units of a grouped graph are laid out and drawn.
+        view = cluster_view(graph, self.grouping_var.get(), self._last_owners, self._expanded)
+        return (view.graph if view is not None else graph), view
+
+    def _draw_flow(
+        self,
+        graph: CallGraph,
+        assigned_to_by_callee: Dict[str, Set[str]],
+        keep_view: bool = False,
+        view: Optional[ClusterView] = None,
+    ):
+        # ``graph`` (and ``view``) as returned by _visible_graph.
+        self._stats.clear()
+        # Cached by graph fingerprint, so toggling Hide Built-Ins back and forth reuses layouts.
+        pos = compute_layout(graph, engine=self.layout_engine_var.get(), preset=self._layout_preset())
+        self._render(graph, pos, assigned_to_by_callee, keep_view, view)
+        self._on_search_changed()  # results follow a re-analyzed file
+        self._update_stats()
+
+    def _render(
+        self,
+        graph: CallGraph,
+        pos: Dict[str, Tuple[int, int]],
+        assigned_to_by_callee: Dict[str, Set[str]],
+        keep_view: bool = False,
+        view: Optional[ClusterView] = None,
+    ):
+        with phase("draw", nodes=graph.node_count, edges=len(graph)) as p:
+            # Keep the user's scroll position when the same diagram is just being updated.
+            xview = self.canvas.xview()
+            yview = self.canvas.yview()
+
+            self.canvas.delete("flow")
+            self._reset_items()
+            self._hide_tooltip()
+            self.canvas.itemconfigure(self.watermark_id, state="hidden")
+            if not keep_view:
+                self._zoom = 1.0
+
+            self._tooltip_cache.clear()
+            self._drawn_assigned = assigned_to_by_callee
+            self._drawn_graph = graph
+            self._view = view
+            self._pos = pos
+            self._virtual = graph.node_count > VIRTUALIZE_THRESHOLD
+
+            bounds_min_x = 10**9
+            bounds_min_y = 10**9
+            bounds_max_x = -10**9
+            bounds_max_y = -10**9
+
+            names = graph.names
+            if self._virtual:
+                self._node_grid = SpatialGrid()
+                self._edge_grid = SpatialGrid()
+            for node_id, node in enumerate(names):
+                x, y = pos.get(node, (0, 0))
+                w, h = node_size("Start" if node == "Main Script" else node)
+                x0 = x - w // 2
+                y0 = y - h // 2
+                x1 = x + w // 2
+                y1 = y + h // 2
+                if self._virtual:
+                    self._node_grid.insert_rect(node_id, x0, y0, x1, y1)
+
+                bounds_min_x = min(bounds_min_x, x0)
+                bounds_min_y = min(bounds_min_y, y0)
+                bounds_max_x = max(bounds_max_x, x1)
+                bounds_max_y = max(bounds_max_y, y1)
+
+            # Repeated calls between the same two functions share one line.
+            pair_callers, pair_callees, pair_of = graph.edge_pairs()
+            weights = view.edge_counts if view is not None else [1] * len(graph)
+            self._pair_counts = [0] * len(pair_callers)
+            for pair, weight in zip(pair_of, weights):
+                self._pair_counts[pair] += weight
+
+            if self._heat is not None:
+                self._measure(graph, view)
+            if self._diff is not None:
+                self._compare(graph, view)
+
+            if self._virtual:
+                for index, (caller, callee) in enumerate(zip(pair_callers, pair_callees)):
+                    x0, y0 = pos[names[caller]]
+                    x1, y1 = pos[names[callee]]
+                    self._edge_grid.insert_segment(index, x0, y0, x1, y1)
+            else:
+                self._sync_items(range(graph.node_count), range(len(pair_callers)))
+
+            if bounds_max_x < bounds_min_x:
+                self._bounds = (0, 0, 0, 0)
+                self.canvas.configure(scrollregion=(0, 0, 0, 0))
+                return
+
+            p.set(lines=len(self._pair_counts))
+            pad = 140
+            self._bounds = (bounds_min_x - pad, bounds_min_y - pad, bounds_max_x + pad, bounds_max_y + pad)
+            self._apply_scrollregion()
+            self.canvas.xview_moveto(xview[0] if keep_view else 0)
+            self.canvas.yview_moveto(yview[0] if keep_view else 0)
+            self._refresh_viewport()
+
+    def _measure(self, graph: CallGraph, view: Optional[ClusterView]):
+        heat = self._heat
+        assert heat is not None
+        names = graph.names
+        pair_callers, pair_callees, _pair_of = graph.edge_pairs()
+        top = heat.max_edge_seconds()
+        edges = heat.edges
+        self._pair_heat = []
+        for caller, callee in zip(pair_callers, pair_callees):
+            cost = edges.get((names[caller], names[callee]))
+            self._pair_heat.append(_heat_level(cost.seconds if cost else None, top))
+        self._pair_runtime_only = runtime_only_pairs(graph)
+
+        top = heat.max_node_seconds()
+        self._node_heat = []
+        for node in names:
+            members = view.members.get(node, ()) if view is not None else ()
+            # A collapsed cluster is as hot as its hottest member.
+            costs = [heat.nodes[m] for m in (members or (node,)) if m in heat.nodes]
+            self._node_heat.append(_heat_level(max(c.cumulative for c in costs) if costs else None, top))
+
+    def _compare(self, graph: CallGraph, view: Optional[ClusterView]):
+        diff = self._diff
+        assert diff is not None
+        names = graph.names
+        pair_callers, pair_callees, pair_of = graph.edge_pairs()
+        # Pairs still called somewhere in the new revision are changed, not removed.
+        kept = [False] * len(pair_callers)
+        for pair, line in zip(pair_of, graph.lines):
+            if line != REMOVED_LINE:
+                kept[pair] = True
+        status = diff.pair_status()
+        self._pair_diff = []
+        for index, (caller, callee) in enumerate(zip(pair_callers, pair_callees)):
+            state = status.get((names[caller], names[callee]), "")
+            self._pair_diff.append(CHANGED if state == REMOVED and kept[index] else state)
+
+        edited = {change.caller for change in diff.changes}
+        self._node_diff = []
+        for node in names:
+            members = view.members.get(node, ()) if view is not None else ()
+            # A collapsed cluster shows the strongest change among its members.
+            states = set()
+            for member in members or (node,):
+                if member in diff.added_functions:
+                    states.add(ADDED)
+                elif member in diff.removed_functions:
+                    states.add(REMOVED)
+                elif member in edited:
+                    states.add(CHANGED)
+            if len(states) > 1:
+                states = {CHANGED}
+            self._node_diff.append(states.pop() if states else "")
 
     def _handle_file(self, path: str):
         path = _clean_dnd_path(path)
+        if _is_snapshot_file(path):
+            self._open_snapshot(path)
+            return
+        if _is_trace_file(path):
+            self._open_trace(path)
+            return
         if not _is_python_file(path):
-            messagebox.showerror("ProFlow", "Please select a valid .py file.")
+            messagebox.showerror("ProFlow", "Please select a valid .py, .pfsnap, .pftrace or .prof file.")
             return
 
+        self._stop_watch()
+        if path != self.selected_file:
+            self._set_heat(None)  # measured for another program
+            self._set_diff(None)
         self.selected_file = path
-        self.status_var.set(f"Analyzing: {path}")
-        self.root.update_idletasks()
+        self._last_layout = None
+        self._expanded = set()
+        self._start_job({"path": path, "watch": self.watch_var.get()}, f"Analyzing {os.path.basename(path)}")
+
+    def _open_snapshot(self, path: str):
+        # Snapshots are already analyzed: load in-process (mmap, fast) and only lay out/draw.
+        self._stop_job()
+        self._stop_watch()
+        self._stats.clear()
+        try:
+            with phase("snapshot_load"):
+                data = load_snapshot(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("ProFlow", f"Could not open snapshot: {e}")
+            return
+
+        self.selected_file = None  # nothing to watch
+        self._set_heat(None)
+        self._set_diff(None)
+        self._expanded = set()
+        self._last_graph = data["graph"]  # type: ignore[assignment]
+        self._last_assigned_to_by_callee = data["assigned_to_by_callee"]  # type: ignore[assignment]
+        self._last_owners = data["owners"]  # type: ignore[assignment]
+        self._last_layout = data.get("layout")  # type: ignore[assignment]
+        graph = self._last_graph
+        self.status_var.set(f"Opened snapshot {os.path.basename(path)}: {graph.node_count} nodes, {len(graph)} calls.")  # type: ignore[union-attr]
+        self._redraw_last()
+
+    def _open_trace(self, path: str):
+        # A trace only adds measured cost to the diagram that is already open.
+        if self._last_graph is None:
+            messagebox.showerror("ProFlow", "Open the Python file first, then its trace or cProfile dump.")
+            return
+        try:
+            # cProfile dumps keep only the calls made from or into the open file.
+            heat = load_heat(path, [self.selected_file] if self.selected_file else None)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("ProFlow", f"Could not open trace: {e}")
+            return
+
+        self._set_heat(heat)
+        self._set_diff(None)  # one overlay at a time
+        self._redraw_last(keep_view=True)
+        self.status_var.set(
+            f"Measured cost from {os.path.basename(path)}: redder = more time, grey = not measured, dashed = calls not in the source."
+        )
+
+    def _open_diff(self, base: str):
+        # Diff the older revision ``base`` against the open file; unchanged definitions are skipped.
+        if not _is_python_file(base):
+            messagebox.showerror("ProFlow", "Please select a valid .py file to compare with.")
+            return
+        assert self.selected_file is not None and self._last_graph is not None
+        # Diffed in the worker, then laid out with the removed calls; _finish_job installs the result.
+        request = {"graph": self._last_graph, "diff_base": base, "diff_target": self.selected_file, "heat": None}
+        self._start_job(request, f"Comparing with {os.path.basename(base)}", keep_view=True)
+
+    def _layout_preset(self) -> Optional[Dict[str, Tuple[int, int]]]:
+        layout = self._last_layout
+        if layout is None or layout["engine"] != self.layout_engine_var.get():
+            return None
+        return layout["pos"]  # type: ignore[return-value]
+
+    def _start_job(self, request: Dict[str, object], label: str, keep_view: bool = False):
+        # A new request always supersedes the running one (e.g. another file was dropped).
+        self._stop_job()
+        request["hide_builtins"] = self.hide_builtins_var.get()
+        request["engine"] = self.layout_engine_var.get()
+        request["grouping"] = self.grouping_var.get()
+        request["expanded"] = set(self._expanded)
+        request["owners"] = self._last_owners
+        request["layout"] = self._layout_preset()
+        request["trace_memory"] = self._stats_visible
+        request.setdefault("heat", self._heat)
+        request["diff"] = self._diff  # replaced in the worker when the request has a "diff_base"
+
+        self._stats.clear()
+        self._job = AnalysisJob(request)
+        self._job_label = label
+        self._job_keep_view = keep_view
+        self.cancel_btn.configure(state="normal")
+        self.status_var.set(f"{label}: starting...")
+        self._job_after_id = self.root.after(JOB_POLL_MS, self._poll_job)
+
+    def _stop_job(self):
+        if self._job_after_id is not None:
+            self.root.after_cancel(self._job_after_id)
+        self._job_after_id = None
+        if self._job is not None:
+            if isinstance(self._job.request.get("watch"), bytes) and not self._job.finished:
+                self._watch_missed = True  # the save it was analyzing still needs a redraw
+            self._job.cancel()
+        self._job = None
+        self.cancel_btn.configure(state="disabled")
+
+    def cancel_analysis(self):
+        if self._job is None:
+            return
+        self._stop_job()
+        self.status_var.set("Analysis cancelled.")
 
-        data = analyze_flow(path)
-        if not data:
-            self.status_var.set("Failed to analyze file. See terminal output for details.")
+    def _poll_job(self):
+        self._job_after_id = None
+        job = self._job
+        if job is None:
             return
 
-        nodes = data["nodes"]
-        edges = data["edges"]
-        assigned_to_by_callee = data.get("assigned_to_by_callee", {})
+        for kind, payload in job.poll():
+            if kind == "record":
+                self._stats(payload)  # type: ignore[arg-type]
+                continue
+            if kind == "done":
+                self._job = None
+                self.cancel_btn.configure(state="disabled")
+                self._finish_job(job, payload)  # type: ignore[arg-type]
+                return
+            if kind == "error":
+                self._job = None
+                self.cancel_btn.configure(state="disabled")
+                self.status_var.set(str(payload))
+                return
 
-        self._last_nodes = nodes  # type: ignore[assignment]
-        self._last_edges = edges  # type: ignore[assignment]
-        self._last_assigned_to_by_callee = assigned_to_by_callee  # type: ignore[assignment]
+        phase_s, total_s = job.elapsed()
+        self.status_var.set(f"{self._job_label}: {job.phase} ({phase_s:.1f}s, {total_s:.1f}s total)")
+        self._job_after_id = self.root.after(JOB_POLL_MS, self._poll_job)
+
+    def _finish_job(self, job: AnalysisJob, result: Dict[str, object]):
+        state = result.get("watch")
+        if state is not None and self.watch_var.get():
+            if self._watcher is None:
+                self._start_watch()
+            self._watch_state = state  # type: ignore[assignment]
+        if "diff" in result:
+            self._set_heat(None)  # one overlay at a time
+            self._set_diff(result["diff"], job.request["diff_base"])  # type: ignore[arg-type]
+        if result["graph"] is None:
+            # A watched save that changed no calls: nothing to redraw.
+            self.status_var.set("Watching: no call changes.")
+            return
 
-        self._draw_flow(nodes, edges, assigned_to_by_callee)  # type: ignore[arg-type]
-        self.status_var.set("Diagram rendered. (Tip: hover nodes for details, click + drag to pan)")
+        data = result["data"]
+        if data is not None:
+            self._last_graph = data["graph"]  # type: ignore[index]
+            self._last_assigned_to_by_callee = data.get("assigned_to_by_callee", {})  # type: ignore[attr-defined]
+            self._last_owners = data.get("owners", {})  # type: ignore[attr-defined]
 
-    def _redraw_last(self):
-        if not self._last_nodes:
+        if job.request.get("layout") is None:
+            # The worker's layout cache ends with it; keep its positions for later redraws of this graph.
+            layout_cache.put(layout_key(result["graph"], str(job.request["engine"])), result["pos"])  # type: ignore[arg-type]
+        self.status_var.set(f"{self._job_label}: drawing...")
+        self.root.update_idletasks()
+        self._render(
+            result["graph"],  # type: ignore[arg-type]
+            result["pos"],  # type: ignore[arg-type]
+            self._last_assigned_to_by_callee,
+            self._job_keep_view,
+            result.get("view"),  # type: ignore[arg-type]
+        )
+        self._on_search_changed()
+        self._update_stats()
+        delta = result.get("delta")
+        if delta is not None:
+            added, removed = delta  # type: ignore[misc]
+            status = f"Watching: +{added} / -{removed} edges"
+            if self._diff_base is not None:
+                status = f"Watching: {self._diff_summary()}"
+            self.status_var.set(status)
+        elif "diff" in result:
+            self.status_var.set(self._diff_summary())
+        else:
+            self.status_var.set(f"Diagram rendered in {self._timing_summary()}. (Tip: hover nodes for details, click a node to highlight its neighborhood, click + drag to pan)")
+
+    def _toggle_watch(self):
+        if not self.watch_var.get():
+            self._stop_watch()
+        elif self.selected_file:
+            # Analyzed once more in the worker, keeping the per-statement state later saves build on.
+            self._start_job({"path": self.selected_file, "watch": True}, f"Analyzing {os.path.basename(self.selected_file)}", keep_view=True)
+
+    def _start_watch(self):
+        # Only the file's stamp is polled on the Tk thread; re-analysis runs as a job (see _poll_watch).
+        self._stop_watch()
+        if not self.selected_file:
+            return
+        self._watcher = FileWatcher([self.selected_file])
+        self._watch_after_id = self.root.after(WATCH_INTERVAL_MS, self._poll_watch)
+
+    def _stop_watch(self):
+        if self._watch_after_id is not None:
+            self.root.after_cancel(self._watch_after_id)
+        self._watch_after_id = None
+        self._watch_state = None
+        self._watch_missed = False
+        self._watcher = None
+
+    def _poll_watch(self):
+        self._watch_after_id = None
+        if self._watcher is None or self._watch_state is None:
+            return
+
+        # While another job runs the save waits; the stamp is only read once it is done.
+        if self._job is None and (self._watcher.poll() or self._watch_missed):
+            self._watch_missed = False
+            request: Dict[str, object] = {"watch": self._watch_state}
+            if self._diff_base is not None:
+                # The worker re-diffs against the base; only the definitions that differ are re-analyzed.
+                request.update(diff_base=self._diff_base, diff_target=self.selected_file)
+            label = f"Updating {os.path.basename(self.selected_file or '')}"
+            self._start_job(request, label, keep_view=True)
+
+        self._watch_after_id = self.root.after(WATCH_INTERVAL_MS, self._poll_watch)
+
+    def _redraw_last(self, keep_view: bool = False):
+        if self._last_graph is None:
+            return
+        graph, view = self._visible_graph(self._last_graph)
+        engine = self.layout_engine_var.get()
+        if graph.node_count > VIRTUALIZE_THRESHOLD and cached_layout(graph, engine, preset=self._layout_preset()) is None:
+            # Big graphs are laid out off the Tk thread; _finish_job adds the result to this process's cache.
+            self._start_job({"graph": self._last_graph}, "Updating layout", keep_view=keep_view)
             return
-        self._draw_flow(self._last_nodes, self._last_edges, self._last_assigned_to_by_callee)
+        self._draw_flow(graph, self._last_assigned_to_by_callee, keep_view, view)
 
 def run_app() -> None:
     dnd_available = False
@@ -0,0 +1,334 @@
+"""Measured cost (from a runtime trace or a cProfile dump) laid over the static call graph.
+
+A Heat holds call counts and times per function name and per
+(caller, callee) pair, named the way FlowAnalyzer names them, so it can be
+matched against any analyze_flow graph. Runtime traces are stored as JSON
+``.pftrace`` files (see tracing.py); cProfile/pstats ``.prof`` dumps are
+converted on load.
+"""
+
+import heapq
+import io
+import json
+import os
+import pstats
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from graph import CallGraph
+
+TRACE_SUFFIXES = (".pftrace",)
+PSTATS_SUFFIXES = (".prof", ".pstats")
+HEAT_SUFFIXES = TRACE_SUFFIXES + PSTATS_SUFFIXES
+HEAT_FORMAT = 1
+
+# Bounds the best-first search in hottest_paths on densely connected graphs.
+MAX_PATH_EXPANSIONS = 200_000
+
+# Line number given to edges that were only seen at runtime (static call sites have >= 0).
+RUNTIME_ONLY = -1
+
+
+class NodeCost(NamedTuple):
+    calls: int
+    own: float  # seconds spent in the function itself
+    cumulative: float  # seconds including callees (outermost activation only, so recursion is not double counted)
+
+
+class EdgeCost(NamedTuple):
+    calls: int
+    seconds: float  # time spent in the callee for calls from this caller, callees included
+
+
+class Heat:
+    def __init__(
+        self,
+        nodes: Optional[Dict[str, NodeCost]] = None,
+        edges: Optional[Dict[Tuple[str, str], EdgeCost]] = None,
+        source: str = "",
+    ):
+        self.nodes: Dict[str, NodeCost] = nodes or {}
+        self.edges: Dict[Tuple[str, str], EdgeCost] = edges or {}
+        self.source = source  # what was measured, e.g. the traced command line
+
+    def max_edge_seconds(self) -> float:
+        return max((e.seconds for e in self.edges.values()), default=0.0)
+
+    def max_node_seconds(self) -> float:
+        return max((n.cumulative for n in self.nodes.values()), default=0.0)
+
+    def hottest_edges(self, n: Optional[int] = None) -> List[Tuple[str, str, EdgeCost]]:
+        ranked = sorted(self.edges.items(), key=lambda item: (-item[1].seconds, -item[1].calls, item[0]))
+        return [(caller, callee, cost) for (caller, callee), cost in ranked[:n]]
+
+    def to_json(self) -> Dict[str, object]:
+        return {
+            "format": HEAT_FORMAT,
+            "source": self.source,
+            "nodes": {name: list(cost) for name, cost in self.nodes.items()},
+            "edges": [[caller, callee, *cost] for (caller, callee), cost in self.edges.items()],
+        }
+
+    @classmethod
+    def from_json(cls, payload: Dict[str, object]) -> "Heat":
+        if payload.get("format") != HEAT_FORMAT:
+            raise ValueError(f"Unsupported trace format {payload.get('format')!r}.")
+        nodes = {name: NodeCost(int(c[0]), float(c[1]), float(c[2])) for name, c in payload["nodes"].items()}  # type: ignore[attr-defined]
+        edges = {(e[0], e[1]): EdgeCost(int(e[2]), float(e[3])) for e in payload["edges"]}  # type: ignore[attr-defined]
+        return cls(nodes, edges, str(payload.get("source", "")))
+
+
+def is_heat_file(path: str) -> bool:
+    return path.lower().endswith(HEAT_SUFFIXES)
+
+
+def save_heat(path: str, heat: Heat) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(heat.to_json(), f)
+
+
+def load_heat(path: str, files: Optional[Sequence[str]] = None) -> Heat:
+    """Read a ``.pftrace`` trace or a cProfile dump; raises ValueError (or OSError) if it cannot be used.
+
+    ``files`` are the analyzed source files; a cProfile dump is cut down to
+    the calls made to or from them (see heat_from_pstats).
+    """
+
+    if path.lower().endswith(PSTATS_SUFFIXES):
+        return heat_from_pstats(path, files)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Not a ProFlow trace: {e}") from None
+    if not isinstance(payload, dict):
+        raise ValueError("Not a ProFlow trace.")
+    return Heat.from_json(payload)
+
+
+Func = Tuple[str, int, str]  # pstats function key: (file, first line, name)
+
+_BUILTIN_METHOD = re.compile(r"<built-in method (?:[\w.]+\.)?(\w+)>")
+_METHOD = re.compile(r"<method '(\w+)' of ")
+
+
+def _path_parts(path: str) -> List[str]:
+    return os.path.normpath(path.replace("\\", "/")).replace("\\", "/").split("/")
+
+
+def match_files(profiled: Iterable[str], analyzed: Sequence[str]) -> Set[str]:
+    """The profiled file paths that are among the analyzed files.
+
+    Profiles usually come from another machine, so paths are compared by
+    their longest common tail (``/srv/app/pkg/mod.py`` matches
+    ``~/src/app/pkg/mod.py``); for each analyzed file only the best matching
+    profiled paths are kept.
+    """
+
+    targets = [_path_parts(os.path.abspath(a))[::-1] for a in analyzed]
+    best: Dict[int, Tuple[int, List[str]]] = {}
+    for path in profiled:
+        parts = _path_parts(path)[::-1]
+        for i, target in enumerate(targets):
+            n = 0
+            for a, b in zip(parts, target):
+                if a != b:
+                    break
+                n += 1
+            if n == 0:
+                continue
+            current = best.get(i)
+            if current is None or n > current[0]:
+                best[i] = (n, [path])
+            elif n == current[0]:
+                current[1].append(path)
+    return {path for _n, paths in best.values() for path in paths}
+
+
+def _pstats_name(func: Func) -> Optional[str]:
+    # FlowAnalyzer's name for a profiled function; None for lambdas, comprehensions and the like.
+    filename, _line, name = func
+    if name == "<module>":
+        return "Main Script"
+    if filename == "~":
+        # C functions: "<built-in method builtins.len>", "<method 'append' of 'list' objects>".
+        m = _BUILTIN_METHOD.match(name) or _METHOD.match(name)
+        if m is None or m.group(1) == "__build_class__":
+            return None
+        return m.group(1)
+    if name.startswith("<") or filename.startswith("<"):
+        # Also frozen import machinery ("<frozen importlib._bootstrap>"), which imports run through.
+        return None
+    return name
+
+
+def _is_class_body(callers: Dict[Func, tuple]) -> bool:
+    # Class bodies show up as functions named after the class, run by __build_class__.
+    return bool(callers) and all(f[0] == "~" and f[2].endswith("__build_class__>") for f in callers)
+
+
+def heat_from_pstats(path: str, files: Optional[Sequence[str]] = None) -> Heat:
+    """Convert a cProfile/pstats dump into a Heat keyed by FlowAnalyzer names.
+
+    With ``files``, only calls made from or into functions of those files
+    are kept. Lambdas, comprehensions and class bodies count as part of the
+    function that runs them (their caller with the most time in the same
+    file, possibly through a C function such as ``sum``), like in the
+    static graph. Node and edge times are pstats' cumulative times, so
+    recursion is not counted twice.
+    """
+
+    try:
+        # pstats reports bad data on its stream as well; the ValueError says it all.
+        stats = pstats.Stats(path, stream=io.StringIO()).stats  # type: ignore[attr-defined]
+    except (AttributeError, EOFError, TypeError, ValueError, KeyError, IndexError) as e:
+        raise ValueError(f"Not a cProfile dump: {e}") from None
+    ours: Optional[Set[str]] = match_files({func[0] for func in stats}, files) if files is not None else None
+
+    def in_scope(func: Func) -> bool:
+        return ours is None or func[0] in ours
+
+    def inline(func: Func) -> bool:
+        if func[0] == "~" or func[0].startswith("<") or func not in stats:
+            return False
+        return _pstats_name(func) is None or _is_class_body(stats[func][4])
+
+    owners: Dict[Func, Optional[str]] = {}
+
+    def owner(func: Func) -> Optional[str]:
+        # Enclosing function of inline code, through nested lambdas/comprehensions.
+        if func in owners:
+            return owners[func]
+        owners[func] = None  # guards against cycles
+        candidates = []
+        for caller, cost in stats[func][4].items():
+            if caller[0] == func[0]:
+                candidates.append((cost[3], caller))
+            elif caller[0] == "~" and caller in stats:
+                # Run by a C function (sum(<genexpr>), sorted(key=<lambda>), class bodies).
+                candidates.extend((c[3], f) for f, c in stats[caller][4].items() if f[0] == func[0])
+        result = None
+        if candidates:
+            _ct, caller = max(candidates)
+            result = owner(caller) if inline(caller) else _pstats_name(caller)
+        owners[func] = result
+        return result
+
+    def name_of(func: Func) -> Optional[str]:
+        if inline(func):
+            return owner(func) if in_scope(func) else None
+        return _pstats_name(func)
+
+    nodes: Dict[str, List[float]] = {}
+    edges: Dict[Tuple[str, str], List[float]] = {}
+    for func, (_cc, nc, tt, ct, callers) in stats.items():
+        if inline(func):
+            enclosing = name_of(func)
+            if enclosing is not None:
+                # Its own time belongs to the enclosing function.
+                nodes.setdefault(enclosing, [0, 0.0, 0.0])[1] += tt
+            continue
+        callee = _pstats_name(func)
+        if callee is None:
+            continue
+        mine = in_scope(func)
+        linked = False
+        if callee == "Main Script":
+            callers = {}  # module code is run by the import system or the profiler, not called
+        for caller_func, (call_nc, _call_cc, _call_tt, call_ct) in callers.items():
+            if not mine and not in_scope(caller_func):
+                continue
+            caller = name_of(caller_func)
+            if caller is None:
+                continue
+            edge = edges.setdefault((caller, callee), [0, 0.0])
+            edge[0] += call_nc
+            edge[1] += call_ct
+            linked = True
+        if mine or linked:
+            node = nodes.setdefault(callee, [0, 0.0, 0.0])
+            node[0] += nc
+            node[1] += tt
+            node[2] += ct
+
+    return Heat(
+        {name: NodeCost(int(c[0]), c[1], c[2]) for name, c in nodes.items()},
+        {pair: EdgeCost(int(c[0]), c[1]) for pair, c in edges.items()},
+        f"cProfile {os.path.basename(path)}",
+    )
+
+
+def hottest_paths(heat: Heat, n: int = 10, start: str = "Main Script") -> List[Tuple[float, List[str]]]:
+    """The ``n`` heaviest measured call paths from ``start``, as (weight, names), heaviest first.
+
+    A path weighs as much as its lightest call (no more time than that can
+    have gone through the whole chain). Paths are followed until they reach
+    a function with no further measured calls, so no path is a prefix of
+    another. If ``start`` was never measured (e.g. a profile of one entry
+    point), paths start at the functions nobody measured called.
+    """
+
+    callees: Dict[str, List[Tuple[float, str]]] = {}
+    called: Set[str] = set()
+    for (caller, callee), cost in heat.edges.items():
+        if caller != callee and cost.seconds > 0:
+            callees.setdefault(caller, []).append((cost.seconds, callee))
+            called.add(callee)
+
+    if start in callees:
+        starts = [start]
+    else:
+        starts = [name for name in callees if name not in called]
+    inf = float("inf")
+    queue: List[Tuple[float, int, List[str]]] = [(-inf, i, [name]) for i, name in enumerate(starts)]
+    heapq.heapify(queue)
+    tie = len(queue)
+    found: List[Tuple[float, List[str]]] = []
+    expansions = 0
+    # Best-first: extending a path never makes it heavier, so complete paths come out heaviest first.
+    while queue and len(found) < n and expansions < MAX_PATH_EXPANSIONS:
+        neg_weight, _tie, path = heapq.heappop(queue)
+        expansions += 1
+        on_path = set(path)
+        extended = False
+        for seconds, callee in callees.get(path[-1], ()):
+            if callee not in on_path:
+                heapq.heappush(queue, (max(neg_weight, -seconds), tie, path + [callee]))
+                tie += 1
+                extended = True
+        if not extended and len(path) > 1:
+            found.append((-neg_weight, path))
+    return found
+
+
+def merge_heat(graph: CallGraph, heat: Heat) -> CallGraph:
+    """Copy of ``graph`` plus the measured edges it does not have.
+
+    Added edges carry line RUNTIME_ONLY so they can be told apart after
+    filtering or clustering. Only edges touching a function of the static
+    graph are added; calls entirely inside other modules stay out.
+    """
+
+    merged = CallGraph()
+    merged.extend(graph)
+    pair_callers, pair_callees, _pair_of = graph.edge_pairs()
+    static = set(zip(pair_callers, pair_callees))
+    for caller, callee in heat.edges:
+        c = graph.node_id(caller)
+        e = graph.node_id(callee)
+        if c is None and e is None:
+            continue
+        if c is not None and e is not None and (c, e) in static:
+            continue
+        merged.add_edge(caller, callee, "", RUNTIME_ONLY)
+    return merged
+
+
+def runtime_only_pairs(graph: CallGraph) -> List[bool]:
+    # Per edge pair of ``graph``: True if none of its call sites is in the source.
+    pair_callers, _pair_callees, pair_of = graph.edge_pairs()
+    runtime_only = [True] * len(pair_callers)
+    for pair, line in zip(pair_of, graph.lines):
+        if line != RUNTIME_ONLY:
+            runtime_only[pair] = False
+    return runtime_only
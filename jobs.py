@@ -0,0 +1,146 @@
+import multiprocessing
+import pickle
+import queue
+import time
+from typing import Dict, List, Tuple
+
+from cluster import cluster_view
+from diff import diff_paths, merge_diff
+from heat import merge_heat
+from layout import compute_layout
+from main import analyze_flow
+from profiling import phase, subscribe, track_memory
+from watch import IncrementalAnalysis
+
+# Messages sent from the worker: ("phase", name), ("record", PhaseRecord), ("done", result) or ("error", text).
+JobMessage = Tuple[str, object]
+
+
+def _run_job(request: Dict[str, object], out: "multiprocessing.Queue[JobMessage]") -> None:
+    # Runs in the worker process: no tkinter here, only analysis and layout.
+    # A request carries either a "path" to analyze, an already analyzed "graph" to re-lay out, or
+    # a pickled "watch" state to bring up to date with the file (see watch.IncrementalAnalysis).
+    # With a "diff_base", the older revision is diffed against "diff_target" and the result returned.
+    # Timings of the instrumented phases are forwarded to the GUI as "record" messages.
+    subscribe(lambda record: out.put(("record", record._replace(profile=None))))
+    if request.get("trace_memory"):
+        track_memory()
+
+    data = None
+    result: Dict[str, object] = {}
+    graph = request.get("graph")
+    state = request.get("watch")
+    if isinstance(state, bytes):
+        # Watch mode: the IncrementalAnalysis travels pickled, so Tk only passes bytes along.
+        out.put(("phase", "re-analyzing"))
+        analysis = pickle.loads(state)
+        delta = analysis.update()
+        if delta is None:
+            out.put(("error", "Watching: file has a syntax error, keeping the last diagram."))
+            return
+        result = {"watch": pickle.dumps(analysis, pickle.HIGHEST_PROTOCOL), "delta": (len(delta.added), len(delta.removed))}
+        if not delta:
+            out.put(("done", dict(result, data=None, graph=None, pos=None, view=None)))
+            return
+        data = analysis.data()
+        graph = data["graph"]
+    elif graph is None:
+        out.put(("phase", "parsing"))
+        if state:
+            # Watch mode is on: keep the per-statement state for the following saves.
+            analysis = IncrementalAnalysis(request["path"])  # type: ignore[arg-type]
+            if analysis.update() is not None:
+                data = analysis.data()
+                result = {"watch": pickle.dumps(analysis, pickle.HIGHEST_PROTOCOL)}
+        else:
+            data = analyze_flow(request["path"], use_cache=bool(request.get("use_cache", True)))  # type: ignore[arg-type]
+        if not data:
+            out.put(("error", "Failed to analyze file. See terminal output for details."))
+            return
+        graph = data["graph"]
+
+    diff = request.get("diff")
+    if request.get("diff_base") is not None:
+        # Compare an older revision with the open file: only changed definitions are re-analyzed.
+        out.put(("phase", "diffing"))
+        diff = diff_paths(request["diff_base"], request["diff_target"])  # type: ignore[arg-type]
+        if diff is None:
+            out.put(("error", "Could not compare the two revisions. See terminal output for details."))
+            return
+        result["diff"] = diff
+
+    if request.get("heat") is not None:
+        # Measured calls missing from the source become extra (flagged) edges.
+        graph = merge_heat(graph, request["heat"])  # type: ignore[arg-type]
+    if diff is not None:
+        # Calls the diffed change removed are drawn too.
+        graph = merge_diff(graph, diff)  # type: ignore[arg-type]
+
+    if request.get("hide_builtins"):
+        out.put(("phase", "filtering"))
+        with phase("filter", nodes=graph.node_count):  # type: ignore[attr-defined]
+            graph = graph.without_builtins()  # type: ignore[attr-defined]
+
+    owners = data["owners"] if data else request.get("owners")
+    view = cluster_view(graph, str(request.get("grouping", "none")), owners, request.get("expanded"))  # type: ignore[arg-type]
+    if view is not None:
+        graph = view.graph
+
+    out.put(("phase", "layout"))
+    pos = compute_layout(graph, engine=str(request.get("engine", "layered")), preset=request.get("layout"))  # type: ignore[arg-type]
+
+    out.put(("done", dict(result, data=data, graph=graph, pos=pos, view=view)))
+
+
+class AnalysisJob:
+    """Analysis + layout of one file (or a re-layout of existing data) in a child process.
+
+    The GUI polls messages with ``poll()`` from ``root.after`` so Tk never
+    blocks; ``cancel()`` kills the worker outright, which also aborts a long
+    ``ast.parse`` that a thread could not interrupt.
+    """
+
+    def __init__(self, request: Dict[str, object]):
+        # "spawn" everywhere: forking a process that has Tk loaded is not safe.
+        ctx = multiprocessing.get_context("spawn")
+        self.request = request
+        self.phase = "starting"
+        self.phase_started = time.perf_counter()
+        self.started = self.phase_started
+        self._queue = ctx.Queue()
+        self._process = ctx.Process(target=_run_job, args=(request, self._queue), daemon=True)
+        self._process.start()
+        self.finished = False
+
+    def poll(self) -> List[JobMessage]:
+        # Check liveness first: anything sent before the worker exited is already in the pipe.
+        alive = self._process.is_alive()
+        messages: List[JobMessage] = []
+        while True:
+            try:
+                message = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            kind, payload = message
+            if kind == "phase":
+                self.phase = str(payload)
+                self.phase_started = time.perf_counter()
+            elif kind != "record":
+                self.finished = True
+            messages.append(message)
+
+        if not self.finished and not alive:
+            # Died without reporting (e.g. killed, or crashed while pickling the result).
+            self.finished = True
+            messages.append(("error", "Analysis worker exited unexpectedly."))
+        return messages
+
+    def cancel(self) -> None:
+        if self._process.is_alive():
+            self._process.terminate()
+        self.finished = True
+
+    def elapsed(self) -> Tuple[float, float]:
+        # (seconds in the current phase, seconds since the job started)
+        now = time.perf_counter()
+        return now - self.phase_started, now - self.started
@@ -0,0 +1,302 @@
+import math
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from graph import CallGraph
+from profiling import phase
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # optional: only the force-directed engine needs it
+    np = None
+
+Positions = Dict[str, Tuple[int, int]]
+
+DX = 260
+DY = 120
+MARGIN_X = 120
+MARGIN_Y = 120
+
+_SWEEPS = 4
+
+
+def node_size(label: str) -> Tuple[int, int]:
+    # Node size heuristic (shared by the GUI and the headless renderer)
+    w = max(140, min(360, 11 * len(label)))
+    h = 64
+    return w, h
+
+
+def _break_cycles(graph: CallGraph, roots: List[int]) -> Tuple[List[List[int]], List[List[int]]]:
+    # BFS call depth from the roots (Main Script first, then anything unreached). Only
+    # edges into a strictly deeper node are kept, which makes the result acyclic while
+    # preserving the familiar "column = call depth" reading; back and same-depth edges
+    # are still drawn, they just don't constrain layering or ordering.
+    n = graph.node_count
+    depth = [-1] * n
+    for root in roots:
+        if depth[root] >= 0:
+            continue
+        depth[root] = 0
+        queue = deque([root])
+        while queue:
+            u = queue.popleft()
+            for v in graph.successor_ids(u):
+                if depth[v] < 0:
+                    depth[v] = depth[u] + 1
+                    queue.append(v)
+
+    succ: List[List[int]] = [[] for _ in range(n)]
+    pred: List[List[int]] = [[] for _ in range(n)]
+    for u in range(n):
+        for v in graph.successor_ids(u):
+            if depth[v] > depth[u]:
+                succ[u].append(v)
+                pred[v].append(u)
+    return succ, pred
+
+
+def _assign_layers(succ: List[List[int]], pred: List[List[int]], roots: List[int], max_width: int) -> List[int]:
+    # Longest-path layering in topological (Kahn) order, but a node that would land in a
+    # full layer is pushed right to the next layer with room. "Next layer with room" is
+    # a union-find over layers, so the whole pass stays near-linear.
+    n = len(succ)
+    indegree = [len(p) for p in pred]
+    min_layer = [0] * n
+    layer = [0] * n
+    fill = [0] * (n + 1)
+    next_free = list(range(n + 2))
+
+    def find(i: int) -> int:
+        root = i
+        while next_free[root] != root:
+            root = next_free[root]
+        while next_free[i] != root:
+            next_free[i], i = root, next_free[i]
+        return root
+
+    queue = deque(r for r in roots if indegree[r] == 0)
+    while queue:
+        u = queue.popleft()
+        lvl = find(min_layer[u])
+        layer[u] = lvl
+        fill[lvl] += 1
+        if fill[lvl] >= max_width:
+            next_free[lvl] = lvl + 1
+        for v in succ[u]:
+            if lvl + 1 > min_layer[v]:
+                min_layer[v] = lvl + 1
+            indegree[v] -= 1
+            if indegree[v] == 0:
+                queue.append(v)
+
+    return layer
+
+
+def _order_layers(layers: List[List[int]], succ: List[List[int]], pred: List[List[int]], n: int) -> None:
+    # Barycenter heuristic: alternately sort each layer by the mean relative position of
+    # its neighbours in the layers before (down sweep) or after (up sweep) it.
+    rel = [0.0] * n
+    for nodes in layers:
+        size = len(nodes)
+        for i, v in enumerate(nodes):
+            rel[v] = (i + 0.5) / size
+
+    for sweep in range(_SWEEPS):
+        down = sweep % 2 == 0
+        neighbours = pred if down else succ
+        sequence = layers[1:] if down else layers[-2::-1]
+        for nodes in sequence:
+            keys: Dict[int, float] = {}
+            for v in nodes:
+                adj = neighbours[v]
+                keys[v] = sum(rel[u] for u in adj) / len(adj) if adj else rel[v]
+            nodes.sort(key=keys.__getitem__)
+            size = len(nodes)
+            for i, v in enumerate(nodes):
+                rel[v] = (i + 0.5) / size
+
+
+def layered_layout(graph: CallGraph, max_layer_width: Optional[int] = None) -> Positions:
+    """Sugiyama-style left-to-right layout.
+
+    Cycles are broken by BFS call depth from "Main Script", nodes get
+    longest-path layers over the remaining DAG capped at ``max_layer_width``
+    nodes per layer (default ~2*sqrt(n)), layers are reordered with barycenter
+    sweeps to reduce crossings, and each layer is centred vertically. Long
+    edges are not split into dummy nodes, which keeps the cost at
+    O(V log V + E).
+    """
+
+    n = graph.node_count
+    if n == 0:
+        return {}
+    names = graph.names
+
+    roots = sorted(range(n), key=names.__getitem__)
+    start = graph.node_id("Main Script")
+    if start is not None:
+        roots.remove(start)
+        roots.insert(0, start)
+
+    if max_layer_width is None:
+        max_layer_width = max(10, math.ceil(2 * math.sqrt(n)))
+
+    succ, pred = _break_cycles(graph, roots)
+    layer = _assign_layers(succ, pred, roots, max_layer_width)
+
+    layers: List[List[int]] = [[] for _ in range(max(layer) + 1)]
+    for v in roots:  # stable, deterministic initial order
+        layers[layer[v]].append(v)
+    layers = [nodes for nodes in layers if nodes]
+    _order_layers(layers, succ, pred, n)
+
+    widest = max(len(nodes) for nodes in layers)
+    pos: Positions = {}
+    for lvl, nodes in enumerate(layers):
+        offset = (widest - len(nodes)) * DY // 2
+        x = MARGIN_X + lvl * DX
+        for i, v in enumerate(nodes):
+            pos[names[v]] = (x, MARGIN_Y + offset + i * DY)
+    return pos
+
+
+def force_layout(graph: CallGraph, iterations: int = 60, block: int = 1024) -> Positions:
+    """Fruchterman-Reingold layout, vectorized with NumPy; suited to dense graphs.
+
+    Starts from the layered layout and relaxes it. Repulsion is computed in
+    row blocks of ``block`` nodes so memory stays O(block * n).
+    """
+
+    if np is None:
+        raise RuntimeError("The force-directed layout needs NumPy (pip install numpy).")
+
+    n = graph.node_count
+    if n < 2:
+        return layered_layout(graph)
+    names = graph.names
+
+    seed = layered_layout(graph)
+    pos = np.array([seed[name] for name in names], dtype=np.float64)
+
+    src_list: List[int] = []
+    dst_list: List[int] = []
+    for u in range(n):
+        for v in graph.successor_ids(u):
+            src_list.append(u)
+            dst_list.append(v)
+    src = np.array(src_list, dtype=np.intp)
+    dst = np.array(dst_list, dtype=np.intp)
+
+    k = float(DX)
+    temperature = k * 2.0
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        disp = np.zeros_like(pos)
+        for lo in range(0, n, block):
+            hi = min(n, lo + block)
+            delta = pos[lo:hi, None, :] - pos[None, :, :]
+            dist2 = np.einsum("ijk,ijk->ij", delta, delta)
+            np.maximum(dist2, 1.0, out=dist2)
+            disp[lo:hi] += np.einsum("ijk,ij->ik", delta, (k * k) / dist2)
+
+        if len(src):
+            delta = pos[src] - pos[dst]
+            dist = np.sqrt(np.einsum("ij,ij->i", delta, delta)) + 1e-9
+            pull = delta * (dist / k)[:, None]
+            np.subtract.at(disp, src, pull)
+            np.add.at(disp, dst, pull)
+
+        length = np.sqrt(np.einsum("ij,ij->i", disp, disp)) + 1e-9
+        pos += disp * (np.minimum(length, temperature) / length)[:, None]
+        temperature = max(temperature - cooling, 1.0)
+
+    pos -= pos.min(axis=0)
+    pos += (MARGIN_X, MARGIN_Y)
+    return {name: (int(x), int(y)) for name, (x, y) in zip(names, pos.tolist())}
+
+
+ENGINES: Dict[str, Callable[[CallGraph], Positions]] = {
+    "layered": layered_layout,
+    "force": force_layout,
+}
+
+
+def available_engines() -> List[str]:
+    return [name for name in ENGINES if name != "force" or np is not None]
+
+
+class LayoutCache:
+    """Small LRU of computed layouts keyed by (engine, graph fingerprint)."""
+
+    def __init__(self, capacity: int = 8):
+        self.capacity = capacity
+        self._entries: "OrderedDict[Tuple[str, str], Positions]" = OrderedDict()
+
+    def get(self, key: Tuple[str, str]) -> Optional[Positions]:
+        pos = self._entries.get(key)
+        if pos is not None:
+            self._entries.move_to_end(key)
+        return pos
+
+    def put(self, key: Tuple[str, str], pos: Positions) -> None:
+        self._entries[key] = pos
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+
+layout_cache = LayoutCache()
+
+
+def layout_key(graph: CallGraph, engine: str) -> Tuple[str, str]:
+    # The engine actually used (unavailable ones fall back to layered) plus what the layout depends on.
+    if engine not in available_engines():
+        engine = "layered"
+    return engine, graph.fingerprint()
+
+
+def cached_layout(
+    graph: CallGraph,
+    engine: str = "layered",
+    cache: LayoutCache = layout_cache,
+    preset: Optional[Positions] = None,
+) -> Optional[Positions]:
+    """The positions ``compute_layout`` would return without running an engine, or None."""
+
+    if preset is not None and all(name in preset for name in graph.names):
+        return preset
+    return cache.get(layout_key(graph, engine))
+
+
+def compute_layout(
+    graph: CallGraph,
+    engine: str = "layered",
+    cache: Optional[LayoutCache] = layout_cache,
+    preset: Optional[Positions] = None,
+) -> Positions:
+    """Lay out ``graph`` with the named engine, reusing a cached result for an identical graph.
+
+    ``preset`` (e.g. coordinates stored in a snapshot) is used as-is when it
+    places every node. The returned dict may be shared with the cache; treat
+    it as read-only.
+    """
+
+    if engine not in available_engines():
+        engine = "layered"
+
+    with phase("layout", nodes=graph.node_count, edges=len(graph)) as p:
+        if preset is not None and all(name in preset for name in graph.names):
+            p.set(preset=1)
+            return preset
+        if cache is None:
+            return ENGINES[engine](graph)
+
+        key = layout_key(graph, engine)
+        pos = cache.get(key)
+        p.set(cached=int(pos is not None))
+        if pos is None:
+            pos = ENGINES[engine](graph)
+            cache.put(key, pos)
+        return pos
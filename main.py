@@ -1,27 +1,143 @@
+import argparse
 import ast
+import csv
+import gc
+import io
+import json
 import os
 import sys
-from typing import Dict, List, Optional, Set, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
 
 
-FlowEdge = Tuple[str, str, str]  # (caller, callee, args_as_text)
+from cache import AnalysisCache
+from graph import CallGraph, EdgeView, FlowEdge
+from profiling import PhaseStats, capture_profiles, phase, subscribe, track_memory
+
+__version__ = "2.2.3"
+
+EdgeSink = Callable[[FlowEdge], None]
+
+OUTPUT_FORMATS = ("text", "ndjson", "csv", "tsv")
+
+# Directories never worth descending into when analyzing a whole tree.
+SKIP_DIRS: Set[str] = {"__pycache__", ".git", ".hg", ".svn", ".tox", ".nox", ".venv", "venv", "node_modules"}
+
+
+# AST fields that never hold child nodes we need to walk into (names, contexts, operators).
+_SCALAR_FIELDS: Set[str] = {
+    "ctx", "op", "ops", "id", "name", "attr", "arg", "asname", "module", "level",
+    "kind", "conversion", "is_async", "simple", "type_comment", "tag",
+}
+# Per node type: the remaining fields, in reverse ast._fields order (filled lazily).
+_CHILD_FIELDS: Dict[type, Tuple[str, ...]] = {ast.Constant: ()}
 
 
 class FlowAnalyzer(ast.NodeVisitor):
-    def __init__(self):
-        self.flow_data: List[FlowEdge] = []
+    def __init__(self, edge_sink: Optional[EdgeSink] = None):
+        # With an edge_sink, edges are handed off as they are visited instead of being stored.
+        self.edge_sink = edge_sink
+        self.graph = CallGraph()
         self.current_function = "Main Script"
+        self.current_class: Optional[str] = None
         self.defined_functions: Set[str] = set()
         self.assigned_to_by_callee: Dict[str, Set[str]] = {}
+        self.class_of: Dict[str, str] = {}  # method name -> innermost enclosing class
+
+    @property
+    def flow_data(self) -> EdgeView:
+        return self.graph.edges
 
     def visit_FunctionDef(self, node):
-        self.defined_functions.add(node.name)
-        previous_function = self.current_function
-        self.current_function = node.name
+        previous = self._enter_function(node)
+        self.generic_visit(node)
+        self.current_function, self.current_class = previous
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        previous = self._enter_class(node)
         self.generic_visit(node)
-        self.current_function = previous_function
+        self.current_function, self.current_class = previous
 
     def visit_Assign(self, node):
+        self._record_assign(node)
+        self.generic_visit(node)
+
+    def visit_AnnAssign(self, node):
+        self._record_ann_assign(node)
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        self._record_call(node)
+        self.generic_visit(node)
+
+    def walk(self, tree: ast.AST) -> None:
+        """Iterative equivalent of ``visit(tree)``: same edges in the same order.
+
+        Uses an explicit stack instead of recursion, so deeply nested code cannot
+        raise RecursionError, and dispatches through a table of the few node
+        types we handle instead of a getattr per node.
+        """
+
+        handlers = {
+            ast.FunctionDef: self._enter_function,
+            ast.AsyncFunctionDef: self._enter_function,
+            ast.ClassDef: self._enter_class,
+            ast.Assign: self._record_assign,
+            ast.AnnAssign: self._record_ann_assign,
+            ast.Call: self._record_call,
+        }
+        child_fields = _CHILD_FIELDS
+        AST = ast.AST
+
+        # Holds AST nodes to visit and, below a function's or class's children, the
+        # (function, class) context to restore once they are done.
+        stack: List[object] = [tree]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            node = pop()
+            cls = node.__class__
+            if cls is tuple:
+                self.current_function, self.current_class = node  # type: ignore[misc]
+                continue
+
+            handler = handlers.get(cls)
+            if handler is not None:
+                previous = handler(node)
+                if previous is not None:
+                    push(previous)
+
+            # Children are pushed last-to-first so they pop in generic_visit order.
+            fields = child_fields.get(cls)
+            if fields is None:
+                fields = child_fields[cls] = tuple(f for f in reversed(cls._fields) if f not in _SCALAR_FIELDS)
+            for field in fields:
+                value = getattr(node, field, None)
+                if value.__class__ is list:
+                    for item in reversed(value):
+                        if isinstance(item, AST):
+                            push(item)
+                elif isinstance(value, AST):
+                    push(value)
+
+    def _enter_function(self, node) -> Tuple[str, Optional[str]]:
+        self.defined_functions.add(node.name)
+        if self.current_class is not None:
+            self.class_of[node.name] = self.current_class
+        previous = (self.current_function, self.current_class)
+        self.current_function = node.name
+        return previous
+
+    def _enter_class(self, node) -> Tuple[str, Optional[str]]:
+        previous = (self.current_function, self.current_class)
+        self.current_class = node.name
+        return previous
+
+    def _record_assign(self, node) -> None:
         # Capture: x = foo(...)
         if isinstance(node.value, ast.Call):
             callee_name = self._get_func_name(node.value)
@@ -32,9 +148,7 @@ class FlowAnalyzer(ast.NodeVisitor):
                 if targets:
                     self.assigned_to_by_callee.setdefault(callee_name, set()).update(targets)
 
-        self.generic_visit(node)
-
-    def visit_AnnAssign(self, node):
+    def _record_ann_assign(self, node) -> None:
         # Capture: x: int = foo(...)
         if isinstance(node.value, ast.Call):
             callee_name = self._get_func_name(node.value)
@@ -43,9 +157,7 @@ class FlowAnalyzer(ast.NodeVisitor):
                 if targets:
                     self.assigned_to_by_callee.setdefault(callee_name, set()).update(targets)
 
-        self.generic_visit(node)
-
-    def visit_Call(self, node):
+    def _record_call(self, node) -> None:
         callee_name = self._get_func_name(node)
 
         args_passed = []
@@ -60,9 +172,13 @@ class FlowAnalyzer(ast.NodeVisitor):
         args_str = ", ".join(args_passed)
 
         if callee_name:
-            self.flow_data.append((self.current_function, callee_name, args_str))
+            self._add_edge(self.current_function, callee_name, args_str, getattr(node, "lineno", 0))
 
-        self.generic_visit(node)
+    def _add_edge(self, caller: str, callee: str, args_str: str, line: int = 0):
+        if self.edge_sink is not None:
+            self.edge_sink((caller, callee, args_str))
+        else:
+            self.graph.add_edge(caller, callee, args_str, line)
 
     def _get_func_name(self, node):
         if isinstance(node.func, ast.Name):
@@ -92,60 +208,634 @@ class FlowAnalyzer(ast.NodeVisitor):
         return []
 
 
-def analyze_flow(target_file: str) -> Optional[Dict[str, object]]:
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    # Parsing and walking allocate millions of AST nodes and edges but create no garbage
+    # cycles; without this the cyclic collector keeps rescanning them (~half the run time).
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+_cache: Optional[AnalysisCache] = None
+
+
+def _get_cache() -> AnalysisCache:
+    global _cache
+    if _cache is None:
+        _cache = AnalysisCache(version=__version__)
+    return _cache
+
+
+def _to_cache_payload(data: Dict[str, object]) -> Dict[str, object]:
+    return {
+        "graph": data["graph"].to_dict(),  # type: ignore[attr-defined]
+        "defined_functions": sorted(data["defined_functions"]),  # type: ignore[arg-type]
+        "assigned_to_by_callee": {k: sorted(v) for k, v in data["assigned_to_by_callee"].items()},  # type: ignore[attr-defined]
+        "owners": {k: list(v) for k, v in data["owners"].items()},  # type: ignore[attr-defined]
+    }
+
+
+def _from_cache_payload(payload: Dict[str, object]) -> Dict[str, object]:
+    return _build_result(
+        CallGraph.from_dict(payload["graph"]),  # type: ignore[arg-type]
+        set(payload["defined_functions"]),  # type: ignore[arg-type]
+        {k: set(v) for k, v in payload["assigned_to_by_callee"].items()},  # type: ignore[attr-defined]
+        {k: tuple(v) for k, v in payload["owners"].items()},  # type: ignore[attr-defined]
+    )
+
+
+def module_owners(target_file: str, defined_functions: Iterable[str], class_of: Dict[str, str]) -> Dict[str, Tuple[str, ...]]:
+    # (module,) for plain functions, (module, class) for methods.
+    module = os.path.splitext(os.path.basename(target_file))[0]
+    return {name: (module, class_of[name]) if name in class_of else (module,) for name in defined_functions}
+
+
+def _build_result(
+    graph: CallGraph,
+    defined_functions: Set[str],
+    assigned_to_by_callee: Dict[str, Set[str]],
+    owners: Optional[Dict[str, Tuple[str, ...]]] = None,
+) -> Dict[str, object]:
+    graph.add_node("Main Script")  # always present
+
+    return {
+        "nodes": set(graph.names),
+        "edges": graph.edges,
+        "multi_edges": graph.multi_edges,
+        "graph": graph,
+        "defined_functions": defined_functions,
+        "assigned_to_by_callee": assigned_to_by_callee,
+        "owners": owners or {},
+    }
+
+
+def analyze_flow(target_file: str, use_cache: bool = True) -> Optional[Dict[str, object]]:
     """Parse a Python file and return program flow data for GUI rendering.
 
+    Results are cached on disk keyed by path + content hash (see cache.py),
+    so unchanged files skip the parse entirely; pass use_cache=False to
+    always re-analyze.
+
     Returns a dict with:
       - nodes: set[str]
-      - edges: list[(caller, callee, args_as_text)]
+      - edges: sequence of (caller, callee, args_as_text) (a view over ``graph``)
+      - multi_edges: one MultiEdge per (caller, callee) pair with the call-site
+        count, distinct argument texts and line numbers (built on first access)
+      - graph: CallGraph (interned, array-backed form of the edges)
       - defined_functions: set[str]
       - assigned_to_by_callee: dict[str, set[str]]
     or None on error.
     """
 
     if not os.path.exists(target_file):
-        print(f"Error: Could not find file at: {os.path.abspath(target_file)}")
+        print(f"Error: Could not find file at: {os.path.abspath(target_file)}", file=sys.stderr)
         return None
 
     try:
-        with open(target_file, "r", encoding="utf-8") as source:
-            tree = ast.parse(source.read())
+        with phase("read") as p:
+            with open(target_file, "rb") as source:
+                raw = source.read()
+            p.set(bytes=len(raw))
     except Exception as e:
-        print(f"Error: Failed to parse Python file: {e}")
+        print(f"Error: Failed to read Python file: {e}", file=sys.stderr)
         return None
 
+    cache = _get_cache() if use_cache else None
+    if cache is not None:
+        with phase("cache_load") as p:
+            payload = cache.get(target_file, raw)
+            cached = _from_cache_payload(payload) if payload is not None else None
+            p.set(hits=int(cached is not None))
+        if cached is not None:
+            return cached
+
     analyzer = FlowAnalyzer()
-    analyzer.visit(tree)
+    with _gc_paused():
+        try:
+            with phase("parse"):
+                tree = ast.parse(raw.decode("utf-8"))
+        except Exception as e:
+            print(f"Error: Failed to parse Python file: {e}", file=sys.stderr)
+            return None
+
+        with phase("visit") as p:
+            analyzer.walk(tree)
+            p.set(nodes=analyzer.graph.node_count, edges=len(analyzer.graph))
+
+    data = _build_result(
+        analyzer.graph,
+        analyzer.defined_functions,
+        analyzer.assigned_to_by_callee,
+        module_owners(target_file, analyzer.defined_functions, analyzer.class_of),
+    )
+    if cache is not None:
+        with phase("cache_store"):
+            cache.put(target_file, raw, _to_cache_payload(data))
+    return data
+
+
+def stream_flow(target_file: str, edge_sink: EdgeSink) -> bool:
+    """Analyze a file, passing each edge to edge_sink as soon as it is visited.
+
+    Nothing is accumulated (and the cache is not consulted), so memory stays
+    bounded by the file's AST. Returns False if the file could not be parsed.
+    """
 
-    nodes: Set[str] = set(["Main Script"])  # always present
-    for caller, callee, _ in analyzer.flow_data:
-        nodes.add(caller)
-        nodes.add(callee)
+    with _gc_paused():
+        try:
+            with open(target_file, "rb") as source:
+                tree = ast.parse(source.read().decode("utf-8"))
+        except Exception as e:
+            print(f"Error: Failed to parse Python file {target_file}: {e}", file=sys.stderr)
+            return False
+
+        FlowAnalyzer(edge_sink=edge_sink).walk(tree)
+    return True
+
+
+def _collect_edges(target_file: str) -> List[FlowEdge]:
+    # Pool worker for streaming mode: one file's edges as plain tuples.
+    edges: List[FlowEdge] = []
+    stream_flow(target_file, edges.append)
+    return edges
+
+
+def iter_python_files(paths: Iterable[str]) -> List[str]:
+    # Expand directories into the .py files below them (sorted, so merges are deterministic).
+    files: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS and not d.startswith("."))
+                for name in sorted(filenames):
+                    if name.endswith(".py"):
+                        files.append(os.path.join(dirpath, name))
+        else:
+            files.append(path)
+    return files
+
+
+def _merge_results(results: Iterable[Optional[Dict[str, object]]]) -> Dict[str, object]:
+    graph = CallGraph()
+    defined_functions: Set[str] = set()
+    assigned_to_by_callee: Dict[str, Set[str]] = {}
+    owners: Dict[str, Tuple[str, ...]] = {}
+
+    for data in results:
+        if not data:
+            continue
+        graph.extend(data["graph"])  # type: ignore[arg-type]
+        defined_functions.update(data["defined_functions"])  # type: ignore[arg-type]
+        for callee, targets in data["assigned_to_by_callee"].items():  # type: ignore[attr-defined]
+            assigned_to_by_callee.setdefault(callee, set()).update(targets)
+        owners.update(data["owners"])  # type: ignore[arg-type]
+
+    return _build_result(graph, defined_functions, assigned_to_by_callee, owners)
+
+
+def analyze_project(
+    paths: Iterable[str],
+    workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    use_cache: bool = True,
+    low_memory: bool = False,
+) -> Optional[Dict[str, object]]:
+    """Analyze many files (or whole directories) and merge them into one graph.
+
+    Each file is parsed and visited independently on a process pool, so
+    throughput scales with the number of cores. ``workers`` defaults to
+    ``os.cpu_count()``; ``chunksize`` defaults to a few chunks per worker.
+    Files that fail to parse are reported and skipped. Each worker consults
+    the on-disk cache unless ``use_cache`` is False; with ``low_memory`` files
+    are analyzed one top-level statement at a time (see chunked.py), uncached.
+
+    Returns the same dict shape as ``analyze_flow`` plus:
+      - files: list[str] of the files that were analyzed
+    or None if no file could be analyzed.
+    """
 
-    return {
-        "nodes": nodes,
-        "edges": analyzer.flow_data,
-        "defined_functions": analyzer.defined_functions,
-        "assigned_to_by_callee": analyzer.assigned_to_by_callee,
-    }
+    files = iter_python_files(paths)
+    if not files:
+        print("Error: No Python files found.", file=sys.stderr)
+        return None
+
+    analyze: Callable[[str], Optional[Dict[str, object]]] = partial(analyze_flow, use_cache=use_cache)
+    if low_memory:
+        from chunked import analyze_flow_chunked
+
+        analyze = analyze_flow_chunked
+    workers = max(1, min(workers or os.cpu_count() or 1, len(files)))
+    if workers == 1:
+        results = [analyze(f) for f in files]
+    else:
+        if chunksize is None:
+            chunksize = max(1, len(files) // (workers * 4))
+        # Phases inside pool workers are not reported back; only the wall time is.
+        with phase("analyze_pool", files=len(files), workers=workers):
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(analyze, files, chunksize=chunksize))
+
+    analyzed = [f for f, r in zip(files, results) if r]
+    if not analyzed:
+        return None
+
+    with phase("merge", files=len(analyzed)):
+        merged = _merge_results(results)
+    merged["files"] = analyzed
+    return merged
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py", description="Print caller -> callee edges of Python code.")
+    parser.add_argument("paths", nargs="*", help="Python file(s) or directories to analyze, or one .pfsnap snapshot")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes for multi-file analysis (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=None, help="files handed to a worker at a time")
+    parser.add_argument("--no-cache", action="store_true", help="ignore and do not update the on-disk analysis cache")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="text", help="edge output format (default: text)")
+    parser.add_argument("--stream", action="store_true", help="write edges as they are found instead of after the whole analysis (bypasses the cache)")
+    parser.add_argument(
+        "--low-memory",
+        action="store_true",
+        help="parse one top-level statement at a time instead of whole files, for huge generated modules (bypasses the cache)",
+    )
+    parser.add_argument("--watch", action="store_true", help="keep running and print added/removed edges whenever a file changes")
+    parser.add_argument("--interval", type=float, default=0.5, help="polling interval in seconds for --watch")
+    parser.add_argument("--profile", action="store_true", help="print per-phase time, peak memory and counts to stderr")
+    parser.add_argument("--profile-format", choices=("table", "json"), default="table", help="format of the --profile report (default: table)")
+    parser.add_argument("--callers-of", metavar="NAME", default=None, help="print every function that can (transitively) call NAME instead of the edges")
+    parser.add_argument("--callees-of", metavar="NAME", default=None, help="print every function NAME (transitively) calls instead of the edges")
+    parser.add_argument("--path", nargs=2, metavar=("FROM", "TO"), default=None, help="print the shortest call path from FROM to TO")
+    parser.add_argument("--depth", type=int, default=None, help="limit --callers-of/--callees-of to N calls away")
+    parser.add_argument("--export", metavar="FILE", default=None, help="write the analysis to a .pfsnap snapshot instead of printing edges")
+    parser.add_argument("--export-layout", action="store_true", help="also store node coordinates in the snapshot")
+    parser.add_argument(
+        "--layout-engine",
+        choices=("layered", "force"),
+        default="layered",
+        help="layout engine for --export-layout (default: layered)",
+    )
+    parser.add_argument("--profile-dump", metavar="FILE", default=None, help="also run phases under cProfile and write the slowest one to FILE (.prof)")
+    parser.add_argument(
+        "--heat",
+        metavar="FILE",
+        default=None,
+        help="lay measured cost (a .pftrace from tracing.py or a cProfile .prof dump) over the graph and print the hottest calls instead of the edges",
+    )
+    parser.add_argument("--top", type=int, default=20, help="number of calls to print with --heat (default: 20)")
+    parser.add_argument("--hot-paths", type=int, metavar="N", default=None, help="with --heat, also print the N heaviest call paths from Main Script")
+    parser.add_argument(
+        "--diff",
+        nargs=2,
+        metavar=("OLD", "NEW"),
+        default=None,
+        help="print the calls added, removed or changed in arity between two files or directory trees",
+    )
+    return parser
+
+
+def _open_output() -> TextIO:
+    # Large write buffer on stdout; csv needs newline="" to control line endings itself.
+    sys.stdout.flush()
+    return io.open(sys.stdout.fileno(), "w", buffering=1 << 16, encoding="utf-8", newline="", closefd=False)
+
+
+def _make_edge_writer(fmt: str, out: TextIO) -> EdgeSink:
+    if fmt == "ndjson":
+        dumps = json.dumps
+
+        def write_ndjson(edge: FlowEdge) -> None:
+            out.write(dumps({"caller": edge[0], "callee": edge[1], "args": edge[2]}) + "\n")
+
+        return write_ndjson
+
+    if fmt in ("csv", "tsv"):
+        writer = csv.writer(out, delimiter="," if fmt == "csv" else "\t", lineterminator="\n")
+        writer.writerow(("caller", "callee", "args"))
+        return writer.writerow  # type: ignore[return-value]
+
+    out.write("Edges:\n")
+
+    def write_text(edge: FlowEdge) -> None:
+        out.write(f"  {_format_edge(edge)}\n")
+
+    return write_text
+
+
+def _stream_files(
+    files: List[str],
+    sink: EdgeSink,
+    workers: Optional[int],
+    chunksize: Optional[int],
+    low_memory: bool = False,
+) -> bool:
+    stream: Callable[[str, EdgeSink], bool] = stream_flow
+    collect: Callable[[str], List[FlowEdge]] = _collect_edges
+    if low_memory:
+        from chunked import _collect_edges_chunked, stream_flow_chunked
+
+        stream = stream_flow_chunked
+        collect = _collect_edges_chunked
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(files)))
+    ok = False
+    if workers == 1:
+        for f in files:
+            ok = stream(f, sink) or ok
+        return ok
+
+    # Per-file results come back in order; only the files in flight are held in memory.
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for edges in executor.map(collect, files, chunksize=chunksize or 1):
+            for edge in edges:
+                sink(edge)
+            ok = ok or bool(edges)
+    return ok
 
 
 def _run_cli() -> int:
-    if len(sys.argv) < 2:
-        print("Usage: python main.py <path_to_python_file.py>")
-        return 2
+    parser = _build_arg_parser()
+    args = parser.parse_args()
+    querying = bool(args.callers_of or args.callees_of or args.path)
+    if args.diff is not None:
+        if args.paths or args.stream or args.watch or args.heat or querying or args.export:
+            parser.error("--diff takes no other paths and cannot be combined with --stream, --watch, --heat, --export or queries")
+    elif not args.paths:
+        parser.error("the following arguments are required: paths")
+    if querying and (args.stream or args.watch):
+        parser.error("--callers-of/--callees-of/--path cannot be combined with --stream or --watch")
+    if args.heat and (args.stream or args.watch or querying):
+        parser.error("--heat cannot be combined with --stream, --watch or queries")
+    if args.watch and args.format in ("csv", "tsv"):
+        # A delta row does not fit the header already written for the edges.
+        parser.error("--watch supports --format text or ndjson")
+    if args.top < 1:
+        parser.error("--top must be at least 1")
+    if args.hot_paths is not None and (not args.heat or args.hot_paths < 1):
+        parser.error("--hot-paths needs --heat and must be at least 1")
+    if args.depth is not None and args.depth < 1:
+        parser.error("--depth must be at least 1")
+    if args.export_layout and not args.export:
+        parser.error("--export-layout needs --export")
+
+    stats: Optional[PhaseStats] = None
+    if args.profile or args.profile_dump:
+        stats = PhaseStats()
+        subscribe(stats)
+        track_memory()
+        capture_profiles(bool(args.profile_dump))
+
+    use_cache = not args.no_cache
+    out = _open_output()
+    try:
+        if args.diff is not None:
+            return _run_diff(args.diff[0], args.diff[1], args.format, out)
+        if args.stream:
+            sink = _make_edge_writer(args.format, out)
+            files = iter_python_files(args.paths)
+            with phase("stream", files=len(files)):
+                ok = _stream_files(files, sink, args.workers, args.chunksize, args.low_memory)
+            if not ok:
+                return 1
+        else:
+            if len(args.paths) == 1 and args.paths[0].lower().endswith(".pfsnap"):
+                data = _load_snapshot(args.paths[0])
+            elif len(args.paths) == 1 and not os.path.isdir(args.paths[0]):
+                if args.low_memory:
+                    from chunked import analyze_flow_chunked
+
+                    data = analyze_flow_chunked(args.paths[0])
+                else:
+                    data = analyze_flow(args.paths[0], use_cache=use_cache)
+            else:
+                data = analyze_project(
+                    args.paths, workers=args.workers, chunksize=args.chunksize, use_cache=use_cache, low_memory=args.low_memory
+                )
+            if not data:
+                return 1
+
+            if querying:
+                return _run_queries(data["graph"], args, out)  # type: ignore[arg-type]
+            if args.heat:
+                # cProfile dumps are matched against the analyzed files; snapshots don't record them.
+                files = None if args.paths[0].lower().endswith(".pfsnap") else data.get("files", args.paths)
+                return _run_heat(data, files, args.heat, args.top, args.hot_paths, out)  # type: ignore[arg-type]
+            if args.export:
+                return _export_snapshot(data, args.export, args.layout_engine if args.export_layout else None)
+
+            sink = _make_edge_writer(args.format, out)
+            with phase("write", edges=len(data["edges"])):  # type: ignore[arg-type]
+                for edge in data["edges"]:  # type: ignore[attr-defined]
+                    sink(edge)
+    finally:
+        out.flush()
+        if stats is not None:
+            _report_profile(stats, args.profile_format, args.profile_dump)
+
+    if args.watch:
+        return _run_watch(iter_python_files(args.paths), args.interval, args.format)
+
+    return 0
+
+
+def _load_snapshot(path: str) -> Optional[Dict[str, object]]:
+    from snapshot import load_snapshot
+
+    try:
+        with phase("snapshot_load") as p:
+            data = load_snapshot(path)
+            p.set(nodes=data["graph"].node_count, edges=len(data["graph"]))  # type: ignore[attr-defined, arg-type]
+    except (OSError, ValueError) as e:
+        print(f"Error: Failed to load snapshot: {e}", file=sys.stderr)
+        return None
+    return data
+
+
+def _export_snapshot(data: Dict[str, object], path: str, engine: Optional[str]) -> int:
+    from snapshot import save_snapshot
 
-    target_path = sys.argv[1]
-    data = analyze_flow(target_path)
-    if not data:
+    pos = None
+    if engine is not None:
+        from layout import compute_layout
+
+        pos = compute_layout(data["graph"], engine=engine, cache=None)  # type: ignore[arg-type]
+    try:
+        with phase("snapshot_save"):
+            save_snapshot(path, data, pos=pos, engine=engine, version=__version__)
+    except OSError as e:
+        print(f"Error: Failed to write snapshot: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _run_queries(graph: CallGraph, args: argparse.Namespace, out: TextIO) -> int:
+    from query import CallIndex
+
+    with phase("index", nodes=graph.node_count, edges=len(graph)):
+        index = CallIndex(graph)
+
+    def write_matches(title: str, matches: Dict[str, int]) -> None:
+        within = f" (within {args.depth} calls)" if args.depth else ""
+        out.write(f"{title}{within}:\n")
+        for name, depth in sorted(matches.items(), key=lambda item: (item[1], item[0])):
+            out.write(f"  {name} (depth {depth})\n" if args.depth else f"  {name}\n")
+        if not matches:
+            out.write("  (none)\n")
+
+    status = 0
+    try:
+        with phase("query"):
+            if args.callers_of:
+                write_matches(f"Callers of {args.callers_of}", index.callers_of(args.callers_of, args.depth))
+            if args.callees_of:
+                write_matches(f"Callees of {args.callees_of}", index.callees_of(args.callees_of, args.depth))
+            if args.path:
+                source, target = args.path
+                path = index.shortest_path(source, target)
+                if path is None:
+                    out.write(f"No call path from {source} to {target}.\n")
+                    status = 1
+                else:
+                    out.write(f"Path ({len(path) - 1} calls):\n  {' -> '.join(path)}\n")
+    except KeyError as e:
+        out.flush()
+        print(f"Error: No function named {e} in the analyzed code.", file=sys.stderr)
+        return 1
+    return status
+
+
+def _run_heat(
+    data: Dict[str, object],
+    files: Optional[List[str]],
+    path: str,
+    top: int,
+    hot_paths: Optional[int],
+    out: TextIO,
+) -> int:
+    from heat import RUNTIME_ONLY, hottest_paths, load_heat, merge_heat
+
+    graph: CallGraph = data["graph"]  # type: ignore[assignment]
+    defined: Set[str] = data["defined_functions"]  # type: ignore[assignment]
+    try:
+        with phase("heat_load"):
+            heat = load_heat(path, files)
+    except (OSError, ValueError) as e:
+        print(f"Error: Failed to load trace: {e}", file=sys.stderr)
+        return 1
+
+    merged = merge_heat(graph, heat)
+    names = merged.names
+    pair_callers, pair_callees, pair_of = merged.edge_pairs()
+    runtime_only = {(names[pair_callers[p]], names[pair_callees[p]]) for p, line in zip(pair_of, merged.lines) if line == RUNTIME_ONLY}
+    static = {(names[c], names[e]) for c, e in zip(pair_callers, pair_callees)} - runtime_only
+    # Only calls the diagram would show: merge_heat leaves out those outside the analyzed code.
+    hot = [(caller, callee, cost) for caller, callee, cost in heat.hottest_edges() if (caller, callee) in static or (caller, callee) in runtime_only]
+
+    out.write(f"Hottest calls ({heat.source or path}):\n")
+    out.write(f"  {'seconds':>10} {'calls':>9}  call\n")
+    for caller, callee, cost in hot[:top]:
+        flag = "  [not in source]" if (caller, callee) in runtime_only else ""
+        out.write(f"  {cost.seconds:>10.4f} {cost.calls:>9}  {caller} -> {callee}{flag}\n")
+    if not hot:
+        out.write("  (none)\n")
+    # Calls into built-ins and libraries are never recorded, so only those to defined functions count.
+    checked = {pair for pair in static if pair[1] in defined}
+    unseen = len(checked - set(heat.edges))
+    out.write(f"{len(runtime_only)} call(s) seen only at runtime; {unseen} of {len(checked)} static call(s) to defined functions never ran.\n")
+
+    if hot_paths:
+        paths = hottest_paths(heat, hot_paths)
+        out.write("\nHottest paths (weighed by their lightest call):\n")
+        for seconds, names in paths:
+            cost = heat.nodes.get(names[-1])
+            own = f", {cost.own:.4f}s own in {names[-1]}" if cost else ""
+            out.write(f"  {seconds:>10.4f}  {' -> '.join(names)}{own}\n")
+        if not paths:
+            out.write("  (none)\n")
+    return 0
+
+
+def _run_diff(old: str, new: str, fmt: str, out: TextIO) -> int:
+    from diff import ARITY, REMOVED, diff_paths
+
+    for path in (old, new):
+        if not os.path.exists(path):
+            print(f"Error: File not found: {path}", file=sys.stderr)
+            return 1
+    result = diff_paths(old, new)
+    if result is None:
         return 1
 
-    edges = data["edges"]
-    print("Edges:")
-    for caller, callee, args in edges:  # type: ignore[misc]
-        suffix = f" ({args})" if args else ""
-        print(f"  {caller} -> {callee}{suffix}")
+    if fmt == "ndjson":
+        for change in result.changes:
+            out.write(json.dumps(change._asdict()) + "\n")
+        return 0
+    if fmt in ("csv", "tsv"):
+        writer = csv.writer(out, delimiter="," if fmt == "csv" else "\t", lineterminator="\n")
+        writer.writerow(("kind", "caller", "callee", "args", "old_args", "line", "path"))
+        writer.writerows(result.changes)
+        return 0
+
+    markers = {REMOVED: "-", ARITY: "~"}
+    path = None
+    for change in result.changes:
+        if result.files > 1 and change.path != path:
+            path = change.path
+            out.write(f"{path}:\n")
+        edge = _format_edge((change.caller, change.callee, change.args))
+        if change.kind == ARITY:
+            edge = f"{change.caller} -> {change.callee} ({change.old_args}) -> ({change.args})"
+        out.write(f"  {markers.get(change.kind, '+')} {edge}  [line {change.line}]\n")
+    counts = result.counts()
+    out.write(
+        f"{counts['added']} added, {counts['removed']} removed, {counts['arity']} changed arity "
+        f"in {result.files_changed} of {result.files} file(s); re-analyzed {result.analyzed} changed definition(s).\n"
+    )
+    return 0
+
 
+def _report_profile(stats: PhaseStats, fmt: str, dump_path: Optional[str]) -> None:
+    print(stats.to_json() if fmt == "json" else stats.format_table(), file=sys.stderr)
+    if dump_path:
+        name = stats.dump_slowest(dump_path)
+        if name is None:
+            print("Error: No profiled phase to dump.", file=sys.stderr)
+        else:
+            print(f"Wrote cProfile data for phase '{name}' to {dump_path}", file=sys.stderr)
+
+
+def _format_edge(edge: FlowEdge) -> str:
+    caller, callee, args_text = edge
+    suffix = f" ({args_text})" if args_text else ""
+    return f"{caller} -> {callee}{suffix}"
+
+
+def _run_watch(files: List[str], interval: float, fmt: str) -> int:
+    from watch import GraphDelta, watch
+
+    def on_delta(path: str, delta: GraphDelta) -> None:
+        if fmt == "ndjson":
+            # Same keys as --diff rows, so a consumer can tell the delta from the initial edges.
+            for kind, edges in (("removed", delta.removed), ("added", delta.added)):
+                for caller, callee, args_text in edges:
+                    print(json.dumps({"kind": kind, "caller": caller, "callee": callee, "args": args_text, "path": path}))
+        else:
+            print(f"{path}: +{len(delta.added)} -{len(delta.removed)}")
+            for edge in delta.removed:
+                print(f"  - {_format_edge(edge)}")
+            for edge in delta.added:
+                print(f"  + {_format_edge(edge)}")
+        sys.stdout.flush()
+
+    print(f"Watching {len(files)} file(s), press Ctrl+C to stop.", file=sys.stderr)
+    try:
+        watch(files, on_delta, interval=interval)
+    except KeyboardInterrupt:
+        pass
     return 0
 
 
@@ -0,0 +1,169 @@
+import cProfile
+import json
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+
+class PhaseRecord(NamedTuple):
+    name: str
+    seconds: float
+    peak_bytes: Optional[int]  # None unless memory tracking is on
+    counts: Dict[str, int]
+    profile: Optional[cProfile.Profile] = None  # only with cProfile capture on
+
+
+PhaseHook = Callable[[PhaseRecord], None]
+
+_hooks: List[PhaseHook] = []
+_capture_profiles = False
+_active: List["_Phase"] = []
+
+
+def subscribe(hook: PhaseHook) -> None:
+    """Call ``hook`` with a PhaseRecord each time an instrumented phase finishes."""
+
+    if hook not in _hooks:
+        _hooks.append(hook)
+
+
+def unsubscribe(hook: PhaseHook) -> None:
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def track_memory(enabled: bool = True) -> None:
+    # Peak allocation per phase comes from tracemalloc, which slows allocation down noticeably.
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def capture_profiles(enabled: bool = True) -> None:
+    # Run each outermost phase under cProfile so the slowest one can be dumped.
+    global _capture_profiles
+    _capture_profiles = enabled
+
+
+class _NullPhase:
+    def __enter__(self) -> "_NullPhase":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+    def set(self, **counts: int) -> None:
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    def __init__(self, name: str, counts: Dict[str, int]):
+        self.name = name
+        self.counts = counts
+        self._peak = 0
+        self._base = 0
+        self._profile: Optional[cProfile.Profile] = None
+
+    def set(self, **counts: int) -> None:
+        self.counts.update(counts)
+
+    def __enter__(self) -> "_Phase":
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if _active:
+                # reset_peak() below would lose the enclosing phase's peak so far.
+                parent = _active[-1]
+                parent._peak = max(parent._peak, peak - parent._base)
+            tracemalloc.reset_peak()
+            self._base = current
+        if _capture_profiles and not _active:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        _active.append(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        seconds = time.perf_counter() - self._start
+        _active.pop()
+        if self._profile is not None:
+            self._profile.disable()
+
+        peak_bytes: Optional[int] = None
+        if tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+            peak_bytes = max(self._peak, peak - self._base)
+            if _active:
+                parent = _active[-1]
+                parent._peak = max(parent._peak, peak - parent._base)
+
+        record = PhaseRecord(self.name, seconds, peak_bytes, self.counts, self._profile)
+        for hook in list(_hooks):
+            hook(record)
+
+
+def phase(name: str, **counts: int):
+    """Context manager timing one phase; a no-op unless someone subscribed.
+
+    Use ``with phase("parse") as p: ...; p.set(nodes=n)`` to attach counts.
+    """
+
+    if not _hooks:
+        return _NULL_PHASE
+    return _Phase(name, dict(counts))
+
+
+class PhaseStats:
+    """Collects PhaseRecords and aggregates them per phase name (in first-seen order)."""
+
+    def __init__(self) -> None:
+        self.records: List[PhaseRecord] = []
+
+    def __call__(self, record: PhaseRecord) -> None:
+        self.records.append(record)
+
+    def clear(self) -> None:
+        self.records = []
+
+    def summary(self) -> List[Dict[str, object]]:
+        rows: Dict[str, Dict[str, object]] = {}
+        for r in self.records:
+            row = rows.setdefault(r.name, {"phase": r.name, "calls": 0, "seconds": 0.0, "peak_bytes": None, "counts": {}})
+            row["calls"] += 1  # type: ignore[operator]
+            row["seconds"] += r.seconds  # type: ignore[operator]
+            if r.peak_bytes is not None:
+                row["peak_bytes"] = max(row["peak_bytes"] or 0, r.peak_bytes)  # type: ignore[call-overload]
+            counts: Dict[str, int] = row["counts"]  # type: ignore[assignment]
+            for k, v in r.counts.items():
+                counts[k] = counts.get(k, 0) + v
+        return list(rows.values())
+
+    def format_table(self) -> str:
+        lines = [f"{'phase':<14} {'calls':>6} {'seconds':>9} {'peak MiB':>9}  counts"]
+        for row in self.summary():
+            peak = row["peak_bytes"]
+            peak_text = f"{peak / 2**20:9.1f}" if peak is not None else f"{'-':>9}"  # type: ignore[operator]
+            counts = " ".join(f"{k}={v}" for k, v in row["counts"].items())  # type: ignore[attr-defined]
+            lines.append(f"{row['phase']:<14} {row['calls']:>6} {row['seconds']:>9.3f} {peak_text}  {counts}")
+        return "\n".join(lines)
+
+    def to_json(self) -> str:
+        return json.dumps(self.summary(), indent=2)
+
+    def slowest_profile(self) -> Optional[PhaseRecord]:
+        profiled = [r for r in self.records if r.profile is not None]
+        return max(profiled, key=lambda r: r.seconds) if profiled else None
+
+    def dump_slowest(self, path: str) -> Optional[str]:
+        """Write the slowest profiled phase as a .prof file; returns its phase name."""
+
+        record = self.slowest_profile()
+        if record is None:
+            return None
+        record.profile.dump_stats(path)  # type: ignore[union-attr]
+        return record.name
+
@@ -0,0 +1,234 @@
+from array import array
+from collections import deque
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from graph import CallGraph
+
+
+class CallIndex:
+    """Reachability queries over a CallGraph ("what can reach X", "what does X call").
+
+    Built once in O(V + E): forward/reverse CSR adjacency (from the graph) and
+    the strongly connected components with their condensed DAG. Unbounded
+    queries walk the condensation and expand component members, depth-limited
+    ones and shortest paths walk the call graph, so every query only touches
+    the part of the graph it returns.
+    """
+
+    def __init__(self, graph: CallGraph):
+        self.graph = graph
+        n = graph.node_count
+        # Build both adjacency directions up front rather than on the first query.
+        if n:
+            graph.successor_ids(0)
+            graph.predecessor_ids(0)
+
+        self.recursive: Set[int] = {c for c, e in zip(graph.callers, graph.callees) if c == e}
+        self.component = self._strongly_connected(graph)
+        count = max(self.component) + 1 if n else 0
+
+        self.members: List[List[int]] = [[] for _ in range(count)]
+        for node_id, comp in enumerate(self.component):
+            self.members[comp].append(node_id)
+
+        succ: List[Set[int]] = [set() for _ in range(count)]
+        for u in range(n):
+            cu = self.component[u]
+            for v in graph.successor_ids(u):
+                cv = self.component[v]
+                if cu != cv:
+                    succ[cu].add(cv)
+        self.dag_succ: List[List[int]] = [sorted(s) for s in succ]
+        self.dag_pred: List[List[int]] = [[] for _ in range(count)]
+        for cu, targets in enumerate(self.dag_succ):
+            for cv in targets:
+                self.dag_pred[cv].append(cu)
+
+    @staticmethod
+    def _strongly_connected(graph: CallGraph) -> array:
+        # Iterative Tarjan; components are numbered in reverse topological order.
+        n = graph.node_count
+        index = array("i", [-1]) * n
+        low = array("i", [0]) * n
+        component = array("i", [-1]) * n
+        on_stack = bytearray(n)
+        stack: List[int] = []
+        counter = 0
+        count = 0
+
+        for root in range(n):
+            if index[root] >= 0:
+                continue
+            work = [(root, 0)]
+            while work:
+                v, i = work.pop()
+                if i == 0:
+                    index[v] = low[v] = counter
+                    counter += 1
+                    stack.append(v)
+                    on_stack[v] = 1
+                succ = graph.successor_ids(v)
+                recurse = False
+                while i < len(succ):
+                    w = succ[i]
+                    i += 1
+                    if index[w] < 0:
+                        work.append((v, i))
+                        work.append((w, 0))
+                        recurse = True
+                        break
+                    if on_stack[w]:
+                        low[v] = min(low[v], index[w])
+                if recurse:
+                    continue
+
+                if low[v] == index[v]:
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = 0
+                        component[w] = count
+                        if w == v:
+                            break
+                    count += 1
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[v])
+        return component
+
+    def _require(self, name: str) -> int:
+        node_id = self.graph.node_id(name)
+        if node_id is None:
+            raise KeyError(name)
+        return node_id
+
+    def _closure(self, node_id: int, dag: List[List[int]]) -> List[str]:
+        start = self.component[node_id]
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            for c in dag[queue.popleft()]:
+                if c not in seen:
+                    seen.add(c)
+                    queue.append(c)
+
+        # A node reaches itself only through recursion (a cycle or a direct self-call).
+        if len(self.members[start]) == 1 and node_id not in self.recursive:
+            seen.discard(start)
+        names = self.graph.names
+        return sorted(names[v] for c in seen for v in self.members[c])
+
+    def _bfs(self, node_id: int, depth: int, forward: bool) -> Dict[str, int]:
+        neighbours = self.graph.successor_ids if forward else self.graph.predecessor_ids
+        dist = {node_id: 0}
+        frontier = [node_id]
+        for d in range(1, depth + 1):
+            nxt = []
+            for u in frontier:
+                for v in neighbours(u):
+                    if v not in dist:
+                        dist[v] = d
+                        nxt.append(v)
+            if not nxt:
+                break
+            frontier = nxt
+        del dist[node_id]
+        names = self.graph.names
+        return {names[v]: d for v, d in dist.items()}
+
+    def callees_of(self, name: str, depth: Optional[int] = None) -> Dict[str, int]:
+        """Everything ``name`` calls, directly or transitively.
+
+        Returns {callee: call depth}; with ``depth`` only callees at most that
+        many calls away. Without it the depth is not computed and is reported
+        as 0. Raises KeyError for an unknown name.
+        """
+
+        node_id = self._require(name)
+        if depth is None:
+            return dict.fromkeys(self._closure(node_id, self.dag_succ), 0)
+        return self._bfs(node_id, depth, forward=True)
+
+    def callers_of(self, name: str, depth: Optional[int] = None) -> Dict[str, int]:
+        """Everything that can reach ``name``; same shape as ``callees_of``."""
+
+        node_id = self._require(name)
+        if depth is None:
+            return dict.fromkeys(self._closure(node_id, self.dag_pred), 0)
+        return self._bfs(node_id, depth, forward=False)
+
+    def neighborhood(self, name: str, depth: int = 1) -> Dict[str, int]:
+        # Callers and callees within ``depth`` calls, plus ``name`` itself at distance 0.
+        node_id = self._require(name)
+        found = self._bfs(node_id, depth, forward=False)
+        for callee, d in self._bfs(node_id, depth, forward=True).items():
+            found[callee] = min(d, found.get(callee, d))
+        found[name] = 0
+        return found
+
+    def reaches(self, source: str, target: str) -> bool:
+        return self.shortest_path(source, target) is not None
+
+    def shortest_path(self, source: str, target: str) -> Optional[List[str]]:
+        """Fewest-calls path from ``source`` to ``target`` as a list of names, or None.
+
+        Searches from both ends at once, expanding the smaller frontier.
+        """
+
+        a = self._require(source)
+        b = self._require(target)
+        names = self.graph.names
+        if a == b:
+            return [source]
+
+        # Callers can never reach callees in an earlier component (reverse topological order).
+        if self.component[a] < self.component[b]:
+            return None
+
+        # node -> (previous node towards a, or next node towards b; distance from that end)
+        forward: Dict[int, Tuple[int, int]] = {a: (-1, 0)}
+        backward: Dict[int, Tuple[int, int]] = {b: (-1, 0)}
+        f_frontier = [a]
+        b_frontier = [b]
+        meet = -1
+        while f_frontier and b_frontier:
+            # Expand one whole level of the smaller side, then take the best meeting node.
+            if len(f_frontier) <= len(b_frontier):
+                f_frontier, meets = self._expand(f_frontier, forward, backward, self.graph.successor_ids)
+            else:
+                b_frontier, meets = self._expand(b_frontier, backward, forward, self.graph.predecessor_ids)
+            if meets:
+                meet = min(meets, key=lambda v: forward[v][1] + backward[v][1])
+                break
+
+        if meet < 0:
+            return None
+        path: List[int] = []
+        v = meet
+        while v >= 0:
+            path.append(v)
+            v = forward[v][0]
+        path.reverse()
+        v = backward[meet][0]
+        while v >= 0:
+            path.append(v)
+            v = backward[v][0]
+        return [names[v] for v in path]
+
+    @staticmethod
+    def _expand(
+        frontier: List[int],
+        seen: Dict[int, Tuple[int, int]],
+        other: Dict[int, Tuple[int, int]],
+        neighbours: Callable[[int], array],
+    ) -> Tuple[List[int], List[int]]:
+        nxt: List[int] = []
+        meets: List[int] = []
+        for u in frontier:
+            d = seen[u][1] + 1
+            for v in neighbours(u):
+                if v not in seen:
+                    seen[v] = (u, d)
+                    nxt.append(v)
+                    if v in other:
+                        meets.append(v)
+        return nxt, meets
@@ -0,0 +1,287 @@
+"""Headless diagram rendering: SVG, Graphviz DOT and layout JSON, no display needed.
+
+Uses the same layout engines and node sizes as the GUI but never imports
+tkinter or PIL, so it runs on CI machines:
+
+  python render.py path/to/file.py -o flow.svg
+  python render.py src/ --out-dir diagrams --format svg -j 8
+
+Several inputs are rendered in parallel on a process pool; each worker writes
+its file as soon as it is done, mirroring the input tree under ``--out-dir``.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, TextIO, Tuple
+from xml.sax.saxutils import escape
+
+from graph import CallGraph
+from layout import Positions, available_engines, compute_layout, node_size
+from main import analyze_flow, iter_python_files
+
+FORMATS = ("svg", "dot", "json")
+
+# Same palette as the GUI.
+BG = "#4a4a4a"
+NODE_BG = "#2f2f2f"
+ORANGE = "#ff8c00"
+
+PAD = 140
+
+
+def _label(name: str) -> str:
+    return "Start" if name == "Main Script" else name
+
+
+def _pair_counts(graph: CallGraph) -> List[int]:
+    pair_callers, _pair_callees, pair_of = graph.edge_pairs()
+    counts = [0] * len(pair_callers)
+    for pair in pair_of:
+        counts[pair] += 1
+    return counts
+
+
+def _edge_width(count: int) -> int:
+    # One line per (caller, callee) pair, thicker the more call sites it stands for (as in the GUI).
+    return 2 + min(6, count.bit_length() - 1)
+
+
+def write_svg(out: TextIO, graph: CallGraph, pos: Positions) -> None:
+    names = graph.names
+    boxes: List[Tuple[int, int, int, int]] = []
+    for name in names:
+        x, y = pos.get(name, (0, 0))
+        w, h = node_size(_label(name))
+        boxes.append((x - w // 2, y - h // 2, w, h))
+    if boxes:
+        min_x = min(b[0] for b in boxes) - PAD
+        min_y = min(b[1] for b in boxes) - PAD
+        max_x = max(b[0] + b[2] for b in boxes) + PAD
+        max_y = max(b[1] + b[3] for b in boxes) + PAD
+    else:
+        min_x = min_y = 0
+        max_x = max_y = 2 * PAD
+    width = max_x - min_x
+    height = max_y - min_y
+
+    out.write(
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="{min_x} {min_y} {width} {height}" font-family="Helvetica, Arial, sans-serif">\n'
+    )
+    out.write(
+        "<defs><marker id=\"arrow\" viewBox=\"0 0 14 12\" refX=\"14\" refY=\"6\" markerWidth=\"7\" markerHeight=\"6\" "
+        f"markerUnits=\"strokeWidth\" orient=\"auto\"><path d=\"M0,0 L14,6 L0,12 z\" fill=\"{ORANGE}\"/></marker></defs>\n"
+    )
+    out.write(f'<rect x="{min_x}" y="{min_y}" width="{width}" height="{height}" fill="{BG}"/>\n')
+
+    out.write('<g class="edges">\n')
+    pair_callers, pair_callees, _pair_of = graph.edge_pairs()
+    for caller, callee, count in zip(pair_callers, pair_callees, _pair_counts(graph)):
+        x0, y0 = pos.get(names[caller], (0, 0))
+        x1, y1 = pos.get(names[callee], (0, 0))
+        title = f"{_label(names[caller])} -> {_label(names[callee])}" + (f" (x{count})" if count > 1 else "")
+        out.write(
+            f'<line x1="{x0}" y1="{y0}" x2="{x1}" y2="{y1}" stroke="{ORANGE}" stroke-width="{_edge_width(count)}" '
+            f'marker-end="url(#arrow)"><title>{escape(title)}</title></line>\n'
+        )
+    out.write("</g>\n")
+
+    out.write('<g class="nodes">\n')
+    for name, (x, y, w, h) in zip(names, boxes):
+        label = escape(_label(name))
+        out.write(
+            f'<g><title>{label}</title><rect x="{x}" y="{y}" width="{w}" height="{h}" rx="16" '
+            f'fill="{NODE_BG}" stroke="{ORANGE}" stroke-width="2"/>'
+            f'<text x="{x + w // 2}" y="{y + h // 2}" fill="{ORANGE}" font-size="12" font-weight="bold" '
+            f'text-anchor="middle" dominant-baseline="central">{label}</text></g>\n'
+        )
+    out.write("</g>\n</svg>\n")
+
+
+def _dot_id(name: str) -> str:
+    return '"' + name.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def write_dot(out: TextIO, graph: CallGraph, pos: Optional[Positions] = None) -> None:
+    # With ``pos`` the coordinates are pinned (neato -n / fdp honour them; dot ignores them).
+    out.write("digraph proflow {\n")
+    out.write(f'  graph [bgcolor="{BG}", rankdir=LR];\n')
+    out.write(
+        f'  node [shape=box, style="rounded,filled", fillcolor="{NODE_BG}", color="{ORANGE}", '
+        f'fontcolor="{ORANGE}", fontname="Helvetica-Bold", fontsize=12];\n'
+    )
+    out.write(f'  edge [color="{ORANGE}"];\n')
+    for name in graph.names:
+        attrs = [f"label={_dot_id(_label(name))}"]
+        if pos is not None and name in pos:
+            # Graphviz points, y up.
+            x, y = pos[name]
+            attrs.append(f'pos="{x},{-y}!"')
+        out.write(f"  {_dot_id(name)} [{', '.join(attrs)}];\n")
+    names = graph.names
+    pair_callers, pair_callees, _pair_of = graph.edge_pairs()
+    for caller, callee, count in zip(pair_callers, pair_callees, _pair_counts(graph)):
+        attrs = f" [penwidth={_edge_width(count)}, label=\"x{count}\"]" if count > 1 else ""
+        out.write(f"  {_dot_id(names[caller])} -> {_dot_id(names[callee])}{attrs};\n")
+    out.write("}\n")
+
+
+def write_layout_json(out: TextIO, graph: CallGraph, pos: Positions, engine: str = "") -> None:
+    nodes = []
+    for name in graph.names:
+        x, y = pos.get(name, (0, 0))
+        w, h = node_size(_label(name))
+        nodes.append({"name": name, "label": _label(name), "x": x, "y": y, "w": w, "h": h})
+    edges = [
+        {"caller": e.caller, "callee": e.callee, "count": e.count, "args": list(e.args), "lines": list(e.lines)}
+        for e in graph.multi_edges
+    ]
+    json.dump({"engine": engine, "nodes": nodes, "edges": edges}, out, indent=1)
+    out.write("\n")
+
+
+def render(
+    graph: CallGraph,
+    out: TextIO,
+    fmt: str = "svg",
+    engine: str = "layered",
+) -> None:
+    """Lay out ``graph`` and write it to ``out`` as svg, dot or json."""
+
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format: {fmt}")
+    # One-shot renders: the in-memory layout cache would only hold on to memory.
+    pos = compute_layout(graph, engine=engine, cache=None)
+    if fmt == "svg":
+        write_svg(out, graph, pos)
+    elif fmt == "dot":
+        write_dot(out, graph, pos)
+    else:
+        write_layout_json(out, graph, pos, engine if engine in available_engines() else "layered")
+
+
+def render_file(
+    source: str,
+    target: str,
+    fmt: str = "svg",
+    engine: str = "layered",
+    hide_builtins: bool = False,
+    use_cache: bool = True,
+) -> Optional[str]:
+    """Analyze ``source`` and write its diagram to ``target`` (atomically). Returns target, or None on error.
+
+    Module level so it can run in a pool worker.
+    """
+
+    data = analyze_flow(source, use_cache=use_cache)
+    if data is None:
+        return None
+    graph: CallGraph = data["graph"]  # type: ignore[assignment]
+    if hide_builtins:
+        graph = graph.without_builtins()
+
+    directory = os.path.dirname(os.path.abspath(target))
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as out:
+                render(graph, out, fmt, engine)
+            os.replace(tmp, target)  # e.g. IsADirectoryError if ``target`` is a directory
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+    except OSError as e:
+        print(f"Error: Failed to write diagram for {source}: {e}", file=sys.stderr)
+        return None
+    return target
+
+
+def _targets(files: List[str], out_dir: str, fmt: str) -> Dict[str, str]:
+    # Mirror the inputs' layout below their common directory.
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in files])
+    return {f: os.path.join(out_dir, os.path.splitext(os.path.relpath(os.path.abspath(f), root))[0] + "." + fmt) for f in files}
+
+
+def render_batch(
+    paths: List[str],
+    out_dir: str,
+    fmt: str = "svg",
+    engine: str = "layered",
+    hide_builtins: bool = False,
+    workers: Optional[int] = None,
+    use_cache: bool = True,
+) -> int:
+    """Render every Python file under ``paths`` into ``out_dir``; returns the number of failures.
+
+    Prints one line per finished file, in completion order.
+    """
+
+    files = iter_python_files(paths)
+    if not files:
+        print("Error: No Python files found.", file=sys.stderr)
+        return 1
+    targets = _targets(files, out_dir, fmt)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(files)))
+    failures = 0
+
+    if workers == 1:
+        for f in files:
+            done = render_file(f, targets[f], fmt, engine, hide_builtins, use_cache)
+            failures += done is None
+            print(f"{f} -> {done}" if done else f"{f}: failed")
+        return failures
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(render_file, f, targets[f], fmt, engine, hide_builtins, use_cache): f for f in files}
+        for future in as_completed(futures):
+            f = futures[future]
+            try:
+                done = future.result()
+            except OSError as e:
+                print(f"Error: Failed to write diagram for {f}: {e}", file=sys.stderr)
+                done = None
+            failures += done is None
+            print(f"{f} -> {done}" if done else f"{f}: failed", flush=True)
+    return failures
+
+
+def _run_cli() -> int:
+    parser = argparse.ArgumentParser(prog="render.py", description="Render ProFlow diagrams without a display.")
+    parser.add_argument("paths", nargs="+", help="Python file(s) or directories")
+    parser.add_argument("--format", choices=FORMATS, default="svg", help="output format (default: svg)")
+    parser.add_argument("-o", "--output", default=None, help="output file for a single input ('-' for stdout)")
+    parser.add_argument("--out-dir", default=None, help="directory for batch output (mirrors the input tree)")
+    parser.add_argument("--engine", default="layered", choices=available_engines(), help="layout engine")
+    parser.add_argument("--hide-builtins", action="store_true", help="leave out calls to Python built-ins")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes for batch rendering (default: CPU count)")
+    parser.add_argument("--no-cache", action="store_true", help="ignore and do not update the on-disk analysis cache")
+    args = parser.parse_args()
+    use_cache = not args.no_cache
+
+    single = len(args.paths) == 1 and not os.path.isdir(args.paths[0])
+    if args.output is not None:
+        if not single:
+            parser.error("-o/--output needs exactly one input file; use --out-dir for several")
+        if args.output == "-":
+            data = analyze_flow(args.paths[0], use_cache=use_cache)
+            if data is None:
+                return 1
+            graph: CallGraph = data["graph"]  # type: ignore[assignment]
+            render(graph.without_builtins() if args.hide_builtins else graph, sys.stdout, args.format, args.engine)
+            return 0
+        done = render_file(args.paths[0], args.output, args.format, args.engine, args.hide_builtins, use_cache)
+        return 0 if done else 1
+
+    out_dir = args.out_dir or "."
+    failures = render_batch(args.paths, out_dir, args.format, args.engine, args.hide_builtins, args.workers, use_cache)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_run_cli())
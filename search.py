@@ -0,0 +1,74 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import nsmallest
+from typing import Dict, List, Sequence, Tuple
+
+
+class NameIndex:
+    """Case-insensitive prefix and substring lookup over node names.
+
+    Built once per graph in O(total name length): the names sorted for
+    prefix ranges (bisect), plus trigram -> name ids postings for
+    substrings. A query of three or more characters only checks the names in
+    the shortest posting list of its trigrams; shorter ones scan all names.
+    Typing on refines the previous query's matches instead of starting over.
+    """
+
+    def __init__(self, names: Sequence[str]):
+        self.names = list(names)
+        folded = self._folded = [name.casefold() for name in self.names]
+        self._order = sorted(range(len(folded)), key=folded.__getitem__)
+        self._keys = [folded[i] for i in self._order]
+
+        grams: Dict[str, array] = {}
+        for name_id, name in enumerate(folded):
+            for gram in {name[i:i + 3] for i in range(len(name) - 2)}:
+                postings = grams.get(gram)
+                if postings is None:
+                    postings = grams[gram] = array("i")
+                postings.append(name_id)
+        self._grams = grams
+        self._last: Tuple[str, List[int]] = ("", [])  # last query and all its matches
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _matches(self, query: str) -> List[int]:
+        # Ids of every name containing ``query`` (already folded), ascending.
+        last_query, last = self._last
+        if last_query and last_query in query:
+            # Anything matching the longer query matched the previous one.
+            candidates: Sequence[int] = last
+        elif len(query) >= 3:
+            postings = [self._grams.get(query[i:i + 3]) for i in range(len(query) - 2)]
+            if any(p is None for p in postings):
+                candidates = []
+            else:
+                candidates = min(postings, key=len)  # type: ignore[arg-type]
+        else:
+            candidates = range(len(self._folded))
+        folded = self._folded
+        found = [i for i in candidates if query in folded[i]]
+        self._last = (query, found)
+        return found
+
+    def search(self, query: str, limit: int = 50) -> Tuple[List[str], int]:
+        """Up to ``limit`` names containing ``query``, best first, and the number of all matches.
+
+        An exact match comes first, then names starting with the query
+        (alphabetically), then the rest by where the query occurs and length.
+        """
+
+        query = query.strip().casefold()
+        if not query:
+            return [], 0
+        found = self._matches(query)
+        folded = self._folded
+
+        lo = bisect_left(self._keys, query)
+        hi = bisect_right(self._keys, query + "\U0010ffff", lo)
+        ids = self._order[lo:min(hi, lo + limit)]
+        if len(ids) < limit:
+            rest = (i for i in found if not folded[i].startswith(query))
+            ids.extend(nsmallest(limit - len(ids), rest, key=lambda i: (folded[i].find(query), len(folded[i]), folded[i])))
+        return [self.names[i] for i in ids], len(found)
@@ -0,0 +1,260 @@
+"""Binary snapshots of a whole analysis result (``.pfsnap``).
+
+Analyze once (e.g. on a build server) with ``main.py ... --export out.pfsnap``
+and open the file in the GUI or CLI without re-parsing anything.
+
+Layout (little-endian): an 8-byte magic, u32 format version and u32 section
+count, then one (u64 offset, u64 length) pair per section. Sections are
+8-byte aligned:
+
+  meta      JSON: counts, ProFlow version, layout engine, analyzed files
+  names     string table: i32 char offsets (n + 1) + UTF-8 blob; the first
+            ``meta["nodes"]`` strings are the graph nodes, the rest are other
+            strings (defined-but-uncalled functions, assignment targets, owners)
+  args      string table of argument texts
+  callers   i32 per call site (node id)
+  callees   i32 per call site (node id)
+  arg_ids   i32 per call site (args id)
+  lines     i32 per call site (source line, 0 if unknown)
+  defined   i32 string ids of defined functions
+  assigned  i32 (callee, target) string id pairs
+  owners    i32 (function, module, class or -1) string id triples
+  positions i32 (x, y) per graph node, empty if no layout was stored
+
+Loading mmaps the file and copies the integer sections straight into the
+CallGraph's arrays; no per-edge Python objects are created.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Dict, List, Optional, Set, Tuple
+
+from graph import CallGraph
+from main import _build_result
+
+SNAPSHOT_SUFFIX = ".pfsnap"
+SNAPSHOT_FORMAT = 2
+
+_MAGIC = b"PROFLOW\x00"
+_HEADER = struct.Struct("<8sII")
+_SECTION = struct.Struct("<QQ")
+_SECTIONS = (
+    "meta",
+    "names_offsets",
+    "names_blob",
+    "args_offsets",
+    "args_blob",
+    "callers",
+    "callees",
+    "arg_ids",
+    "lines",
+    "defined",
+    "assigned",
+    "owners",
+    "positions",
+)
+_MISSING = -(2**31)  # position of a node the stored layout does not cover
+
+Positions = Dict[str, Tuple[int, int]]
+
+
+def is_snapshot(path: str) -> bool:
+    return path.lower().endswith(SNAPSHOT_SUFFIX)
+
+
+def _ints(values) -> bytes:
+    data = array("i", values)
+    if sys.byteorder == "big":
+        data.byteswap()
+    return data.tobytes()
+
+
+def _string_table(strings: List[str]) -> Tuple[bytes, bytes]:
+    # Offsets count characters, not bytes: the blob is decoded once and sliced.
+    offsets = [0]
+    total = 0
+    for s in strings:
+        total += len(s)
+        offsets.append(total)
+    return _ints(offsets), "".join(strings).encode("utf-8")
+
+
+class _Strings:
+    def __init__(self, names: List[str]):
+        self.values = list(names)
+        self.ids = {s: i for i, s in enumerate(self.values)}
+
+    def id(self, s: str) -> int:
+        i = self.ids.get(s)
+        if i is None:
+            i = self.ids[s] = len(self.values)
+            self.values.append(s)
+        return i
+
+
+def save_snapshot(
+    path: str,
+    data: Dict[str, object],
+    pos: Optional[Positions] = None,
+    engine: Optional[str] = None,
+    version: str = "",
+) -> None:
+    """Write an analyze_flow/analyze_project result (plus an optional layout) to ``path``."""
+
+    graph: CallGraph = data["graph"]  # type: ignore[assignment]
+    strings = _Strings(graph.names)
+
+    defined = [strings.id(name) for name in sorted(data["defined_functions"])]  # type: ignore[call-overload]
+    assigned: List[int] = []
+    for callee, targets in sorted(data["assigned_to_by_callee"].items()):  # type: ignore[attr-defined]
+        callee_id = strings.id(callee)
+        for target in sorted(targets):
+            assigned += (callee_id, strings.id(target))
+    owners: List[int] = []
+    for name, owner in sorted(data.get("owners", {}).items()):  # type: ignore[attr-defined]
+        owners += (strings.id(name), strings.id(owner[0]), strings.id(owner[1]) if len(owner) > 1 else -1)
+
+    positions: List[int] = []
+    if pos is not None:
+        for name in graph.names:
+            positions += pos.get(name, (_MISSING, _MISSING))
+
+    meta = {
+        "proflow_version": version,
+        "nodes": graph.node_count,
+        "edges": len(graph),
+        "engine": engine if pos is not None else None,
+        "files": data.get("files", []),
+    }
+    names_offsets, names_blob = _string_table(strings.values)
+    args_offsets, args_blob = _string_table(graph.arg_texts)
+    sections = [
+        json.dumps(meta).encode("utf-8"),
+        names_offsets,
+        names_blob,
+        args_offsets,
+        args_blob,
+        _ints(graph.callers),
+        _ints(graph.callees),
+        _ints(graph.arg_ids),
+        _ints(graph.lines),
+        _ints(defined),
+        _ints(assigned),
+        _ints(owners),
+        _ints(positions),
+    ]
+
+    table = []
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    for body in sections:
+        offset += -offset % 8
+        table.append((offset, len(body)))
+        offset += len(body)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, SNAPSHOT_FORMAT, len(sections)))
+            for entry in table:
+                f.write(_SECTION.pack(*entry))
+            for (start, _length), body in zip(table, sections):
+                f.write(b"\0" * (start - f.tell()))
+                f.write(body)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def load_snapshot(path: str) -> Dict[str, object]:
+    """Read a snapshot back into the analyze_flow result shape.
+
+    The result also has "files" and, if a layout was stored, "layout":
+    {"engine": str, "pos": {name: (x, y)}}. Raises ValueError if the file is
+    not a readable snapshot.
+    """
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if len(mm) < _HEADER.size:
+            raise ValueError("Not a ProFlow snapshot.")
+        magic, version, count = _HEADER.unpack_from(mm, 0)
+        if magic != _MAGIC:
+            raise ValueError("Not a ProFlow snapshot.")
+        if version != SNAPSHOT_FORMAT or count != len(_SECTIONS):
+            raise ValueError(f"Unsupported snapshot format {version}.")
+        if len(mm) < _HEADER.size + count * _SECTION.size:
+            raise ValueError("Truncated ProFlow snapshot.")
+
+        view = memoryview(mm)
+        sections: Dict[str, memoryview] = {}
+        try:
+            for i, name in enumerate(_SECTIONS):
+                start, length = _SECTION.unpack_from(mm, _HEADER.size + i * _SECTION.size)
+                if start + length > len(mm):
+                    raise ValueError("Truncated ProFlow snapshot.")
+                sections[name] = view[start:start + length]
+
+            def ints(name: str) -> array:
+                values = array("i")
+                values.frombytes(sections[name])
+                if sys.byteorder == "big":
+                    values.byteswap()
+                return values
+
+            def strings(prefix: str) -> List[str]:
+                offsets = ints(prefix + "_offsets")
+                text = str(sections[prefix + "_blob"], "utf-8")
+                return [text[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+            meta = json.loads(bytes(sections["meta"]))
+            values = strings("names")
+            n = meta["nodes"]
+
+            graph = CallGraph()
+            graph.names = values[:n]
+            graph._name_ids = {s: i for i, s in enumerate(graph.names)}
+            graph.arg_texts = strings("args")
+            graph._arg_ids = {s: i for i, s in enumerate(graph.arg_texts)}
+            graph.callers = ints("callers")
+            graph.callees = ints("callees")
+            graph.arg_ids = ints("arg_ids")
+            graph.lines = ints("lines")
+
+            defined: Set[str] = {values[i] for i in ints("defined")}
+            assigned_to_by_callee: Dict[str, Set[str]] = {}
+            pairs = ints("assigned")
+            for i in range(0, len(pairs), 2):
+                assigned_to_by_callee.setdefault(values[pairs[i]], set()).add(values[pairs[i + 1]])
+            owners: Dict[str, Tuple[str, ...]] = {}
+            triples = ints("owners")
+            for i in range(0, len(triples), 3):
+                cls = triples[i + 2]
+                module = values[triples[i + 1]]
+                owners[values[triples[i]]] = (module, values[cls]) if cls >= 0 else (module,)
+            coords = ints("positions")
+        except (IndexError, KeyError, TypeError) as e:
+            # Ids or counts that point outside their tables.
+            raise ValueError(f"Corrupt ProFlow snapshot: {e!r}") from e
+        finally:
+            # Every slice must be released before the mmap can close.
+            for section in sections.values():
+                section.release()
+            view.release()
+
+    data = _build_result(graph, defined, assigned_to_by_callee, owners)
+    data["files"] = meta.get("files", [])
+    if coords:
+        pos: Positions = {}
+        for node_id, name in enumerate(graph.names[:n]):
+            x = coords[2 * node_id]
+            if x != _MISSING:
+                pos[name] = (x, coords[2 * node_id + 1])
+        data["layout"] = {"engine": meta.get("engine") or "layered", "pos": pos}
+    return data
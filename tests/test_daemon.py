@@ -0,0 +1,62 @@
+import os
+import socket
+import threading
+
+import pytest
+
+from daemon import AnalysisDaemon, request, serve
+from main import analyze_flow
+
+OLD = "def a():\n    x(1)\n\ndef b():\n    y(2)\n    z(3)\n"
+
+
+def _write(path, text):
+    path.write_text(text)
+    # Make sure the daemon sees a new stamp even on coarse file system clocks.
+    stamp = os.stat(path).st_mtime_ns + 1_000_000_000
+    os.utime(path, ns=(stamp, stamp))
+
+
+def test_edit_between_requests(tmp_path):
+    path = tmp_path / "mod.py"
+    _write(path, OLD)
+    daemon = AnalysisDaemon()
+    first = daemon.handle({"op": "analyze", "paths": [str(path)]})
+    assert [tuple(edge) for edge in first["edges"]] == [("a", "x", "1"), ("b", "y", "2"), ("b", "z", "3")]
+
+    _write(path, OLD.replace("def b():\n", ""))
+    second = daemon.handle({"op": "analyze", "paths": [str(path)]})
+    assert second["ok"]
+    assert [tuple(edge) for edge in second["edges"]] == list(analyze_flow(str(path), use_cache=False)["edges"])
+    assert daemon.updates == 1
+
+
+@pytest.mark.parametrize("message", [{"op": "analyze", "paths": 5}, [1, 2], {"op": "query", "paths": [], "depth": "x"}])
+def test_malformed_request(message):
+    reply = AnalysisDaemon().handle(message)
+    assert reply["ok"] is False and reply["error"].startswith("Bad request")
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix domain sockets")
+def test_idle_connection_does_not_block_others(tmp_path):
+    socket_path = str(tmp_path / "d.sock")
+    server = threading.Thread(target=serve, args=(socket_path, 1 << 20), daemon=True)
+    server.start()
+    for _ in range(100):
+        if os.path.exists(socket_path):
+            break
+        threading.Event().wait(0.05)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as idle:
+        idle.connect(socket_path)  # connected, never sends anything
+        assert request(socket_path, {"op": "ping"}, timeout=5)["ok"]
+        assert request(socket_path, {"op": "shutdown"}, timeout=5)["ok"]
+    server.join(5)
+    assert not server.is_alive()
+
+
+def test_serve_refuses_to_remove_a_regular_file(tmp_path):
+    path = tmp_path / "not-a-socket"
+    path.write_text("keep me")
+    assert serve(str(path), 1 << 20) == 1
+    assert path.read_text() == "keep me"
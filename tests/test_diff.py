@@ -0,0 +1,44 @@
+from collections import Counter
+
+from diff import ADDED, ARITY, REMOVED, diff_paths
+from main import analyze_flow
+
+OLD = "def a():\n    x(1)\n\ndef b():\n    y(2)\n    z(3)\n"
+
+
+def _diff(tmp_path, old, new):
+    old_path = tmp_path / "old.py"
+    new_path = tmp_path / "new.py"
+    old_path.write_text(old)
+    new_path.write_text(new)
+    return diff_paths(str(old_path), str(new_path)), str(old_path), str(new_path)
+
+
+def _full_diff(old_path, new_path):
+    old = Counter(analyze_flow(old_path, use_cache=False)["edges"])
+    new = Counter(analyze_flow(new_path, use_cache=False)["edges"])
+    return sorted((new - old).elements()), sorted((old - new).elements())
+
+
+def test_deleted_def_line_moves_calls_to_previous_function(tmp_path):
+    diff, old_path, new_path = _diff(tmp_path, OLD, OLD.replace("def b():\n", ""))
+    changes = sorted((c.kind, c.caller, c.callee, c.args) for c in diff.changes)
+    assert changes == [
+        (ADDED, "a", "y", "2"),
+        (ADDED, "a", "z", "3"),
+        (REMOVED, "b", "y", "2"),
+        (REMOVED, "b", "z", "3"),
+    ]
+    added = sorted((c.caller, c.callee, c.args) for c in diff.changes if c.kind == ADDED)
+    removed = sorted((c.caller, c.callee, c.args) for c in diff.changes if c.kind == REMOVED)
+    assert (added, removed) == _full_diff(old_path, new_path)
+
+
+def test_arity_change(tmp_path):
+    diff, _old, _new = _diff(tmp_path, OLD, OLD.replace("y(2)", "y(2, 5)"))
+    assert [(c.kind, c.caller, c.callee, c.old_args, c.args) for c in diff.changes] == [(ARITY, "b", "y", "2", "2, 5")]
+
+
+def test_unparsable_revision(tmp_path):
+    diff, _old, _new = _diff(tmp_path, OLD, OLD.replace("def a():\n", "", 1))
+    assert diff is None
@@ -0,0 +1,19 @@
+from render import render_file
+
+
+def test_output_path_is_a_directory(tmp_path, capsys):
+    source = tmp_path / "mod.py"
+    source.write_text("def a():\n    b()\n")
+    target = tmp_path / "out"
+    target.mkdir()
+    assert render_file(str(source), str(target), use_cache=False) is None
+    assert "Error: Failed to write diagram" in capsys.readouterr().err
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["mod.py", "out"]  # no temp file left behind
+
+
+def test_writes_svg(tmp_path):
+    source = tmp_path / "mod.py"
+    source.write_text("def a():\n    b()\n")
+    target = tmp_path / "mod.svg"
+    assert render_file(str(source), str(target), use_cache=False) == str(target)
+    assert "<svg" in target.read_text()
@@ -0,0 +1,33 @@
+import pytest
+
+from main import analyze_flow
+from snapshot import load_snapshot, save_snapshot
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    source = tmp_path / "mod.py"
+    source.write_text("def a():\n    b(1)\n\ndef b(x):\n    print(x)\n")
+    path = tmp_path / "mod.pfsnap"
+    save_snapshot(str(path), analyze_flow(str(source), use_cache=False), pos={"a": (1, 2)}, engine="layered")
+    return path
+
+
+def test_round_trip(snapshot_path):
+    data = load_snapshot(str(snapshot_path))
+    assert list(data["edges"]) == [("a", "b", "1"), ("b", "print", "x")]
+    assert data["layout"]["pos"] == {"a": (1, 2)}
+
+
+@pytest.mark.parametrize("keep", [0, 4, 16, 20, 40])
+def test_truncated_file_is_a_value_error(snapshot_path, keep):
+    snapshot_path.write_bytes(snapshot_path.read_bytes()[:keep])
+    with pytest.raises(ValueError):
+        load_snapshot(str(snapshot_path))
+
+
+def test_truncated_sections_are_a_value_error(snapshot_path):
+    contents = snapshot_path.read_bytes()
+    snapshot_path.write_bytes(contents[:len(contents) - 8])
+    with pytest.raises(ValueError):
+        load_snapshot(str(snapshot_path))
@@ -0,0 +1,36 @@
+from main import analyze_flow
+from watch import IncrementalAnalysis
+
+OLD = "def a():\n    x(1)\n\ndef b():\n    y(2)\n    z(3)\n"
+
+
+def _edges(data):
+    graph = data["graph"]
+    return list(zip(graph.edges, graph.lines))
+
+
+def _edit(tmp_path, old, new):
+    path = tmp_path / "mod.py"
+    path.write_text(old)
+    analysis = IncrementalAnalysis(str(path))
+    assert analysis.update() is not None
+    path.write_text(new)
+    return analysis, analysis.update(), str(path)
+
+
+def test_deleted_def_line_joins_body_to_previous_function(tmp_path):
+    analysis, delta, path = _edit(tmp_path, OLD, OLD.replace("def b():\n", ""))
+    assert _edges(analysis.data()) == _edges(analyze_flow(path, use_cache=False))
+    assert sorted(delta.added) == [("a", "y", "2"), ("a", "z", "3")]
+    assert sorted(delta.removed) == [("b", "y", "2"), ("b", "z", "3")]
+
+
+def test_added_decorator_joins_following_definition(tmp_path):
+    analysis, _delta, path = _edit(tmp_path, OLD, OLD.replace("def b():", "@deco(w(4))\ndef b():"))
+    assert _edges(analysis.data()) == _edges(analyze_flow(path, use_cache=False))
+
+
+def test_orphaned_indented_lines_are_a_parse_error(tmp_path):
+    analysis, delta, _path = _edit(tmp_path, OLD, OLD.replace("def a():\n", "", 1))
+    assert delta is None
+    assert [edge for edge, _line in _edges(analysis.data())] == [("a", "x", "1"), ("b", "y", "2"), ("b", "z", "3")]
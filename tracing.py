@@ -0,0 +1,326 @@
+"""Run a program and record which functions actually call which, and for how long.
+
+  python tracing.py path/to/script.py [args...]
+  python tracing.py -m package.module [args...]
+  python tracing.py --entry package.module:function
+
+The result is a ``.pftrace`` file (see heat.py) that main.py ``--heat`` and
+the GUI lay over the static diagram. Functions are named the way
+FlowAnalyzer names them: module level code is "Main Script", lambdas,
+comprehensions and class bodies count as part of the code around them.
+Only code below the ``--scope`` directories (default: the target's
+directory) is recorded; everything else runs at full speed.
+
+On Python 3.12+ this uses ``sys.monitoring``, where code outside the scope
+is switched off after its first event. Older versions fall back to
+``sys.setprofile``, which also counts each resumption of a generator as a
+call. Only the main thread is followed.
+"""
+
+import argparse
+import importlib
+import importlib.util
+import inspect
+import os
+import runpy
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from heat import EdgeCost, Heat, NodeCost, save_heat
+
+# Returns are recorded into a flat buffer and folded into the totals this many at a time.
+BUFFER_SIZE = 4096
+
+_MONITORING = hasattr(sys, "monitoring")
+_clock = time.perf_counter
+_thread_id = threading.get_ident
+_INLINE = -1  # code that is not a function of its own, or is out of scope
+
+
+class Tracer:
+    """Records caller -> callee counts and times while enabled (one at a time)."""
+
+    def __init__(self, scope: Sequence[str], use_monitoring: bool = _MONITORING, buffer_size: int = BUFFER_SIZE):
+        self._scope = tuple(os.path.join(os.path.abspath(d), "") for d in scope)
+        self._use_monitoring = use_monitoring and _MONITORING
+        self._buffer_size = buffer_size
+        self._names: List[str] = []
+        self._name_ids: Dict[str, int] = {}
+        self._codes: Dict[Any, int] = {}  # code object -> name id or _INLINE
+        self._depth: List[int] = []  # per name id: activations currently on the stack
+        # [frame or code, name id, start, time in callees, counts as a call]
+        self._stack: List[List[Any]] = []
+        self._buffer: List[Tuple[int, int, float, float, int, bool]] = []
+        self._nodes: List[List[float]] = []  # per name id: [calls, own, cumulative]
+        self._edges: Dict[Tuple[int, int], List[float]] = {}  # [calls, seconds]
+        self._thread = 0
+        self.seconds = 0.0
+
+    @property
+    def backend(self) -> str:
+        return "sys.monitoring" if self._use_monitoring else "sys.setprofile"
+
+    def _intern(self, code) -> int:
+        name = code.co_name
+        filename = code.co_filename
+        # "<frozen ...>", "<string>" and the like are never in scope.
+        if filename.startswith("<") or not os.path.abspath(filename).startswith(self._scope):
+            name_id = _INLINE
+        elif name == "<module>":
+            name_id = self._name_id("Main Script")
+        elif name.startswith("<") or not code.co_flags & inspect.CO_NEWLOCALS:
+            # Lambdas, comprehensions and class bodies (no new locals).
+            name_id = _INLINE
+        else:
+            name_id = self._name_id(name)
+        self._codes[code] = name_id
+        return name_id
+
+    def _name_id(self, name: str) -> int:
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self._names)
+            self._names.append(name)
+            self._depth.append(0)
+            self._nodes.append([0, 0.0, 0.0])
+        return name_id
+
+    def _pop(self) -> None:
+        now = _clock()
+        stack = self._stack
+        _key, name_id, start, child, is_call = stack.pop()
+        elapsed = now - start
+        if stack:
+            parent = stack[-1]
+            parent[3] += elapsed
+            caller = parent[1]
+        else:
+            caller = -1
+        depth = self._depth
+        depth[name_id] -= 1
+        buffer = self._buffer
+        buffer.append((caller, name_id, elapsed, elapsed - child, is_call, depth[name_id] == 0))
+        if len(buffer) >= self._buffer_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        nodes = self._nodes
+        edges = self._edges
+        for caller, callee, elapsed, own, is_call, outermost in self._buffer:
+            node = nodes[callee]
+            node[0] += is_call
+            node[1] += own
+            if outermost:
+                node[2] += elapsed
+            if caller >= 0:
+                edge = edges.get((caller, callee))
+                if edge is None:
+                    edges[(caller, callee)] = [is_call, elapsed]
+                else:
+                    edge[0] += is_call
+                    edge[1] += elapsed
+        self._buffer = []
+
+    # sys.setprofile backend
+
+    def _profile(self, frame, event: str, arg) -> None:
+        if event == "call":
+            code = frame.f_code
+            name_id = self._codes.get(code)
+            if name_id is None:
+                name_id = self._intern(code)
+            if name_id != _INLINE:
+                self._depth[name_id] += 1
+                self._stack.append([frame, name_id, _clock(), 0.0, 1])
+        elif event == "return":
+            stack = self._stack
+            if stack and stack[-1][0] is frame:
+                self._pop()
+
+    # sys.monitoring backend (3.12+)
+
+    def _on_start(self, code, offset: int, is_call: int = 1):
+        if _thread_id() != self._thread:
+            return None
+        name_id = self._codes.get(code)
+        if name_id is None:
+            name_id = self._intern(code)
+        if name_id == _INLINE:
+            return sys.monitoring.DISABLE
+        self._depth[name_id] += 1
+        self._stack.append([code, name_id, _clock(), 0.0, is_call])
+        return None
+
+    def _on_resume(self, code, offset: int):
+        # Resuming a generator or coroutine is not a new call.
+        return self._on_start(code, offset, 0)
+
+    def _on_exit(self, code, offset: int, value):
+        if _thread_id() != self._thread:
+            return None
+        if self._codes.get(code, _INLINE) == _INLINE:
+            return sys.monitoring.DISABLE
+        stack = self._stack
+        if stack and stack[-1][0] is code:
+            self._pop()
+        return None
+
+    def _on_unwind(self, code, offset: int, exc) -> None:
+        # PY_UNWIND cannot be disabled.
+        stack = self._stack
+        if stack and stack[-1][0] is code and _thread_id() == self._thread:
+            self._pop()
+
+    def start(self) -> None:
+        self._thread = threading.get_ident()
+        self._started = time.perf_counter()
+        if not self._use_monitoring:
+            sys.setprofile(self._profile)
+            return
+        mon = sys.monitoring
+        tool = mon.PROFILER_ID
+        mon.use_tool_id(tool, "proflow")
+        events = mon.events
+        mon.register_callback(tool, events.PY_START, self._on_start)
+        mon.register_callback(tool, events.PY_RESUME, self._on_resume)
+        mon.register_callback(tool, events.PY_RETURN, self._on_exit)
+        mon.register_callback(tool, events.PY_YIELD, self._on_exit)
+        mon.register_callback(tool, events.PY_UNWIND, self._on_unwind)
+        # Locations switched off by an earlier run would stay silent otherwise.
+        mon.restart_events()
+        mon.set_events(tool, events.PY_START | events.PY_RESUME | events.PY_RETURN | events.PY_YIELD | events.PY_UNWIND)
+
+    def stop(self) -> Heat:
+        """Stop recording and return what was measured; frames still running are closed now."""
+
+        if not self._use_monitoring:
+            sys.setprofile(None)
+        else:
+            mon = sys.monitoring
+            tool = mon.PROFILER_ID
+            mon.set_events(tool, 0)
+            for event in (mon.events.PY_START, mon.events.PY_RESUME, mon.events.PY_RETURN, mon.events.PY_YIELD, mon.events.PY_UNWIND):
+                mon.register_callback(tool, event, None)
+            mon.free_tool_id(tool)
+        self.seconds = time.perf_counter() - self._started
+        while self._stack:
+            self._pop()
+        self._flush()
+        return self.heat()
+
+    def heat(self, source: str = "") -> Heat:
+        names = self._names
+        nodes = {names[i]: NodeCost(int(c[0]), c[1], c[2]) for i, c in enumerate(self._nodes) if c[0] or c[2]}
+        edges = {(names[c], names[e]): EdgeCost(int(v[0]), v[1]) for (c, e), v in self._edges.items()}
+        return Heat(nodes, edges, source)
+
+
+def _module_dir(module: str) -> str:
+    spec = importlib.util.find_spec(module)
+    if spec is None or spec.origin is None:
+        raise ImportError(f"No module named {module!r}")
+    directory = os.path.dirname(spec.origin)
+    # A package's scope is the directory holding it, so sibling packages are included too.
+    return os.path.dirname(directory) if spec.submodule_search_locations else directory
+
+
+def trace_call(
+    target: str,
+    argv: Sequence[str] = (),
+    kind: str = "script",
+    scope: Optional[Sequence[str]] = None,
+    use_monitoring: bool = _MONITORING,
+) -> Tuple[Heat, int, Tracer]:
+    """Run ``target`` under a Tracer; returns (heat, exit status, tracer).
+
+    ``kind`` is "script" (a path), "module" (like ``python -m``) or "entry"
+    ("package.module:function", called without arguments).
+    """
+
+    if kind == "script":
+        target = os.path.abspath(target)
+        default_scope = os.path.dirname(target)
+        sys.argv = [target, *argv]
+        sys.path.insert(0, default_scope)
+    else:
+        sys.path.insert(0, os.getcwd())
+        default_scope = _module_dir(target.split(":", 1)[0])
+        sys.argv = [target, *argv]
+    tracer = Tracer(scope or [default_scope], use_monitoring)
+
+    status = 0
+    tracer.start()
+    try:
+        if kind == "script":
+            runpy.run_path(target, run_name="__main__")
+        elif kind == "module":
+            runpy.run_module(target, run_name="__main__", alter_sys=True)
+        else:
+            module_name, _, function = target.partition(":")
+            result = getattr(importlib.import_module(module_name), function)()
+            status = result if isinstance(result, int) else 0
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    finally:
+        heat = tracer.stop()
+    heat.source = " ".join(sys.argv)
+    return heat, status, tracer
+
+
+def _run_cli() -> int:
+    parser = argparse.ArgumentParser(
+        prog="tracing.py",
+        description="Run a Python program and record measured call counts and times for ProFlow.",
+    )
+    parser.add_argument("-m", dest="module", default=None, help="run a module as a script, like python -m")
+    parser.add_argument("--entry", metavar="MODULE:FUNCTION", default=None, help="import MODULE and call FUNCTION()")
+    parser.add_argument("-o", "--out", default=None, help="trace file to write (default: <target>.pftrace)")
+    parser.add_argument("--scope", action="append", default=None, metavar="DIR", help="record functions defined below DIR (repeatable; default: the target's directory)")
+    parser.add_argument("--setprofile", action="store_true", help="use sys.setprofile even where sys.monitoring is available")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="script path (without -m/--entry) and its arguments")
+    args = parser.parse_args()
+
+    if args.module and args.entry:
+        parser.error("-m and --entry cannot be combined")
+    if args.module:
+        kind, target, argv = "module", args.module, args.args
+    elif args.entry:
+        if ":" not in args.entry:
+            parser.error("--entry needs MODULE:FUNCTION")
+        kind, target, argv = "entry", args.entry, args.args
+    else:
+        if not args.args:
+            parser.error("a script, -m MODULE or --entry MODULE:FUNCTION is required")
+        kind, target, argv = "script", args.args[0], args.args[1:]
+        if not os.path.isfile(target):
+            print(f"Error: File not found: {target}", file=sys.stderr)
+            return 1
+
+    if args.out:
+        out_path = args.out
+    elif kind == "script":
+        out_path = os.path.splitext(os.path.basename(target))[0] + ".pftrace"
+    else:
+        out_path = target.replace(":", ".") + ".pftrace"
+    try:
+        heat, status, tracer = trace_call(target, argv, kind, args.scope, not args.setprofile)
+    except ImportError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    try:
+        save_heat(out_path, heat)
+    except OSError as e:
+        print(f"Error: Failed to write trace: {e}", file=sys.stderr)
+        return 1
+    calls = sum(cost.calls for cost in heat.nodes.values())
+    print(
+        f"Traced {calls} calls of {len(heat.nodes)} functions in {tracer.seconds:.2f}s ({tracer.backend}) -> {out_path}",
+        file=sys.stderr,
+    )
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(_run_cli())
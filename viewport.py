@@ -0,0 +1,120 @@
+import math
+from typing import Dict, List, Set, Tuple
+
+MAX_SEGMENT_CELLS = 16  # longer segments are indexed on a coarser grid
+
+
+class SpatialGrid:
+    """Uniform grid over canvas coordinates for "what intersects this rectangle" queries.
+
+    Keys are ints (node IDs, edge indices). Rectangles are registered in every
+    cell they overlap; segments in every cell along the line, so a long edge
+    is found from whichever end (or middle) is on screen. Segments longer than
+    MAX_SEGMENT_CELLS cells go to a coarser grid (4x the cell size per level)
+    and are checked exactly at query time, so long random edges cost a few
+    cells each instead of thousands.
+    """
+
+    def __init__(self, cell: int = 512):
+        self.cell = cell
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        self._coarse: Dict[int, Dict[Tuple[int, int], List[int]]] = {}  # level -> cells
+        self._segments: Dict[int, Tuple[float, float, float, float]] = {}  # coarse keys only
+
+    def insert_rect(self, key: int, x0: float, y0: float, x1: float, y1: float) -> None:
+        c = self.cell
+        for cx in range(int(x0 // c), int(x1 // c) + 1):
+            for cy in range(int(y0 // c), int(y1 // c) + 1):
+                self._cells.setdefault((cx, cy), []).append(key)
+
+    def insert_segment(self, key: int, x0: float, y0: float, x1: float, y1: float) -> None:
+        c = self.cell
+        length = math.hypot(x1 - x0, y1 - y0)
+        if length > c * MAX_SEGMENT_CELLS:
+            level = 1
+            c *= 4
+            while length > c * MAX_SEGMENT_CELLS:
+                level += 1
+                c *= 4
+            coarse = self._coarse.setdefault(level, {})
+            for cell in _cells_along(x0, y0, x1, y1, c):
+                coarse.setdefault(cell, []).append(key)
+            self._segments[key] = (x0, y0, x1, y1)
+            return
+
+        # Sample at half-cell steps; cheaper than exact supercover and never misses a cell
+        # by more than the query margin.
+        steps = max(1, int(length / (c / 2)))
+        seen = set()
+        for i in range(steps + 1):
+            t = i / steps
+            cell = (int((x0 + (x1 - x0) * t) // c), int((y0 + (y1 - y0) * t) // c))
+            if cell not in seen:
+                seen.add(cell)
+                self._cells.setdefault(cell, []).append(key)
+
+    def query(self, x0: float, y0: float, x1: float, y1: float) -> Set[int]:
+        found = self._query_cells(self._cells, self.cell, x0, y0, x1, y1)
+        for level, cells in self._coarse.items():
+            candidates = self._query_cells(cells, self.cell * 4**level, x0, y0, x1, y1)
+            segments = self._segments
+            found.update(k for k in candidates if _crosses(segments[k], x0, y0, x1, y1))
+        return found
+
+    @staticmethod
+    def _query_cells(
+        cells: Dict[Tuple[int, int], List[int]], c: int, x0: float, y0: float, x1: float, y1: float
+    ) -> Set[int]:
+        found: Set[int] = set()
+        for cx in range(int(x0 // c), int(x1 // c) + 1):
+            for cy in range(int(y0 // c), int(y1 // c) + 1):
+                keys = cells.get((cx, cy))
+                if keys:
+                    found.update(keys)
+        return found
+
+
+def _cells_along(x0: float, y0: float, x1: float, y1: float, c: int) -> List[Tuple[int, int]]:
+    # Every cell the segment passes through (Amanatides-Woo grid traversal).
+    cx, cy = int(x0 // c), int(y0 // c)
+    end = (int(x1 // c), int(y1 // c))
+    dx = x1 - x0
+    dy = y1 - y0
+    step_x = 1 if dx > 0 else -1
+    step_y = 1 if dy > 0 else -1
+    t_dx = abs(c / dx) if dx else math.inf
+    t_dy = abs(c / dy) if dy else math.inf
+    t_x = ((cx + (dx > 0)) * c - x0) / dx if dx else math.inf
+    t_y = ((cy + (dy > 0)) * c - y0) / dy if dy else math.inf
+    cells = [(cx, cy)]
+    limit = abs(end[0] - cx) + abs(end[1] - cy)
+    for _ in range(limit):
+        if t_x < t_y:
+            cx += step_x
+            t_x += t_dx
+        else:
+            cy += step_y
+            t_y += t_dy
+        cells.append((cx, cy))
+    return cells
+
+
+def _crosses(segment: Tuple[float, float, float, float], x0: float, y0: float, x1: float, y1: float) -> bool:
+    # Liang-Barsky: does the segment enter the rectangle at all?
+    sx, sy, ex, ey = segment
+    dx = ex - sx
+    dy = ey - sy
+    lo, hi = 0.0, 1.0
+    for p, q in ((-dx, sx - x0), (dx, x1 - sx), (-dy, sy - y0), (dy, y1 - sy)):
+        if p == 0:
+            if q < 0:
+                return False
+        else:
+            t = q / p
+            if p < 0:
+                lo = max(lo, t)
+            else:
+                hi = min(hi, t)
+            if lo > hi:
+                return False
+    return True
@@ -0,0 +1,217 @@
+import ast
+import hashlib
+import os
+import sys
+import time
+import tokenize
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from chunked import SourceLines, changed_window, top_level_statements
+from graph import CallGraph, FlowEdge
+from main import FlowAnalyzer, _build_result, _gc_paused, module_owners
+
+
+class GraphDelta(NamedTuple):
+    added: List[FlowEdge]
+    removed: List[FlowEdge]
+    changed: List[int]  # first lines of the statements that were (re-)analyzed
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed)
+
+
+class _ChunkResult(NamedTuple):
+    fingerprint: str  # of the statement's source text
+    edges: List[FlowEdge]
+    defined_functions: Set[str]
+    assigned_to_by_callee: Dict[str, Set[str]]
+    class_of: Dict[str, str]
+    lines: List[int]  # per edge, relative to the statement's first line (which may move)
+
+
+class _Chunk(NamedTuple):
+    first_line: int  # 1-based, in the current file
+    result: _ChunkResult
+
+
+def text_fingerprint(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def analyze_chunk(text: str, fp: str) -> _ChunkResult:
+    """Parse and walk one top-level statement's source. Raises SyntaxError."""
+
+    # Top-level statements are independent for FlowAnalyzer: each starts in "Main Script".
+    analyzer = FlowAnalyzer()
+    analyzer.walk(ast.parse(text))
+    lines = [line - 1 for line in analyzer.graph.lines]
+    return _ChunkResult(fp, list(analyzer.flow_data), analyzer.defined_functions, analyzer.assigned_to_by_callee, analyzer.class_of, lines)
+
+
+def _multiset_delta(old: Iterable[FlowEdge], new: Iterable[FlowEdge]) -> Tuple[List[FlowEdge], List[FlowEdge]]:
+    old_counts = Counter(old)
+    new_counts = Counter(new)
+    added = list((new_counts - old_counts).elements())
+    removed = list((old_counts - new_counts).elements())
+    return added, removed
+
+
+class IncrementalAnalysis:
+    """Keeps a file's analysis up to date by re-visiting only edited statements.
+
+    Lines shared with the previous version at the start and end of the file
+    are skipped outright (chunked.changed_window); the rest is split into
+    top-level statements, and only those whose text is not found among the
+    replaced ones are parsed and walked. The cost follows the size of the
+    edit, apart from reading and comparing the file's lines.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._source: Optional[SourceLines] = None
+        self._chunks: List[_Chunk] = []  # in source order
+
+    def _window(self, source: SourceLines) -> Tuple[int, int, int, int]:
+        # (prefix chunks, suffix chunks, first new line, last new line) to re-split, widened to whole chunks.
+        old = self._source
+        if old is None:
+            return 0, len(self._chunks), 0, len(source.lines)
+        start, old_stop, new_stop = changed_window(old, source)
+        starts = [chunk.first_line - 1 for chunk in self._chunks]
+        ends = starts[1:] + [len(old.lines)]
+        prefix = bisect_right(ends, start)
+        suffix = bisect_left(starts, old_stop)
+        if prefix < len(starts):
+            start = min(start, starts[prefix])
+        shift = new_stop - old_stop
+        stop = starts[suffix] if suffix < len(starts) else len(old.lines)
+        return prefix, len(starts) - suffix, start, stop + shift
+
+    def update(self) -> Optional[GraphDelta]:
+        """Re-read the file and return the edge delta, or None if it cannot be parsed.
+
+        On a parse error the previous graph is kept, so a half-typed edit does
+        not wipe the diagram.
+        """
+
+        try:
+            source = SourceLines(self.path)
+        except (OSError, SyntaxError, UnicodeDecodeError) as e:
+            print(f"Error: Failed to read Python file {self.path}: {e}", file=sys.stderr)
+            return None
+        if self._source is not None and source.lines == self._source.lines:
+            return GraphDelta([], [], [])
+
+        with _gc_paused():
+            return self._update(source)
+
+    def _update(self, source: SourceLines) -> Optional[GraphDelta]:
+        lines = source.lines
+        prefix, suffix, start, stop = self._window(source)
+        try:
+            statements = list(top_level_statements(lines[start:stop], start + 1))
+        except (SyntaxError, tokenize.TokenError):
+            # A misjudged cut: split the whole file instead.
+            prefix, suffix, start, stop = 0, 0, 0, len(lines)
+            try:
+                statements = list(top_level_statements(lines, 1))
+            except (SyntaxError, tokenize.TokenError) as e:
+                print(f"Error: Failed to parse Python file {self.path}: {e}", file=sys.stderr)
+                return None
+
+        chunks = self._chunks
+        replaced = chunks[prefix:len(chunks) - suffix]
+        # Replaced statements by text, to reuse those that only moved.
+        reusable: Dict[str, List[_ChunkResult]] = {}
+        for chunk in replaced:
+            reusable.setdefault(chunk.result.fingerprint, []).append(chunk.result)
+
+        middle: List[_Chunk] = []
+        new_edges: List[FlowEdge] = []
+        changed: List[int] = []
+        for first_line, text in statements:
+            fp = text_fingerprint(text)
+            pool = reusable.get(fp)
+            if pool:
+                middle.append(_Chunk(first_line, pool.pop()))
+                continue
+            try:
+                result = analyze_chunk(text, fp)
+            except SyntaxError as e:
+                e.lineno = (e.lineno or 1) + first_line - 1
+                print(f"Error: Failed to parse Python file {self.path}: {e}", file=sys.stderr)
+                return None
+            middle.append(_Chunk(first_line, result))
+            new_edges.extend(result.edges)
+            changed.append(first_line)
+        old_edges = [edge for pool in reusable.values() for result in pool for edge in result.edges]
+
+        shift = len(lines) - len(self._source.lines) if self._source is not None else 0
+        tail = [_Chunk(chunk.first_line + shift, chunk.result) for chunk in chunks[len(chunks) - suffix:]]
+        self._chunks = chunks[:prefix] + middle + tail
+        self._source = source
+        added, removed = _multiset_delta(old_edges, new_edges)
+        return GraphDelta(added, removed, changed)
+
+    def data(self) -> Dict[str, object]:
+        # Same shape (and edge order) as analyze_flow on the current file contents.
+        graph = CallGraph()
+        defined_functions: Set[str] = set()
+        assigned_to_by_callee: Dict[str, Set[str]] = {}
+        class_of: Dict[str, str] = {}
+        for start, chunk in self._chunks:
+            for (caller, callee, args), line in zip(chunk.edges, chunk.lines):
+                graph.add_edge(caller, callee, args, start + line)
+            defined_functions.update(chunk.defined_functions)
+            for callee, targets in chunk.assigned_to_by_callee.items():
+                assigned_to_by_callee.setdefault(callee, set()).update(targets)
+            class_of.update(chunk.class_of)
+        owners = module_owners(self.path, defined_functions, class_of)
+        return _build_result(graph, defined_functions, assigned_to_by_callee, owners)
+
+
+class FileWatcher:
+    """Polls files for modification (mtime + size); portable, no inotify needed."""
+
+    def __init__(self, paths: Iterable[str]):
+        self._stamps: Dict[str, Optional[Tuple[int, int]]] = {p: self._stamp(p) for p in paths}
+
+    @staticmethod
+    def _stamp(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def poll(self) -> List[str]:
+        changed: List[str] = []
+        for path, previous in self._stamps.items():
+            current = self._stamp(path)
+            if current != previous:
+                self._stamps[path] = current
+                if current is not None:
+                    changed.append(path)
+        return changed
+
+
+def watch(
+    paths: Iterable[str],
+    on_delta: Callable[[str, GraphDelta], None],
+    interval: float = 0.5,
+) -> None:
+    """Block forever, calling on_delta(path, delta) whenever a watched file's edges change."""
+
+    analyses = {p: IncrementalAnalysis(p) for p in paths}
+    for analysis in analyses.values():
+        analysis.update()
+
+    watcher = FileWatcher(analyses)
+    while True:
+        time.sleep(interval)
+        for path in watcher.poll():
+            delta = analyses[path].update()
+            if delta:
+                on_delta(path, delta)